@@ -0,0 +1 @@
+"""可复现的后端基准测试（上游依赖使用进程内替身）。"""
@@ -0,0 +1,202 @@
+"""基准测试用的进程内上游替身：LLM Agent、嵌入服务、向量检索与对象存储。
+
+替身只模拟接口形状与延迟特征（首 token 延迟、token 速率、固定往返耗时），
+不依赖网络，使不同提交之间的基准结果可以直接比较。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import numpy as np
+
+from src.core.config import get_settings
+
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent / "data" / "food_metadata.json"
+
+DEFAULT_REPLY = (
+    "根据你今天的摄入情况，午餐可以选择一份鸡胸肉沙拉搭配少量糙米，"
+    "晚餐注意控制油脂，饭后散步三十分钟，保持每日热量缺口在三百到五百千卡之间。"
+)
+
+
+class FakeLLMAgent:
+    """LoseWeightAgent 的替身，按首 token 延迟与 token 速率模拟流式输出。"""
+
+    def __init__(
+        self,
+        ttft_ms: float = 300,
+        tokens_per_second: float = 40,
+        reply: str = DEFAULT_REPLY,
+        vision_latency_ms: float = 1500,
+    ):
+        self.ttft = ttft_ms / 1000
+        self.token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0
+        self.reply = reply
+        self.vision_latency = vision_latency_ms / 1000
+
+    def _tokens(self) -> list[str]:
+        # 中文按 2 个字符近似一个 token
+        return [self.reply[i : i + 2] for i in range(0, len(self.reply), 2)]
+
+    async def chat_stream(
+        self, message: str, user_info: str, history: list, user_id: int
+    ) -> AsyncIterator[dict]:
+        await asyncio.sleep(self.ttft)
+        tokens = self._tokens()
+        for token in tokens:
+            yield {"event": "text", "data": token}
+            if self.token_interval:
+                await asyncio.sleep(self.token_interval)
+        yield {
+            "event": "usage",
+            "data": {
+                "prompt_tokens": len(user_info) // 2,
+                "completion_tokens": len(tokens),
+            },
+        }
+        yield {"event": "done", "data": ""}
+
+    async def get_guidance_direct(self, *args, **kwargs) -> str:
+        await asyncio.sleep(self.ttft + self.token_interval * len(self._tokens()))
+        return self.reply
+
+    async def analyze_food_bytes(self, image_data: bytes) -> dict:
+        await asyncio.sleep(self.vision_latency)
+        raw = [
+            {
+                "food_name": "鸡胸肉沙拉",
+                "calories": 320 + i * 10,
+                "confidence": 0.9 - i * 0.05,
+                "components": [],
+            }
+            for i in range(3)
+        ]
+        return {
+            "final_food_name": "鸡胸肉沙拉",
+            "final_estimated_calories": 330,
+            "raw_data": raw,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+class FakeEmbeddingService:
+    """确定性的伪嵌入：对文本哈希生成单位向量，并模拟一次网络往返。"""
+
+    def __init__(self, dimension: int = 256, latency_ms: float = 50):
+        self.dimension = dimension
+        self.latency = latency_ms / 1000
+
+    def embed(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest())
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def get_text_embedding(self, text: str) -> np.ndarray:
+        time.sleep(self.latency)
+        return self.embed(text)
+
+    def get_image_embedding(self, image_data: bytes, image_format: str = "jpeg"):
+        time.sleep(self.latency)
+        return self.embed(hashlib.sha1(image_data).hexdigest())
+
+
+def cached_matrix(key: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+    """以 mmap 只读方式加载落盘的矩阵，多个工作进程共享同一份页缓存；不存在时构建。"""
+    cache_dir = Path(get_settings().server.data_cache_dir)
+    path = cache_dir / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy"
+    if not path.exists():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，多个进程同时构建时不会读到半个文件
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(build()))
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
+
+
+class FakeVectorIndex:
+    """基于 NumPy 内积的暴力检索，模拟 Milvus 的 top-k 查询（矩阵以 mmap 共享）。"""
+
+    def __init__(
+        self,
+        embedding: FakeEmbeddingService,
+        catalog_path: Path = DEFAULT_CATALOG,
+        latency_ms: float = 10,
+    ):
+        raw = catalog_path.read_bytes()
+        self.items = json.loads(raw)
+        key = f"fake-index:{hashlib.sha1(raw).hexdigest()}:{embedding.dimension}"
+        self.matrix = cached_matrix(
+            key,
+            lambda: np.stack(
+                [embedding.embed(item["description"]) for item in self.items]
+            ),
+        )
+        self.latency = latency_ms / 1000
+
+    def search(self, vector: np.ndarray, limit: int) -> list[tuple[dict, float]]:
+        time.sleep(self.latency)
+        scores = self.matrix @ vector
+        limit = min(limit, len(self.items))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.items[i], float(scores[i])) for i in top]
+
+
+class FakeFoodSearch:
+    """FoodSearchService 的替身：嵌入 + 向量检索两段延迟。"""
+
+    def __init__(self, embedding: FakeEmbeddingService, index: FakeVectorIndex):
+        self.embedding = embedding
+        self.index = index
+
+    @staticmethod
+    def _to_result(item: dict, score: float) -> dict:
+        return {
+            "fdc_id": item["fdc_id"],
+            "description": item["description"],
+            "food_category": item.get("category"),
+            "calories_per_100g": 100.0,
+            "protein_per_100g": 10.0,
+            "fat_per_100g": 5.0,
+            "carbs_per_100g": 12.0,
+            "similarity": score,
+        }
+
+    def search_by_text(self, query: str, limit: int = 10) -> list[dict]:
+        vector = self.embedding.get_text_embedding(query)
+        return [self._to_result(*hit) for hit in self.index.search(vector, limit)]
+
+    def search_by_image(
+        self, image_data: bytes, limit: int = 10, image_format: str = "jpeg"
+    ) -> list[dict]:
+        vector = self.embedding.get_image_embedding(image_data, image_format)
+        return [self._to_result(*hit) for hit in self.index.search(vector, limit)]
+
+
+class FakeObjectStorage:
+    """MinIOClient 的替身，仅在内存中记录对象大小。"""
+
+    def __init__(self, latency_ms: float = 20):
+        self.latency = latency_ms / 1000
+        self.objects: dict[str, int] = {}
+
+    def __call__(self) -> "FakeObjectStorage":
+        # 替换 get_minio_client()，调用时返回同一实例
+        return self
+
+    def upload_image(self, image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+        time.sleep(self.latency)
+        name = f"recognition_{uuid.uuid4().hex}.jpg"
+        self.objects[name] = len(image_bytes)
+        return name
+
+    def get_presigned_url(self, object_name: str, expires_hours: int = 24) -> str:
+        return f"http://fake-storage/{object_name}"
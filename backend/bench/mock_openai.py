@@ -0,0 +1,388 @@
+"""本地 OpenAI 兼容模拟服务，用于无网络环境下的延迟与故障压测。
+
+实现 /v1/chat/completions（流式与非流式，支持图片输入）、/v1/embeddings 与
+/v1/models。可配置首 token 延迟、token 速率、随机错误、限流（429）、挂起与
+流中断，并支持按正则匹配的脚本化回复。将 llm.base_url / vision_llm.base_url
+指向 http://127.0.0.1:<port>/v1 即可端到端测试超时、重试与并发上限。
+
+用法（在 backend 目录下）：
+    uv run python -m bench.mock_openai --port 18080 --ttft-ms 400 --tokens-per-second 30
+    uv run python -m bench.mock_openai --script mock_script.json --error-rate 0.05 --rate-limit-rate 0.1
+
+嵌入接口为 OpenAI 格式；通过 DashScope SDK 调用的多模态嵌入不经过此服务。
+运行期间可通过 GET /_mock/stats 查看统计，PUT /_mock/config 动态调整参数。
+脚本文件格式（JSON）：
+    {"responses": [{"match": "午饭|lunch", "reply": "..."}], "vision_reply": {...}}
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+DEFAULT_REPLY = "好的，我已经了解你的情况。建议保持每日热量缺口在三百到五百千卡之间，并保证蛋白质摄入。"
+
+DEFAULT_VISION_REPLY = {
+    "food_name": "鸡胸肉沙拉",
+    "calories": 320,
+    "confidence": 0.9,
+    "components": [
+        {"name": "鸡胸肉", "weight_g": 120, "calories": 160},
+        {"name": "生菜", "weight_g": 80, "calories": 12},
+    ],
+}
+
+_TOKEN_PATTERN = re.compile(r"\s*(?:[A-Za-z0-9']+|[^\sA-Za-z0-9']{1,2})|\s+$")
+
+
+class MockConfig(BaseModel):
+    ttft_ms: float = Field(default=300.0, ge=0)
+    tokens_per_second: float = Field(default=40.0, ge=0, description="0 表示不限速")
+    vision_latency_ms: float = Field(default=1500.0, ge=0)
+    embedding_latency_ms: float = Field(default=50.0, ge=0)
+    jitter: float = Field(default=0.1, ge=0, le=1, description="延迟随机抖动比例")
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+    rate_limit_rate: float = Field(default=0.0, ge=0, le=1)
+    retry_after_s: float = Field(default=1.0, ge=0)
+    max_concurrency: int = Field(
+        default=0, ge=0, description="超过时返回 429，0 表示不限"
+    )
+    hang_rate: float = Field(default=0.0, ge=0, le=1, description="请求挂起的比例")
+    hang_seconds: float = Field(default=300.0, ge=0)
+    stream_abort_rate: float = Field(
+        default=0.0, ge=0, le=1, description="流式输出中途断开的比例"
+    )
+    embedding_dimension: int = Field(default=1024, ge=1)
+
+
+class ScriptedResponse(BaseModel):
+    match: str
+    reply: Optional[str] = None
+    tool_calls: Optional[list[dict[str, Any]]] = None
+
+
+class MockScript(BaseModel):
+    responses: list[ScriptedResponse] = Field(default_factory=list)
+    default_reply: str = DEFAULT_REPLY
+    vision_reply: dict[str, Any] = Field(
+        default_factory=lambda: dict(DEFAULT_VISION_REPLY)
+    )
+
+
+def split_tokens(text: str) -> list[str]:
+    """近似分词：英文按单词、中文按两个字符一个 token。"""
+    return _TOKEN_PATTERN.findall(text) or [text]
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") for part in content if part.get("type") == "text"
+        )
+    return str(content)
+
+
+def _has_image(messages: list[dict]) -> bool:
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list) and any(
+            part.get("type") in ("image_url", "input_image") for part in content
+        ):
+            return True
+    return False
+
+
+def _error(status: int, message: str, error_type: str, headers: Optional[dict] = None):
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "code": error_type}},
+        headers=headers,
+    )
+
+
+class MockState:
+    def __init__(self, config: MockConfig, script: MockScript, seed: Optional[int]):
+        self.config = config
+        self.script = script
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.stats: Counter = Counter()
+
+    def delay(self, ms: float) -> float:
+        jitter = self.config.jitter
+        return max(0.0, ms / 1000 * (1 + self.random.uniform(-jitter, jitter)))
+
+    def choose_reply(self, messages: list[dict]) -> ScriptedResponse:
+        last_user = next(
+            (_message_text(m) for m in reversed(messages) if m.get("role") == "user"),
+            "",
+        )
+        for item in self.script.responses:
+            if re.search(item.match, last_user):
+                return item
+        return ScriptedResponse(match="", reply=self.script.default_reply)
+
+    def injected_failure(self) -> Optional[JSONResponse]:
+        """按配置概率注入限流或服务端错误。"""
+        config = self.config
+        if config.max_concurrency and self.in_flight > config.max_concurrency:
+            self.stats["concurrency_limited"] += 1
+            return _error(
+                429,
+                "Too many concurrent requests",
+                "rate_limit_exceeded",
+                {"Retry-After": str(config.retry_after_s)},
+            )
+        roll = self.random.random()
+        if roll < config.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return _error(
+                429,
+                "Rate limit reached",
+                "rate_limit_exceeded",
+                {"Retry-After": str(config.retry_after_s)},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            self.stats["errors"] += 1
+            return _error(500, "Injected server error", "server_error")
+        return None
+
+
+def create_app(
+    config: Optional[MockConfig] = None,
+    script: Optional[MockScript] = None,
+    seed: Optional[int] = None,
+) -> "_FaultInjectionMiddleware":
+    """创建模拟服务 ASGI 应用（FastAPI 外包一层故障注入）。"""
+    state = MockState(config or MockConfig(), script or MockScript(), seed)
+    app = FastAPI(title="Mock OpenAI", docs_url=None, redoc_url=None)
+    app.state.mock = state
+    _register_routes(app, state)
+    return _FaultInjectionMiddleware(app, state)
+
+
+class _FaultInjectionMiddleware:
+    """纯 ASGI 包装：统计在途请求（含流式响应全程），并按配置注入故障。"""
+
+    def __init__(self, app: FastAPI, state: MockState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/v1/"):
+            await self.app(scope, receive, send)
+            return
+        state = self.state
+        state.in_flight += 1
+        state.stats["requests"] += 1
+        try:
+            failure = state.injected_failure()
+            if failure is not None:
+                await failure(scope, receive, send)
+                return
+            if state.random.random() < state.config.hang_rate:
+                state.stats["hung"] += 1
+                await asyncio.sleep(state.config.hang_seconds)
+            await self.app(scope, receive, send)
+        finally:
+            state.in_flight -= 1
+
+
+def _register_routes(app: FastAPI, state: MockState) -> None:
+    @app.get("/v1/models")
+    async def list_models():
+        return {
+            "object": "list",
+            "data": [{"id": "mock-chat", "object": "model", "owned_by": "mock"}],
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        messages = body.get("messages", [])
+        model = body.get("model", "mock-chat")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(split_tokens(_message_text(m))) for m in messages)
+
+        if _has_image(messages):
+            state.stats["vision"] += 1
+            await asyncio.sleep(state.delay(state.config.vision_latency_ms))
+            scripted = ScriptedResponse(
+                match="",
+                reply=json.dumps(state.script.vision_reply, ensure_ascii=False),
+            )
+        else:
+            state.stats["chat"] += 1
+            scripted = state.choose_reply(messages)
+
+        text = scripted.reply or ""
+        tokens = split_tokens(text) if text else []
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        finish_reason = "tool_calls" if scripted.tool_calls else "stop"
+        interval = (
+            1 / state.config.tokens_per_second if state.config.tokens_per_second else 0
+        )
+
+        def chunk(delta: dict, finish: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        if body.get("stream"):
+            state.stats["streams"] += 1
+            abort_at = (
+                state.random.randrange(len(tokens) + 1)
+                if tokens and state.random.random() < state.config.stream_abort_rate
+                else None
+            )
+
+            async def event_stream():
+                await asyncio.sleep(state.delay(state.config.ttft_ms))
+                yield chunk({"role": "assistant", "content": ""})
+                for i, token in enumerate(tokens):
+                    if i == abort_at:
+                        state.stats["stream_aborted"] += 1
+                        # 直接结束响应体且不发送 [DONE]，模拟连接中断
+                        return
+                    yield chunk({"content": token})
+                    if interval:
+                        await asyncio.sleep(interval)
+                if scripted.tool_calls:
+                    calls = [
+                        {"index": i, **c} for i, c in enumerate(scripted.tool_calls)
+                    ]
+                    yield chunk({"tool_calls": calls})
+                yield chunk({}, finish_reason)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield (
+                        "data: "
+                        + json.dumps(
+                            {
+                                "id": completion_id,
+                                "object": "chat.completion.chunk",
+                                "created": created,
+                                "model": model,
+                                "choices": [],
+                                "usage": usage,
+                            }
+                        )
+                        + "\n\n"
+                    )
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        await asyncio.sleep(state.delay(state.config.ttft_ms) + interval * len(tokens))
+        message: dict[str, Any] = {"role": "assistant", "content": text or None}
+        if scripted.tool_calls:
+            message["tool_calls"] = scripted.tool_calls
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ],
+            "usage": usage,
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(body: dict):
+        state.stats["embeddings"] += 1
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimension = int(body.get("dimensions") or state.config.embedding_dimension)
+        await asyncio.sleep(state.delay(state.config.embedding_latency_ms))
+
+        data = []
+        for index, item in enumerate(inputs):
+            seed = int.from_bytes(
+                hashlib.blake2b(str(item).encode(), digest_size=8).digest()
+            )
+            vector = np.random.default_rng(seed).standard_normal(dimension)
+            vector /= np.linalg.norm(vector)
+            data.append(
+                {"object": "embedding", "index": index, "embedding": vector.tolist()}
+            )
+        total = sum(len(split_tokens(str(item))) for item in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "mock-embedding"),
+            "usage": {"prompt_tokens": total, "total_tokens": total},
+        }
+
+    @app.get("/_mock/stats")
+    async def get_stats():
+        return {"in_flight": state.in_flight, **state.stats}
+
+    @app.get("/_mock/config", response_model=MockConfig)
+    async def get_config():
+        return state.config
+
+    @app.put("/_mock/config", response_model=MockConfig)
+    async def update_config(update: dict):
+        state.config = MockConfig(**{**state.config.model_dump(), **update})
+        return state.config
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--script", type=Path, help="脚本化回复 JSON 文件")
+    parser.add_argument(
+        "--seed", type=int, default=None, help="随机种子（复现故障注入序列）"
+    )
+    for name, field in MockConfig.model_fields.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(field.default),
+            default=field.default,
+            help=field.description,
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    config = MockConfig(
+        **{name: getattr(args, name) for name in MockConfig.model_fields}
+    )
+    script = (
+        MockScript.model_validate_json(args.script.read_text(encoding="utf-8"))
+        if args.script
+        else MockScript()
+    )
+    uvicorn.run(create_app(config, script, args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""后端吞吐与延迟基准测试。
+
+在进程内启动 FastAPI 应用（uvicorn，独立线程与事件循环），上游依赖全部替换为
+bench/fakes.py 中的替身，对登录、体重、食物检索、图片识别与流式聊天接口施加
+并发负载，输出 p50/p95/p99 延迟、吞吐量与内存占用的 JSON 结果，便于对比提交。
+
+用法（在 backend 目录下）：
+    uv run python -m bench.run --concurrency 20 --requests 200 --output bench-results.json
+    uv run python -m bench.run --database-url postgresql://... --scenarios chat_stream,weight
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_IMAGE = BACKEND_DIR / "data" / "test_salad.jpg"
+SEARCH_QUERIES = ["chicken breast", "brown rice", "apple", "salmon", "kale", "oatmeal"]
+CHAT_MESSAGES = [
+    "今天午饭吃什么比较好？",
+    "我这周体重没怎么降，怎么办？",
+    "晚上饿了能吃什么？",
+]
+
+
+def rss_mb() -> Optional[float]:
+    """当前进程常驻内存（MB），不支持的平台返回 None。"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 返回字节，Linux 返回 KB
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def summarize(values: list[float]) -> Optional[dict]:
+    if not values:
+        return None
+    ms = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "mean": round(float(ms.mean()), 2),
+        "max": round(float(ms.max()), 2),
+    }
+
+
+@dataclass
+class ScenarioResult:
+    latencies: list[float] = field(default_factory=list)
+    ttfb: list[float] = field(default_factory=list)
+    errors: int = 0
+    status_codes: dict[str, int] = field(default_factory=dict)
+
+    def record_status(self, status: int) -> None:
+        key = str(status)
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+
+@dataclass
+class BenchUser:
+    username: str
+    password: str
+    token: str = ""
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+Scenario = Callable[[httpx.AsyncClient, BenchUser, ScenarioResult], Awaitable[None]]
+
+
+async def scenario_login(client, user, result):
+    start = time.perf_counter()
+    response = await client.post(
+        "/user/login", json={"username": user.username, "password": user.password}
+    )
+    result.latencies.append(time.perf_counter() - start)
+    result.record_status(response.status_code)
+
+
+_weight_counter = itertools.count()
+
+
+async def scenario_weight(client, user, result):
+    # 读写 1:1 交替
+    start = time.perf_counter()
+    if next(_weight_counter) % 2:
+        response = await client.get("/weight", headers=user.headers)
+    else:
+        response = await client.post(
+            "/weight", json={"weight_kg": 70 + np.random.rand()}, headers=user.headers
+        )
+    result.latencies.append(time.perf_counter() - start)
+    result.record_status(response.status_code)
+
+
+async def scenario_food_search(client, user, result):
+    query = SEARCH_QUERIES[np.random.randint(len(SEARCH_QUERIES))]
+    start = time.perf_counter()
+    response = await client.get("/food/search", params={"query": query, "limit": 10})
+    result.latencies.append(time.perf_counter() - start)
+    result.record_status(response.status_code)
+
+
+async def scenario_recognize(client, user, result):
+    files = {"file": ("salad.jpg", SAMPLE_IMAGE.read_bytes(), "image/jpeg")}
+    start = time.perf_counter()
+    response = await client.post(
+        "/food-analysis/recognize", files=files, headers=user.headers
+    )
+    result.latencies.append(time.perf_counter() - start)
+    result.record_status(response.status_code)
+
+
+async def scenario_chat_stream(client, user, result):
+    message = CHAT_MESSAGES[np.random.randint(len(CHAT_MESSAGES))]
+    start = time.perf_counter()
+    first = None
+    async with client.stream(
+        "POST", "/chat/stream", json={"message": message}, headers=user.headers
+    ) as response:
+        async for _ in response.aiter_bytes():
+            if first is None:
+                first = time.perf_counter() - start
+    result.latencies.append(time.perf_counter() - start)
+    if first is not None:
+        result.ttfb.append(first)
+    result.record_status(response.status_code)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "login": scenario_login,
+    "weight": scenario_weight,
+    "food_search": scenario_food_search,
+    "recognize": scenario_recognize,
+    "chat_stream": scenario_chat_stream,
+}
+
+
+def configure_environment(args) -> None:
+    """必须在导入 src 之前设置，配置在首次 get_settings() 时读取。"""
+    os.environ["LOSS_DATABASE__URL"] = args.database_url
+    os.environ.setdefault("LOSS_LOGGING__LEVEL", "WARNING")
+    os.environ.setdefault("LOSS_LOGGING__ENABLE_FILE", "false")
+
+
+def build_app(args):
+    """导入应用并以替身替换全部上游依赖（不执行 lifespan 中的真实初始化）。"""
+    from bench.fakes import (
+        FakeEmbeddingService,
+        FakeFoodSearch,
+        FakeLLMAgent,
+        FakeObjectStorage,
+        FakeVectorIndex,
+    )
+    from src.app import app
+    from src.core.database import init_db
+    from src.core.metrics import InstrumentedProxy
+    from src.services import food_analysis_service
+
+    init_db()
+    embedding = FakeEmbeddingService(latency_ms=args.embedding_ms)
+    index = FakeVectorIndex(embedding, latency_ms=args.vector_ms)
+    services = app.state.services
+    services.provide(
+        "food_search",
+        FakeFoodSearch(
+            InstrumentedProxy(embedding, service="embedding"),
+            InstrumentedProxy(index, service="milvus"),
+        ),
+    )
+    services.provide("embedding", InstrumentedProxy(embedding, service="embedding"))
+    services.provide(
+        "agent",
+        InstrumentedProxy(
+            FakeLLMAgent(
+                ttft_ms=args.llm_ttft_ms,
+                tokens_per_second=args.llm_tokens_per_second,
+                vision_latency_ms=args.vision_ms,
+            ),
+            service="llm",
+        ),
+    )
+    food_analysis_service.get_minio_client = FakeObjectStorage(
+        latency_ms=args.storage_ms
+    )
+    return app
+
+
+class ServerThread(threading.Thread):
+    """在独立线程与事件循环中运行 uvicorn，避免与压测客户端争用同一循环。"""
+
+    def __init__(self, app):
+        super().__init__(daemon=True)
+        import uvicorn
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, lifespan="off", log_level="warning", access_log=False)
+        )
+
+    def run(self):
+        asyncio.run(self.server.serve(sockets=[self.sock]))
+
+    def wait_started(self, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.is_alive():
+                raise RuntimeError("基准服务启动失败")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join(timeout=10)
+
+
+async def create_users(client: httpx.AsyncClient, count: int) -> list[BenchUser]:
+    run_id = datetime.now().strftime("%H%M%S")
+    users = [BenchUser(f"bench_{run_id}_{i}", "bench-password") for i in range(count)]
+    for user in users:
+        await client.post(
+            "/user/register",
+            json={"username": user.username, "password": user.password},
+        )
+        response = await client.post(
+            "/user/login", json={"username": user.username, "password": user.password}
+        )
+        response.raise_for_status()
+        user.token = response.json()["access_token"]
+    return users
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    users: list[BenchUser],
+    requests: int,
+    concurrency: int,
+) -> tuple[ScenarioResult, float]:
+    result = ScenarioResult()
+    counter = itertools.count()
+
+    async def worker(worker_id: int):
+        while next(counter) < requests:
+            user = users[worker_id % len(users)]
+            try:
+                await scenario(client, user, result)
+            except httpx.HTTPError:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return result, time.perf_counter() - start
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    app = build_app(args)
+    server = ServerThread(app)
+    server.start()
+    server.wait_started()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "fakes": {
+                "llm_ttft_ms": args.llm_ttft_ms,
+                "llm_tokens_per_second": args.llm_tokens_per_second,
+                "vision_ms": args.vision_ms,
+                "embedding_ms": args.embedding_ms,
+                "vector_ms": args.vector_ms,
+                "storage_ms": args.storage_ms,
+            },
+        },
+        "scenarios": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{server.port}", limits=limits, timeout=120
+        ) as client:
+            users = await create_users(client, args.users)
+            for name in args.scenarios:
+                scenario = SCENARIOS[name]
+                if args.warmup:
+                    await run_scenario(
+                        client, scenario, users, args.warmup, args.concurrency
+                    )
+                rss_before = rss_mb()
+                result, elapsed = await run_scenario(
+                    client, scenario, users, args.requests, args.concurrency
+                )
+                completed = len(result.latencies)
+                latency = summarize(result.latencies)
+                throughput = round(completed / elapsed, 2) if elapsed else 0
+                report["scenarios"][name] = {
+                    "requests": completed,
+                    "errors": result.errors,
+                    "status_codes": result.status_codes,
+                    "duration_s": round(elapsed, 3),
+                    "throughput_rps": throughput,
+                    "latency_ms": latency,
+                    "ttfb_ms": summarize(result.ttfb),
+                    "rss_mb_before": rss_before,
+                    "rss_mb_after": rss_mb(),
+                }
+                p50 = latency["p50"] if latency else "-"
+                p99 = latency["p99"] if latency else "-"
+                print(
+                    f"{name:12s} {completed:5d} req {throughput:8.1f} rps "
+                    f"p50={p50}ms p99={p99}ms errors={result.errors}"
+                )
+    finally:
+        server.stop()
+    report["meta"]["peak_rss_mb"] = rss_mb()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LoseWeightEasily 后端基准测试")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="数据库 URL，默认使用临时 SQLite 文件（每次运行全新）",
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=20, help="每个场景的预热请求数")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--vision-ms", type=float, default=1500.0)
+    parser.add_argument("--embedding-ms", type=float, default=50.0)
+    parser.add_argument("--vector-ms", type=float, default=10.0)
+    parser.add_argument("--storage-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+    if args.database_url is None:
+        db_file = Path(tempfile.mkdtemp(prefix="loseweight-bench-")) / "bench.db"
+        args.database_url = f"sqlite:///{db_file}"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    sys.path.insert(0, str(BACKEND_DIR))
+    report = asyncio.run(run(args))
+    Path(args.output).write_text(
+        json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
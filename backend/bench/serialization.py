@@ -0,0 +1,157 @@
+"""只读列表接口的 JSON 序列化开销基准（每 1,000 行）。
+
+对比同一批数据的几种"读取 + 响应模型 + JSON"路径，输出每 1,000 行的耗时（ms）：
+
+- orm：读取 ORM 实体后按 from_attributes 校验（优化前的 /weight、/food-logs/today）
+- columns：只取响应字段并以普通字典返回，从 dict 校验（当前路径）
+- stdlib：jsonable_encoder + json.dumps，即自定义 response_class 时 FastAPI
+  的通用路径，作为对照
+- orjson：model_dump + orjson.dumps（未安装 orjson 时跳过）
+
+后两者说明为何不把 ORJSONResponse 设为应用默认：FastAPI 在声明 response_model
+且未指定 response_class 时直接由 pydantic-core 输出 JSON 字节，自定义默认
+response_class 反而会退回先转 Python 对象再编码的路径。
+
+用法（在 backend 目录下）：
+    uv run python -m bench.serialization --rows 1000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(fn: Callable[[], bytes], rows: int, repeat: int) -> float:
+    """取多轮中的最小值，换算为每 1,000 行的毫秒数。"""
+    fn()
+    best = min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat
+    return round(best * 1000 * 1000 / rows, 3)
+
+
+def build_cases(session, user_id: int) -> dict[str, Callable[[], bytes]]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlmodel import select
+
+    from src.models import FoodLog, WeightRecord
+    from src.repositories.projection import fetch_dicts, select_fields
+    from src.schemas.food_log import FoodLogRead
+    from src.schemas.weight import WeightRead
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    cases = {}
+    for name, model, schema in (
+        ("weights", WeightRecord, WeightRead),
+        ("food_logs", FoodLog, FoodLogRead),
+    ):
+        adapter = TypeAdapter(list[schema])
+        entities = select(model).where(model.user_id == user_id)
+        columns = select_fields(model, schema.model_fields).where(
+            model.user_id == user_id
+        )
+
+        def orm(adapter=adapter, statement=entities):
+            # 每轮清空 identity map，模拟新请求的新会话
+            session.expunge_all()
+            rows = session.exec(statement).all()
+            return adapter.dump_json(adapter.validate_python(rows))
+
+        def rows(adapter=adapter, statement=columns):
+            rows = fetch_dicts(session, statement)
+            return adapter.dump_json(adapter.validate_python(rows))
+
+        def stdlib(adapter=adapter, statement=columns):
+            rows = adapter.validate_python(fetch_dicts(session, statement))
+            return json.dumps(jsonable_encoder(rows), ensure_ascii=False).encode()
+
+        cases[f"{name}.orm"] = orm
+        cases[f"{name}.columns"] = rows
+        cases[f"{name}.stdlib"] = stdlib
+        if orjson is not None:
+
+            def fast(adapter=adapter, statement=columns):
+                rows = adapter.validate_python(fetch_dicts(session, statement))
+                return orjson.dumps(adapter.dump_python(rows))
+
+            cases[f"{name}.orjson"] = fast
+    return cases
+
+
+def seed(session, rows: int) -> int:
+    from src.models import FoodLog, User, WeightRecord
+
+    user = User(username="bench_serialization", hashed_password="x")
+    session.add(user)
+    session.commit()
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    session.add_all(
+        WeightRecord(
+            user_id=user.id,
+            weight_kg=80 - i / 100,
+            recorded_at=start + timedelta(hours=i),
+            notes="晨起空腹",
+        )
+        for i in range(rows)
+    )
+    session.add_all(
+        FoodLog(
+            user_id=user.id,
+            food_name=f"食物{i}",
+            calories=100 + i % 400,
+            protein_g=5.5,
+            carbs_g=20.0,
+            fat_g=3.2,
+            timestamp=start + timedelta(minutes=i),
+        )
+        for i in range(rows)
+    )
+    session.commit()
+    return user.id
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="响应序列化开销基准")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20, help="每轮执行次数")
+    parser.add_argument("--output", default=None, help="可选：写入 JSON 结果")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("LOSS_DATABASE__URL", "sqlite://")
+    os.environ.setdefault("LOSS_LOGGING__ENABLE_FILE", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from sqlmodel import Session, SQLModel, create_engine
+
+    import src.models  # noqa: F401  注册全部表
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user_id = seed(session, args.rows)
+        report = {
+            name: measure(fn, args.rows, args.repeat)
+            for name, fn in build_cases(session, user_id).items()
+        }
+
+    for name, ms in report.items():
+        print(f"{name:20s} {ms:8.3f} ms / 1k rows")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from ..core import profiling
+from ..core.config import get_settings
+from ..core.security import verify_api_key
+from ..schemas.profiling import MemorySnapshotReport
+
+
+def require_profiling() -> None:
+    """剖析接口默认关闭；未开启或未配置 API Key 时表现为不存在。"""
+    settings = get_settings()
+    if not settings.profiling.enabled or not settings.security.api_key:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+router = APIRouter(
+    prefix="/admin/profile",
+    tags=["admin"],
+    include_in_schema=False,
+    dependencies=[Depends(require_profiling), Depends(verify_api_key)],
+)
+
+
+@router.post("/cpu")
+async def profile_cpu(
+    seconds: float = Query(5, gt=0),
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+):
+    """对运行中的进程做限时采样 CPU 剖析，返回 collapsed stack 文本或 pstats 文件。"""
+    settings = get_settings().profiling
+    seconds = min(seconds, settings.max_cpu_seconds)
+    interval = settings.sample_interval_ms / 1000
+    try:
+        # 在线程中采样，事件循环在此期间照常处理请求（也正是被采样的对象）
+        stacks, _ = await asyncio.to_thread(profiling.sample_stacks, seconds, interval)
+    except profiling.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "pstats":
+        return Response(
+            content=profiling.to_pstats(stacks, interval),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="cpu.pstats"'},
+        )
+    return PlainTextResponse(profiling.to_collapsed(stacks))
+
+
+@router.post("/memory/start")
+def start_memory_tracing():
+    """开启 tracemalloc（会带来一定的内存与性能开销）。"""
+    started = profiling.start_tracemalloc(get_settings().profiling.tracemalloc_frames)
+    return {"tracing": True, "started": started}
+
+
+@router.post("/memory/snapshot", response_model=MemorySnapshotReport)
+def take_memory_snapshot(top: int = Query(20, ge=1, le=200)):
+    """拍摄内存快照，返回分配最多的代码位置及与上一次快照的差异。"""
+    try:
+        return profiling.take_memory_snapshot(top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    """关闭 tracemalloc 并丢弃保存的快照。"""
+    profiling.stop_tracemalloc()
+    return {"tracing": False}
@@ -1,18 +1,32 @@
 import json
 import logging
-from typing import List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlmodel import Session
-
-from ..core.database import get_session
-from ..core.security import get_current_user
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import get_settings
+from ..core.database import get_async_session
+from ..core.etag import make_etag, not_modified
+from ..core.metrics import track_sse_stream
+from ..core.security import get_current_user_async
+from ..core.service_registry import get_service
+from ..core.shutdown import drain_stream
 from ..models import ChatMessage, User
-from ..repositories.weight_repository import WeightRepository
-from ..repositories.chat_repository import ChatRepository
-from ..services.weight_service import WeightService
+from ..schemas.chat import ChatMessageRead
+from ..repositories.weight_repository import AsyncWeightRepository
+from ..repositories.food_log_repository import AsyncFoodLogRepository
+from ..repositories.chat_repository import AsyncChatRepository
+from ..repositories.sync_repository import AsyncSyncRepository
+from ..services.user_context_service import FALLBACK_PROMPT, AsyncUserContextService
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from ..services.answer_cache_service import ProfileBucket
 
 logger = logging.getLogger("loseweight.api.chat")
 
@@ -31,65 +45,121 @@ def _encode_sse(event_type: str, data: str | None = "") -> str:
 
 class ChatRequest(BaseModel):
     message: str
+    # false 时跳过语义答案缓存（既不读取也不写入）
+    use_cache: bool = True
 
 
 class ChatResponse(BaseModel):
     reply: str
 
 
-def get_weight_service(session: Session = Depends(get_session)) -> WeightService:
-    return WeightService(WeightRepository(session))
+def get_user_context_service(
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncUserContextService:
+    return AsyncUserContextService(
+        AsyncWeightRepository(session),
+        AsyncFoodLogRepository(session),
+        AsyncSyncRepository(session),
+    )
 
 
-def get_chat_repo(session: Session = Depends(get_session)) -> ChatRepository:
-    return ChatRepository(session)
+def get_chat_repo(
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncChatRepository:
+    return AsyncChatRepository(session)
 
 
-def _build_user_info(user, weight_service: WeightService) -> str:
-    """构建用户信息上下文字符串。"""
-    try:
-        if user:
-            # 获取最新体重记录
-            latest_records = weight_service.get_records(user.id, limit=1)
-            current_weight = (
-                latest_records[0].weight_kg
-                if latest_records
-                else user.initial_weight_kg
-            )
+@dataclass
+class _Turn:
+    """一轮对话的上下文。"""
 
-            # 检查关键信息是否缺失
-            missing_info = []
-            if not user.height_cm:
-                missing_info.append("身高")
-            if not current_weight:
-                missing_info.append("体重")
-            if not user.age:
-                missing_info.append("年龄")
-            if not user.gender:
-                missing_info.append("性别")
-            if not user.activity_level:
-                missing_info.append("活动水平")
-
-            if missing_info:
-                return f"提示：当前用户资料不完整（缺失：{', '.join(missing_info)}）。请引导用户补充这些信息，以便计算 TDEE 并制定个性化减重计划。"
-
-            return (
-                f"用户信息：姓名 {user.name}, 性别 {user.gender}, 当前体重 {current_weight}kg, "
-                f"身高 {user.height_cm}cm, 年龄 {user.age}, "
-                f"活动水平 {user.activity_level}, "
-                f"TDEE {user.tdee or 0:.0f}kcal, "
-                f"目标体重 {user.target_weight_kg}kg。"
-            )
-    except Exception as e:
-        logger.error(f"构建用户信息上下文失败: {e}", exc_info=True)
-    return "提示：无法获取用户详细资料。请礼貌地询问用户的身体基本信息（身高、体重、年龄、活动量等）。"
+    user_info: str
+    history: list[dict]
+    # 对话结束后嵌入新消息用，嵌入服务不可用时为 None
+    embedding: Any = None
+    # 命中语义答案缓存时的回答
+    cached: Optional[str] = None
+    # 可缓存的问题未命中时的向量与画像分组，用于在后台生成缓存回答
+    cache_query: Optional["np.ndarray"] = None
+    bucket: Optional["ProfileBucket"] = None
+
+    def fill_cache(self, agent: Any, question: str) -> None:
+        if self.cache_query is not None:
+            from ..services.answer_cache_service import answer_cache
+
+            answer_cache.fill(agent, self.bucket, self.cache_query, question)
 
+    def remember(self, user_id: int, records: List[ChatMessage]) -> None:
+        from ..services.chat_memory_service import chat_memory
+
+        chat_memory.remember(self.embedding, user_id, records)
+
+
+async def _prepare_turn(
+    endpoint: str,
+    request: Request,
+    user: User,
+    request_data: ChatRequest,
+    context_service: AsyncUserContextService,
+    chat_repo: AsyncChatRepository,
+) -> _Turn:
+    """先查语义答案缓存；未命中时组装提示：用户信息（附相关早期对话）与最近窗口内的历史消息。"""
+    # 长期记忆与答案缓存依赖 NumPy，首轮对话时才导入，不拖慢进程启动
+    from ..services.answer_cache_service import answer_cache, profile_bucket
+    from ..services.chat_memory_service import chat_memory, format_memories
+    from ..services.query_embedding import embed_query
+
+    settings = get_settings()
+    memory = settings.memory
+    question = request_data.message
+
+    snapshot = await context_service.find_snapshot(user)
+    user_info = snapshot.to_prompt() if snapshot is not None else FALLBACK_PROMPT
+    # 长期记忆关闭时沿用携带全部历史的行为
+    window = memory.history_window if memory.enabled else None
+    history_rows = await chat_repo.get_history_rows(
+        user.id, ("id", "role", "content"), limit=window
+    )
+    # 转换为 OpenAI 格式
+    history = [{"role": h["role"], "content": h["content"]} for h in history_rows]
+
+    # 窗口未满说明没有更早的消息，无需召回
+    need_recall = memory.enabled and len(history_rows) >= memory.history_window
+    cacheable = request_data.use_cache and answer_cache.accepts(question)
+    embedding = query = None
+    if memory.enabled or cacheable:
+        embedding = await get_service(request, "embedding")
+    if embedding is not None and (need_recall or cacheable):
+        # 召回与缓存共用同一个问题向量
+        query = await embed_query(
+            embedding, question, settings.embedding.query_timeout_s
+        )
+
+    turn = _Turn(user_info, history, embedding)
+    if cacheable and query is not None:
+        bucket = profile_bucket(snapshot)
+        turn.cached = answer_cache.lookup(endpoint, bucket, query)
+        if turn.cached is not None:
+            return turn
+        turn.cache_query, turn.bucket = query, bucket
+    else:
+        answer_cache.bypass(endpoint)
+
+    if need_recall and query is not None:
+        memories = await chat_memory.recall(
+            chat_repo, user.id, query, before_id=history_rows[0]["id"]
+        )
+        turn.user_info += format_memories(memories)
+    return turn
 
-@router.get("/history", response_model=List[ChatMessage])
+
+@router.get("/history", response_model=List[ChatMessageRead])
 async def get_chat_history(
+    request: Request,
+    response: Response,
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    chat_repo: ChatRepository = Depends(get_chat_repo),
+    current_user: User = Depends(get_current_user_async),
+    chat_repo: AsyncChatRepository = Depends(get_chat_repo),
 ):
     """获取当前用户的聊天历史记录。"""
     user = current_user
@@ -97,19 +167,25 @@ async def get_chat_history(
         raise HTTPException(status_code=404, detail="用户不存在")
 
     safe_limit = max(1, min(limit, 100))
-    return chat_repo.get_history(user.id, limit=safe_limit)
+    version = await chat_repo.get_version(user.id)
+    etag = make_etag("chat/history", user.id, version, safe_limit)
+    if cached := not_modified(request, response, etag):
+        return cached
+    return await chat_repo.get_history_rows(
+        user.id, ChatMessageRead.model_fields, limit=safe_limit
+    )
 
 
 @router.post("", response_model=ChatResponse)
 async def chat_with_coach(
     request_data: ChatRequest,
     request: Request,
-    current_user: User = Depends(get_current_user),
-    weight_service: WeightService = Depends(get_weight_service),
-    chat_repo: ChatRepository = Depends(get_chat_repo),
+    current_user: User = Depends(get_current_user_async),
+    context_service: AsyncUserContextService = Depends(get_user_context_service),
+    chat_repo: AsyncChatRepository = Depends(get_chat_repo),
 ):
     """非流式聊天端点（支持历史记录和持久化）。"""
-    agent = request.app.state.agent
+    agent = await get_service(request, "agent")
     if not agent:
         raise HTTPException(status_code=503, detail="AI Agent 未初始化")
 
@@ -117,25 +193,27 @@ async def chat_with_coach(
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
-    user_info = _build_user_info(user, weight_service)
-
-    # 获取历史记录并转换为 OpenAI 格式
-    history_objs = chat_repo.get_history(user.id, limit=None)
-    history = [{"role": h.role, "content": h.content} for h in history_objs]
+    turn = await _prepare_turn(
+        "/chat", request, user, request_data, context_service, chat_repo
+    )
 
     try:
-        reply = await agent.get_guidance_direct(
-            question=request_data.message,
-            user_info=user_info,
-            history=history,
-            user_id=user.id,
-        )
+        reply = turn.cached
+        if reply is None:
+            reply = await agent.get_guidance_direct(
+                question=request_data.message,
+                user_info=turn.user_info,
+                history=turn.history,
+                user_id=user.id,
+            )
 
         # 单事务写入，降低提交开销
-        chat_repo.add_messages(
+        records = await chat_repo.add_messages(
             user.id,
             [("user", request_data.message), ("assistant", reply)],
         )
+        turn.remember(user.id, records)
+        turn.fill_cache(agent, request_data.message)
 
         return ChatResponse(reply=reply)
     except Exception as e:
@@ -147,12 +225,12 @@ async def chat_with_coach(
 async def chat_stream(
     request_data: ChatRequest,
     request: Request,
-    current_user: User = Depends(get_current_user),
-    weight_service: WeightService = Depends(get_weight_service),
-    chat_repo: ChatRepository = Depends(get_chat_repo),
+    current_user: User = Depends(get_current_user_async),
+    context_service: AsyncUserContextService = Depends(get_user_context_service),
+    chat_repo: AsyncChatRepository = Depends(get_chat_repo),
 ):
     """SSE 流式聊天端点（带记忆持久化）。"""
-    agent = request.app.state.agent
+    agent = await get_service(request, "agent")
     if not agent:
         raise HTTPException(status_code=503, detail="AI Agent 未初始化")
 
@@ -160,28 +238,42 @@ async def chat_stream(
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
-    user_info = _build_user_info(user, weight_service)
+    turn = await _prepare_turn(
+        "/chat/stream", request, user, request_data, context_service, chat_repo
+    )
+
+    async def agent_events():
+        if turn.cached is None:
+            async for event in agent.chat_stream(
+                message=request_data.message,
+                user_info=turn.user_info,
+                history=turn.history,
+                user_id=user.id,
+            ):
+                yield event
+            return
+        # 命中答案缓存：按 text 事件回放，客户端无需区分
+        from ..services.answer_cache_service import replay_chunks
 
-    # 获取历史记录
-    history_objs = chat_repo.get_history(user.id, limit=None)
-    history = [{"role": h.role, "content": h.content} for h in history_objs]
+        chunk_chars = get_settings().answer_cache.replay_chunk_chars
+        for chunk in replay_chunks(turn.cached, chunk_chars):
+            yield {"event": "text", "data": chunk}
+        yield {"event": "done", "data": ""}
 
     async def event_generator():
         full_reply = ""
+        used_tools = False
         done_sent = False
         try:
-            async for event in agent.chat_stream(
-                message=request_data.message,
-                user_info=user_info,
-                history=history,
-                user_id=user.id,
-            ):
+            async for event in agent_events():
                 event_type = event.get("event", "text")
                 data = event.get("data", "")
 
                 if event_type == "text":
                     full_reply += str(data)
                 elif event_type == "action_result":
+                    # 调用过工具（记录饮食、查询数据等）说明问题与用户数据相关，不缓存
+                    used_tools = True
                     data = json.dumps(data, ensure_ascii=False)
                 elif event_type == "usage":
                     data = json.dumps(data, ensure_ascii=False)
@@ -195,17 +287,22 @@ async def chat_stream(
             payload: list[tuple[str, str]] = [("user", request_data.message)]
             if full_reply:
                 payload.append(("assistant", full_reply))
-            chat_repo.add_messages(user.id, payload)
+            records = await chat_repo.add_messages(user.id, payload)
+            turn.remember(user.id, records)
+            if not used_tools:
+                turn.fill_cache(agent, request_data.message)
 
         except Exception as e:
             logger.error(f"流式响应生成出错: {e}")
             yield _encode_sse("error", str(e))
-        finally:
-            if not done_sent:
-                yield _encode_sse("done", "")
+        # 不放在 finally 中：被取消（客户端断开或服务退出）时不能再 yield
+        if not done_sent:
+            yield _encode_sse("done", "")
 
+    # 服务退出收尾时主动结束流，提示客户端稍后重试
+    farewell = _encode_sse("error", "服务正在重启，请稍后重试") + _encode_sse("done")
     return StreamingResponse(
-        event_generator(),
+        track_sse_stream("/chat/stream", drain_stream(event_generator(), farewell)),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache, no-transform",
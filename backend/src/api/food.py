@@ -1,25 +1,57 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, File
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from typing import Optional
 
+from ..services.food_catalog_service import get_food_catalog
 from ..services.food_service import FoodService
 from ..core.config import get_settings
-
-from LoseWeightAgent.src.schemas import FoodNutritionSearchResult
+from ..core.etag import not_modified
+from ..core.service_registry import get_service
+from ..schemas.food import FoodCatalog, FoodSearchResult
 
 router = APIRouter(prefix="/food", tags=["food"])
 settings = get_settings()
 
 
-def get_food_service(request: Request) -> FoodService:
-    food_search = request.app.state.food_search
+async def get_food_service(request: Request) -> FoodService:
+    food_search = await get_service(request, "food_search")
     if food_search is None:
-        from fastapi import HTTPException
-
         raise HTTPException(status_code=503, detail="食物检索服务未初始化")
     return FoodService(food_search=food_search)
 
 
-@router.get("/search", response_model=list[FoodNutritionSearchResult])
+@router.get(
+    "/catalog",
+    response_class=Response,
+    responses={200: {"model": FoodCatalog, "description": "全量快照或增量"}},
+)
+def get_catalog(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(
+        default=None, description="客户端当前的目录版本，提供时返回增量"
+    ),
+):
+    """离线食物目录（预压缩），客户端据此在本地做联想输入。"""
+    try:
+        catalog = get_food_catalog()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=503, detail="食物目录不可用") from e
+    # ETag 为内容哈希：客户端携带当前版本的 If-None-Match 时直接返回 304
+    if cached := not_modified(request, response, f'"{catalog.version}"'):
+        return cached
+    return catalog.body(since).response(request, headers=response.headers)
+
+
+@router.get("/search", response_model=list[FoodSearchResult])
 def search_food(
     query: str,
     limit: Optional[int] = None,
@@ -30,7 +62,7 @@ def search_food(
     return service.search_by_text(query, search_limit)
 
 
-@router.post("/image", response_model=list[FoodNutritionSearchResult])
+@router.post("/image", response_model=list[FoodSearchResult])
 async def search_food_by_image(
     file: UploadFile = File(...),
     limit: Optional[int] = None,
@@ -1,21 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
+from ..core.security import get_current_user_async
+from ..core.service_registry import get_service
+from ..models import User
 from ..schemas.food_analysis import FoodRecognitionResponse
 from ..services.food_analysis_service import FoodAnalysisService
 
 router = APIRouter(prefix="/food-analysis", tags=["food-analysis"])
 
 
-def get_food_analysis_service(request: Request) -> FoodAnalysisService:
-    return FoodAnalysisService(agent=request.app.state.agent)
+async def get_food_analysis_service(request: Request) -> FoodAnalysisService:
+    return FoodAnalysisService(agent=await get_service(request, "agent"))
 
 
 @router.post("/recognize", response_model=FoodRecognitionResponse)
 async def recognize_food(
     file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user_async),
     service: FoodAnalysisService = Depends(get_food_analysis_service),
 ):
     try:
         image_data = await file.read()
-        return await service.analyze_food_image(image_data)
+        return await service.analyze_food_image(image_data, current_user.id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
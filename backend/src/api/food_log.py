@@ -1,64 +1,81 @@
-from datetime import datetime, time, timezone, timedelta
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import Session
 
 from ..core.database import get_session
-from ..models import FoodLog, User
-from ..schemas.food_log import FoodLogCreate, FoodLogRead
+from ..core.etag import make_etag, not_modified
+from ..core.security import get_current_user
+from ..core.timezones import local_today
+from ..models import User
+from ..repositories.food_log_repository import FoodLogRepository
+from ..schemas.food_log import (
+    FoodLogBatchCreate,
+    FoodLogBatchResult,
+    FoodLogCreate,
+    FoodLogRead,
+    FoodLogSummary,
+)
+from ..services.food_log_service import FoodLogService
 
 router = APIRouter(prefix="/food-logs", tags=["food-logs"])
 
 
-def get_current_user_id(session: Session = Depends(get_session)) -> int:
-    """Mock helper to get the first user's ID for simplicity in this project."""
-    user = session.exec(select(User)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.id
+def get_food_log_service(session: Session = Depends(get_session)) -> FoodLogService:
+    return FoodLogService(FoodLogRepository(session))
 
 
 @router.post("", response_model=FoodLogRead)
 def create_food_log(
     data: FoodLogCreate,
-    user_id: int = Depends(get_current_user_id),
-    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    service: FoodLogService = Depends(get_food_log_service),
 ):
     """记录一次食物摄入。"""
-    log = FoodLog(
-        user_id=user_id,
-        food_name=data.food_name,
-        calories=data.calories,
-        timestamp=data.timestamp or datetime.now(timezone.utc),
-    )
-    session.add(log)
-    session.commit()
-    session.refresh(log)
-    return log
+    return service.log_food(current_user, data)
+
+
+@router.post("/batch", response_model=FoodLogBatchResult)
+def create_food_logs_batch(
+    data: FoodLogBatchCreate,
+    current_user: User = Depends(get_current_user),
+    service: FoodLogService = Depends(get_food_log_service),
+):
+    """批量记录食物摄入（离线同步），全部成功或全部失败。"""
+    return FoodLogBatchResult(ids=service.log_foods(current_user, data.items))
 
 
 @router.get("/today", response_model=List[FoodLogRead])
 def get_today_logs(
-    user_id: int = Depends(get_current_user_id),
-    session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    service: FoodLogService = Depends(get_food_log_service),
 ):
-    """获取今日的所有食物摄入记录。"""
-    now = datetime.now(timezone.utc)
-    # 简单的本地时间起始计算
-    start_of_day = datetime.combine(now.date(), time.min, tzinfo=timezone.utc)
-    end_of_day = start_of_day + timedelta(days=1)
-
-    statement = (
-        select(FoodLog)
-        .where(
-            and_(
-                FoodLog.user_id == user_id,
-                FoodLog.timestamp >= start_of_day,
-                FoodLog.timestamp < end_of_day,
-            )
-        )
-        .order_by(FoodLog.timestamp.asc())
+    """获取今日（用户本地时区）的所有食物摄入记录。"""
+    # 本地日期与时区也参与 ETag：跨过午夜或修改时区后“今日”范围不同
+    etag = make_etag(
+        "food-logs/today",
+        current_user.id,
+        service.get_version(current_user.id),
+        current_user.timezone,
+        local_today(current_user.timezone),
     )
+    if cached := not_modified(request, response, etag):
+        return cached
+    return service.get_today_logs(current_user)
+
 
-    return session.exec(statement).all()
+@router.get("/summary", response_model=FoodLogSummary)
+def get_summary(
+    start_date: Optional[date] = Query(default=None, alias="from"),
+    end_date: Optional[date] = Query(default=None, alias="to"),
+    current_user: User = Depends(get_current_user),
+    service: FoodLogService = Depends(get_food_log_service),
+):
+    """按本地日期汇总区间内的摄入（仅读取每日汇总表）。"""
+    try:
+        return service.get_summary(current_user, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from ..core.service_registry import get_service
 from ..schemas.meal_plan import MealPlanRequest, MealPlanResponse
 from ..services.meal_planner_service import MealPlanError, MealPlannerService
 
 router = APIRouter(prefix="/meal-plan", tags=["meal-plan"])
 
 
-def get_meal_planner_service(request: Request) -> MealPlannerService:
-    return MealPlannerService(agent=request.app.state.agent)
+async def get_meal_planner_service(request: Request) -> MealPlannerService:
+    return MealPlannerService(agent=await get_service(request, "agent"))
 
 
 @router.post("", response_model=MealPlanResponse)
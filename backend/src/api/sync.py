@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+
+from ..core.database import get_session
+from ..core.security import get_current_user
+from ..models import User
+from ..repositories.sync_repository import SyncRepository
+from ..schemas.sync import SyncResponse
+from ..services.sync_service import SyncService
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+def get_sync_service(session: Session = Depends(get_session)) -> SyncService:
+    return SyncService(SyncRepository(session))
+
+
+@router.get("", response_model=SyncResponse)
+def sync(
+    since: Optional[str] = Query(default=None, description="上次返回的 cursor"),
+    current_user: User = Depends(get_current_user),
+    service: SyncService = Depends(get_sync_service),
+):
+    """增量同步：返回游标之后新增、修改或删除的体重、饮食、聊天记录与资料。
+
+    不带 since 时返回全量快照。
+    """
+    try:
+        return service.sync(current_user, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,22 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..schemas.user import UserCreate, UserRead, UserProfileUpdate, UserLogin, Token
 from ..services.user_service import UserService
 from ..repositories.user_repository import UserRepository
-from ..core.database import get_session
+from ..repositories.food_log_repository import FoodLogRepository
+from ..repositories.export_repository import AsyncExportRepository
+from ..services.export_service import MEDIA_TYPES, ExportService
+from ..core.database import get_async_session, get_session
+from ..core.etag import make_etag, not_modified
 from ..core.security import (
     verify_password,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user,
+    get_current_user_async,
 )
 from ..models import User
 
@@ -17,7 +24,7 @@ router = APIRouter(prefix="/user", tags=["user"])
 
 
 def get_user_service(session: Session = Depends(get_session)) -> UserService:
-    return UserService(UserRepository(session))
+    return UserService(UserRepository(session), FoodLogRepository(session))
 
 
 @router.post("/register", response_model=UserRead)
@@ -46,7 +53,16 @@ def login(data: UserLogin, service: UserService = Depends(get_user_service)):
 
 
 @router.get("/me", response_model=UserRead)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    service: UserService = Depends(get_user_service),
+):
+    version = service.get_profile_version(current_user.id)
+    etag = make_etag("user/me", current_user.id, version)
+    if cached := not_modified(request, response, etag):
+        return cached
     return current_user
 
 
@@ -58,3 +74,36 @@ def update_profile(
 ):
     """用于初始化或更新用户的身体资料（新用户引导阶段）。"""
     return service.update_profile(current_user, data)
+
+
+def get_export_service(
+    session: AsyncSession = Depends(get_async_session),
+) -> ExportService:
+    return ExportService(AsyncExportRepository(session))
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+async def export_data(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="以 .gz 文件下载"),
+    current_user: User = Depends(get_current_user_async),
+    service: ExportService = Depends(get_export_service),
+):
+    """流式导出体重、饮食、识别与聊天记录（服务端游标分批读取，内存占用恒定）。"""
+    filename = f"loseweight-export-{current_user.id}-{date.today()}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        service.stream(current_user.id, format, gzip=gzip),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
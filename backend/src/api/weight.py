@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session
-from ..schemas.weight import WeightCreate, WeightRead
+from ..schemas.weight import (
+    MAX_SERIES_POINTS,
+    WeightBatchCreate,
+    WeightBatchResult,
+    WeightCreate,
+    WeightRead,
+    WeightSeries,
+    WeightTrend,
+)
 from ..services.weight_service import WeightService
 from ..repositories.weight_repository import WeightRepository
 from ..core.database import get_session
+from ..core.etag import make_etag, not_modified
 from ..core.security import get_current_user
 from ..models import User
 
@@ -14,14 +25,44 @@ def get_weight_service(session: Session = Depends(get_session)) -> WeightService
     return WeightService(WeightRepository(session))
 
 
-@router.get("", response_model=list[WeightRead])
+@router.get("", response_model=Union[list[WeightRead], WeightSeries])
 def get_weights(
+    request: Request,
+    response: Response,
+    format: str = Query(
+        "records",
+        pattern="^(records|columnar)$",
+        description="records：记录数组（时间倒序）；columnar：按时间升序的并列数组",
+    ),
+    points: Optional[int] = Query(
+        None,
+        ge=3,
+        le=MAX_SERIES_POINTS,
+        description="降采样后的最大点数（LTTB），仅用于 columnar",
+    ),
     current_user: User = Depends(get_current_user),
     service: WeightService = Depends(get_weight_service),
 ):
+    if points is not None and format != "columnar":
+        raise HTTPException(status_code=400, detail="points 仅适用于 format=columnar")
+    version = service.get_version(current_user.id)
+    etag = make_etag("weight", current_user.id, version, format, points)
+    if cached := not_modified(request, response, etag):
+        return cached
+    if format == "columnar":
+        return service.get_series(current_user.id, points)
     return service.get_weight_history(current_user.id)
 
 
+@router.get("/trend", response_model=WeightTrend)
+def get_weight_trend(
+    current_user: User = Depends(get_current_user),
+    service: WeightService = Depends(get_weight_service),
+):
+    """体重趋势分析：指数平滑、7/30 天变化速率、目标日期预测与平台期检测。"""
+    return service.get_trend(current_user.id, current_user.target_weight_kg)
+
+
 @router.post("", response_model=WeightRead)
 def add_weight(
     data: WeightCreate,
@@ -31,6 +72,16 @@ def add_weight(
     return service.record_weight(data.weight_kg, current_user.id, data.notes)
 
 
+@router.post("/batch", response_model=WeightBatchResult)
+def add_weights_batch(
+    data: WeightBatchCreate,
+    current_user: User = Depends(get_current_user),
+    service: WeightService = Depends(get_weight_service),
+):
+    """批量记录体重（离线同步），全部成功或全部失败。"""
+    return WeightBatchResult(ids=service.record_weights(current_user.id, data.items))
+
+
 @router.delete("/{record_id}")
 def delete_weight(
     record_id: int,
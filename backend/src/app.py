@@ -1,14 +1,40 @@
+import asyncio
 import logging
+import threading
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 from sqlmodel import Session
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 
-from .api import food, meal_plan, user, weight, food_analysis, chat, food_log
-from .core.config import get_settings
+from .api import (
+    admin,
+    chat,
+    food,
+    food_analysis,
+    food_log,
+    meal_plan,
+    sync,
+    user,
+    weight,
+)
+from .core.compression import CompressionMiddleware
+from .core.config import ModelEndpoint, get_settings
 from .core.logging import setup_logging
+from .core.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    InstrumentedProxy,
+    MetricsMiddleware,
+    observe_pool,
+)
+from .core.model_router import RoutedClient, build_router
+from .core.query_stats import QueryStatsMiddleware
+from .core.service_registry import ServiceRegistry, tcp_probe
+from .core.tracing import TracingMiddleware
+from .services.sync_service import run_change_log_pruning
 # from .core.security import verify_api_key
 
 settings = get_settings()
@@ -17,59 +43,96 @@ setup_logging()
 logger = logging.getLogger("loseweight.app")
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup: 初始化数据库、Milvus、LoseWeightAgent
+_embedding = None
+_embedding_lock = threading.Lock()
 
-    # Initialize DB
-    from .core.database import init_db, engine
 
-    init_db()
+def _create_embedding():
+    """食物检索与聊天记忆、答案缓存共用的嵌入客户端：只构建一次，模型路由的
+    延迟、错误率与熔断状态只有一份。构建失败时不缓存，下次重试。"""
+    global _embedding
+    # 两个依赖在线程池中并发初始化，加锁避免重复构建
+    with _embedding_lock:
+        if _embedding is None:
+            _embedding = _build_embedding()
+        return _embedding
+
 
-    # 初始化向量检索服务
-    try:
-        from LoseWeightAgent.src.services.embedding_service import EmbeddingService
-        from LoseWeightAgent.src.services.milvus_manager import MilvusManager
-        from LoseWeightAgent.src.services.food_search import FoodSearchService
+def _build_embedding():
+    """文本嵌入客户端（经模型路由），代理包装以记录上游调用耗时和失败次数。"""
+    from LoseWeightAgent.src.services.embedding_service import EmbeddingService
 
-        embedding_service = EmbeddingService(
-            api_key=settings.llm.api_key,
-            model=settings.embedding.model,
+    def build(endpoint: ModelEndpoint) -> EmbeddingService:
+        return EmbeddingService(
+            api_key=endpoint.api_key or settings.llm.api_key,
+            model=endpoint.model or settings.embedding.model,
             dimension=settings.embedding.dimension,
         )
 
-        milvus_manager = MilvusManager(
+    client = build(ModelEndpoint())
+    if settings.router.enabled:
+        router = build_router("embedding", client, build, settings.router)
+        client = RoutedClient({"embedding": router}, {}, default_task="embedding")
+    return InstrumentedProxy(client, service="embedding")
+
+
+def _create_food_search():
+    """向量检索服务（嵌入 + Milvus），代理包装以记录上游调用耗时和失败次数。"""
+    from LoseWeightAgent.src.services.milvus_manager import MilvusManager
+    from LoseWeightAgent.src.services.food_search import FoodSearchService
+
+    embedding_service = _create_embedding()
+    milvus_manager = InstrumentedProxy(
+        MilvusManager(
             host=settings.milvus.host,
             port=settings.milvus.port,
             collection_name=settings.milvus.collection,
             vector_dim=settings.embedding.dimension,
-        )
+        ),
+        service="milvus",
+    )
+    logger.info(
+        "食物检索服务初始化 (Milvus=%s:%d, model=%s)",
+        settings.milvus.host,
+        settings.milvus.port,
+        settings.embedding.model,
+    )
+    return FoodSearchService(
+        embedding_service=embedding_service,
+        milvus_manager=milvus_manager,
+    )
 
-        app.state.food_search = FoodSearchService(
-            embedding_service=embedding_service,
-            milvus_manager=milvus_manager,
-        )
-        logger.info(
-            "食物检索服务初始化成功 (Milvus=%s:%d, model=%s)",
-            settings.milvus.host,
-            settings.milvus.port,
-            settings.embedding.model,
-        )
-    except Exception as e:
-        app.state.food_search = None
-        logger.error("食物检索服务初始化失败: %s", e)
-
-    # 初始化 LoseWeightAgent（AI 功能核心）
-    try:
-        from LoseWeightAgent.src.agent import LoseWeightAgent
-
-        agent = LoseWeightAgent(
-            api_key=settings.llm.api_key,
-            base_url=settings.llm.base_url,
-            model=settings.llm.model,
-            vision_api_key=settings.vision_llm.api_key,
-            vision_base_url=settings.vision_llm.base_url,
-            vision_model=settings.vision_llm.model,
+
+# LoseWeightAgent 方法 -> 模型路由任务（未列出的方法按 chat 路由）
+AGENT_METHOD_TASKS = {
+    "get_guidance_direct": "chat",
+    "chat_stream": "chat",
+    "plan_meals_direct": "meal_plan",
+    "analyze_food_bytes": "vision",
+}
+
+# 可安全重发（对冲、回退）的 Agent 方法。对话会调用工具写入饮食、体重等记录，
+# 重发会产生重复数据，因此不在此列，每次只发往一个端点
+AGENT_IDEMPOTENT_METHODS = frozenset({"plan_meals_direct", "analyze_food_bytes"})
+
+
+def _create_agent():
+    """LoseWeightAgent（AI 功能核心），每个方法对应一次（或一轮）LLM 调用。
+
+    配置了备用端点时，每个备用端点对应一个只替换了该任务模型配置的 Agent 实例，
+    由模型路由按任务分派。
+    """
+    from LoseWeightAgent.src.agent import LoseWeightAgent
+    from .core.database import engine
+
+    def build(llm=settings.llm, vision=settings.vision_llm) -> LoseWeightAgent:
+        return LoseWeightAgent(
+            api_key=llm.api_key,
+            base_url=llm.base_url,
+            model=llm.model,
+            vision_api_key=vision.api_key,
+            vision_base_url=vision.base_url,
+            vision_model=vision.model,
             milvus_host=settings.milvus.host,
             milvus_port=settings.milvus.port,
             milvus_collection=settings.milvus.collection,
@@ -77,16 +140,78 @@ async def lifespan(app: FastAPI):
             embedding_dimension=settings.embedding.dimension,
             session_factory=lambda: Session(engine),
         )
-        app.state.agent = agent
-        logger.info("LoseWeightAgent 初始化成功 (model=%s)", settings.llm.model)
-    except Exception as e:
-        app.state.agent = None
-        logger.error("LoseWeightAgent 初始化失败: %s", e)
+
+    agent = build()
+    logger.info("LoseWeightAgent 初始化 (model=%s)", settings.llm.model)
+    if settings.router.enabled:
+
+        def build_llm(endpoint: ModelEndpoint) -> LoseWeightAgent:
+            return build(llm=endpoint.with_defaults(settings.llm))
+
+        def build_vision(endpoint: ModelEndpoint) -> LoseWeightAgent:
+            return build(vision=endpoint.with_defaults(settings.vision_llm))
+
+        routers = {
+            "chat": build_router("chat", agent, build_llm, settings.router),
+            "meal_plan": build_router("meal_plan", agent, build_llm, settings.router),
+            "vision": build_router("vision", agent, build_vision, settings.router),
+        }
+        agent = RoutedClient(
+            routers,
+            AGENT_METHOD_TASKS,
+            default_task="chat",
+            idempotent=AGENT_IDEMPOTENT_METHODS,
+        )
+    return InstrumentedProxy(agent, service="llm")
+
+
+def _ping_database(engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _ping_milvus(_) -> None:
+    tcp_probe(
+        settings.milvus.host, settings.milvus.port, settings.services.probe_timeout_s
+    )
+
+
+def _create_services() -> ServiceRegistry:
+    from .core.database import engine
+
+    registry = ServiceRegistry()
+    registry.register("database", lambda: engine, probe=_ping_database)
+    registry.register("food_search", _create_food_search, probe=_ping_milvus)
+    registry.register("agent", _create_agent)
+    # 聊天长期记忆与答案缓存使用的嵌入客户端，与食物检索共用同一实例
+    # （不可用时对话不带记忆，不影响就绪）
+    registry.register("embedding", _create_embedding)
+    return registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: 初始化数据库，并发（后台）初始化 Milvus 检索与 LoseWeightAgent
+    from .core.database import init_db, engine, get_async_engine
+
+    init_db()
+    observe_pool(engine, "sync")
+    observe_pool(get_async_engine(), "async")
+
+    await app.state.services.start()
+    pruning = asyncio.create_task(run_change_log_pruning(engine, settings.sync))
 
     yield
 
     # Shutdown
     logger.info("正在关闭应用...")
+    pruning.cancel()
+    from .services.answer_cache_service import answer_cache
+    from .services.chat_memory_service import chat_memory
+
+    await chat_memory.drain(timeout=settings.server.graceful_timeout_s)
+    await answer_cache.drain(timeout=settings.server.graceful_timeout_s)
+    await app.state.services.close()
 
 
 app = FastAPI(
@@ -96,6 +221,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# 外部依赖注册表（路由通过 get_service 获取，支持懒加载与后台重连）
+app.state.services = _create_services()
+
 # CORS 中间件配置（从配置文件读取允许的源）
 app.add_middleware(
     CORSMiddleware,
@@ -103,10 +231,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Trace-Id"],
 )
 
-# Gzip 压缩中间件（对 > 1000 字节的响应启用压缩）
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# 响应压缩中间件（按内容类型与 Accept-Encoding 协商，SSE 不压缩）
+app.add_middleware(CompressionMiddleware, settings=settings.compression)
+
+# 请求追踪中间件（输出 Server-Timing，不缓冲流式响应）
+app.add_middleware(TracingMiddleware)
+
+# SQL 查询统计中间件（每请求查询次数、数据库耗时与 N+1 检测）
+app.add_middleware(QueryStatsMiddleware)
+
+# 请求指标中间件（最外层，纯 ASGI 实现，不缓冲流式响应）
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(food.router)
@@ -116,14 +254,36 @@ app.include_router(user.router)
 app.include_router(food_analysis.router)
 app.include_router(chat.router)
 app.include_router(food_log.router)
+app.include_router(sync.router)
+app.include_router(admin.router)
 
 
 @app.get("/health", tags=["health"])
 def health_check():
+    """存活探测：进程可以响应请求即视为健康。"""
     return {"status": "healthy", "version": "3.0.0"}
 
 
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """就绪探测：必需依赖均可用时返回 200，否则 503（探测结果带缓存）。"""
+    ready, dependencies = await app.state.services.readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "dependencies": dependencies,
+        },
+    )
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+def metrics():
+    """Prometheus 文本格式指标。"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    import uvicorn
+    from .serve import serve
 
-    uvicorn.run(app, host="0.0.0.0", port=16666)
+    serve(app)
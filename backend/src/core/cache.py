@@ -0,0 +1,56 @@
+"""进程内按用户划分的缓存。"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class UserCache(Generic[T]):
+    """以 user_id 为键的 LRU + TTL 缓存（线程安全）。
+
+    写路径负责调用 `invalidate`；TTL 仅用于兜底未经过失效钩子的写入。
+    子类可覆盖 `is_fresh` 增加额外的过期条件。
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[int, tuple[float, T]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_fresh(self, value: T) -> bool:
+        return True
+
+    def get(self, user_id: int) -> Optional[T]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            created_at, value = item
+            expired = (
+                self.ttl_seconds is not None
+                and time.monotonic() - created_at > self.ttl_seconds
+            )
+            if expired or not self.is_fresh(value):
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return value
+
+    def set(self, user_id: int, value: T) -> None:
+        with self._lock:
+            self._items[user_id] = (time.monotonic(), value)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
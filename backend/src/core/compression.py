@@ -0,0 +1,305 @@
+"""按内容类型与 Accept-Encoding 协商的响应压缩（替代 GZipMiddleware）。
+
+- 只压缩文本类响应（JSON、NDJSON、CSV、HTML 等）；text/event-stream 原样透传，
+  SSE 事件不会被压缩器缓冲而延迟送达；
+- 按客户端 q 值协商 zstd / br / gzip，q 值相同时按配置顺序；zstd、brotli 仅在
+  安装了 zstandard（或 Python 3.14+ 的 compression.zstd）/ brotli 时启用；
+- 完整响应小于 minimum_size 时不压缩，流式响应逐块压缩并立即刷新；
+- 压缩级别可按路由模板覆盖（compression.route_levels）；
+- 已带 Content-Encoding 的响应（PrecompressedBody 生成的预压缩数据）原样透传。
+"""
+
+import zlib
+from functools import lru_cache
+from typing import Iterable, Mapping, Optional, Protocol
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import CompressionSettings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd as _zstd_stdlib  # Python 3.14+
+except ImportError:
+    _zstd_stdlib = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 除 text/* 外可压缩的内容类型（另含 +json / +xml 后缀）
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+SSE_TYPE = "text/event-stream"
+
+# 预压缩静态数据时使用的级别（只压缩一次，取高压缩率）
+PRECOMPRESS_LEVELS = {"zstd": 19, "br": 11, "gzip": 9}
+
+
+class StreamEncoder(Protocol):
+    def chunk(self, data: bytes) -> bytes:
+        """压缩一块数据并刷新，返回可立即发送的字节。"""
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """压缩最后一块数据并结束编码流。"""
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        if _zstd_stdlib is not None:
+            self._c = _zstd_stdlib.ZstdCompressor(level)
+            self._flush_block = _zstd_stdlib.ZstdCompressor.FLUSH_BLOCK
+            self._flush_frame = _zstd_stdlib.ZstdCompressor.FLUSH_FRAME
+        else:
+            self._c = zstandard.ZstdCompressor(level=level).compressobj()
+            self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            self._flush_frame = None
+
+    def chunk(self, data: bytes) -> bytes:
+        if self._flush_frame is not None:
+            return self._c.compress(data, self._flush_block)
+        return self._c.compress(data) + self._c.flush(self._flush_block)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._flush_frame is not None:
+            return self._c.compress(data, self._flush_frame)
+        return self._c.compress(data) + self._c.flush()
+
+
+_ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    _ENCODERS["br"] = _BrotliEncoder
+if _zstd_stdlib is not None or zstandard is not None:
+    _ENCODERS["zstd"] = _ZstdEncoder
+
+
+def available_encodings(preference: Iterable[str] = ("zstd", "br", "gzip")) -> list:
+    """按优先顺序返回当前环境可用的编码。"""
+    return [name for name in preference if name in _ENCODERS]
+
+
+def encoder(encoding: str, level: int) -> StreamEncoder:
+    return _ENCODERS[encoding](level)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    return encoder(encoding, level).finish(data)
+
+
+@lru_cache(maxsize=256)
+def _parse_accept_encoding(header: str) -> Mapping[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(
+    accept_encoding: Optional[str], candidates: Iterable[str]
+) -> Optional[str]:
+    """选择客户端 q 值最高的编码（同分按 candidates 顺序），均不接受时返回 None。"""
+    if not accept_encoding:
+        return None
+    accepted = _parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime == SSE_TYPE:
+        return False
+    return (
+        mime.startswith("text/")
+        or mime in COMPRESSIBLE_TYPES
+        or mime.endswith(("+json", "+xml"))
+    )
+
+
+def _weaken(headers: MutableHeaders) -> None:
+    # 编码后的表示与原始字节不同，强 ETag 降为弱 ETag（If-None-Match 按弱比较仍可命中）
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+
+
+class PrecompressedBody:
+    """静态数据的预压缩副本：每种编码只压缩一次，按请求的 Accept-Encoding 返回。"""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._variants: dict[str, bytes] = {}
+
+    def variant(self, encoding: str) -> bytes:
+        data = self._variants.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding, PRECOMPRESS_LEVELS[encoding])
+            self._variants[encoding] = data
+        return data
+
+    def precompress(self) -> "PrecompressedBody":
+        """预先生成全部可用编码（在构建数据时调用，避免首个请求承担压缩开销）。"""
+        for encoding in available_encodings():
+            self.variant(encoding)
+        return self
+
+    def response(
+        self, request: Request, headers: Optional[Mapping[str, str]] = None
+    ) -> Response:
+        encoding = negotiate(
+            request.headers.get("accept-encoding"), available_encodings()
+        )
+        response = Response(
+            self.variant(encoding) if encoding else self.body,
+            media_type=self.media_type,
+            headers=headers,
+        )
+        response.headers["vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["content-encoding"] = encoding
+            _weaken(response.headers)
+        return response
+
+
+class CompressionMiddleware:
+    """纯 ASGI 中间件：按内容类型与协商结果压缩响应，流式响应逐块刷新。"""
+
+    def __init__(self, app, settings: Optional[CompressionSettings] = None):
+        self.app = app
+        self.settings = settings or CompressionSettings()
+        self.encodings = available_encodings(self.settings.encodings)
+
+    def _levels(self, scope) -> dict[str, int]:
+        route_path = getattr(scope.get("route"), "path", None)
+        overrides = self.settings.route_levels.get(route_path, {})
+        return {**self.settings.levels, **overrides}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.settings.enabled or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        start_message = None
+        stream: Optional[StreamEncoder] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, stream, passthrough
+            message_type = message["type"]
+            if passthrough:
+                await send(message)
+                return
+
+            if message_type == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type"))
+                    or "no-transform" in headers.get("cache-control", "")
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                levels = self._levels(scope)
+                encoding = negotiate(
+                    accept_encoding,
+                    [name for name in self.encodings if levels.get(name, 0) > 0],
+                )
+                if encoding is None:
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                stream = encoder(encoding, levels[encoding])
+                headers["content-encoding"] = encoding
+                return
+
+            if message_type != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(scope=start_message)
+                if not more_body and len(body) < self.settings.minimum_size:
+                    # 小响应：撤销编码，原样发送
+                    del headers["content-encoding"]
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                _weaken(headers)
+                if more_body:
+                    del headers["content-length"]
+                    body = stream.chunk(body)
+                else:
+                    body = stream.finish(body)
+                    headers["content-length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            else:
+                body = stream.chunk(body) if more_body else stream.finish(body)
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
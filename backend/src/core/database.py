@@ -1,6 +1,17 @@
-from sqlalchemy import event
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import Date, Engine, event, func, insert, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import get_settings
+from .query_stats import instrument_engine
+from .timezones import local_date_of
 
 settings = get_settings()
 
@@ -14,31 +25,151 @@ if is_sqlite:
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 else:
     # 针对 PostgreSQL 等生产级数据库进行连接池调优
-    engine_kwargs.update({
-        "pool_size": 20,          # 基础连接池大小
-        "max_overflow": 10,       # 允许超出的连接数
-        "pool_recycle": 3600,     # 连接回收时间（1小时）
-    })
+    engine_kwargs.update(
+        {
+            "pool_size": 20,  # 基础连接池大小
+            "max_overflow": 10,  # 允许超出的连接数
+            "pool_recycle": 3600,  # 连接回收时间（1小时）
+        }
+    )
 
 engine = create_engine(settings.database.url, **engine_kwargs)
+instrument_engine(engine)
+
+# 同步驱动 -> 异步驱动的 URL 方言映射
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """将同步数据库 URL 转换为对应的异步驱动 URL。"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _set_sqlite_pragma(dbapi_connection, _):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
 
 
 if is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragma)
+
+
+class local_date(GenericFunction):
+    """local_date(时间戳, 时区名)：按 UTC 存储的时间戳在 IANA 时区下的本地日期，
+    用于在数据库中按用户本地日期分组汇总。"""
+
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(local_date, "postgresql")
+def _local_date_postgresql(element, compiler, **kw):
+    moment, tz_name = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f"date(timezone({tz_name}, timezone('UTC', {moment})))"
+
+
+def _sqlite_local_date(value: Optional[str], tz_name: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return local_date_of(datetime.fromisoformat(value), tz_name).isoformat()
+
 
-    @event.listens_for(engine, "connect")
-    def _set_sqlite_pragma(dbapi_connection, _):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA journal_mode=WAL")
-        cursor.execute("PRAGMA synchronous=NORMAL")
-        cursor.execute("PRAGMA temp_store=MEMORY")
-        cursor.execute("PRAGMA cache_size=-20000")
-        cursor.close()
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, _):
+    """SQLite 没有时区换算，以 Python 函数实现 local_date（所有 SQLite 连接）。"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            "local_date", 2, _sqlite_local_date, deterministic=True
+        )
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """异步引擎（asyncpg / aiosqlite），首次使用时创建，未安装异步驱动时不影响同步路径。"""
+    kwargs = {k: v for k, v in engine_kwargs.items() if k != "connect_args"}
+    async_engine = create_async_engine(to_async_url(settings.database.url), **kwargs)
+    if is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragma)
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+# create_all 只创建缺失的表、不修改已存在的表：之后新增的列在此登记，
+# 启动时对缺少这些列的旧表执行 ALTER TABLE ... ADD COLUMN
+ADDED_COLUMNS = {
+    "users": {"timezone": "VARCHAR NOT NULL DEFAULT 'UTC'"},
+    "food_logs": {"protein_g": "FLOAT", "carbs_g": "FLOAT", "fat_g": "FLOAT"},
+    # 旧记录为 NULL，视为已过保留期，下次清理时删除
+    "sync_changes": {"created_at": "TIMESTAMP"},
+}
+
+
+def _backfill_daily_intake(conn) -> None:
+    """首次创建每日汇总表时从已有饮食记录生成汇总。
+
+    此时所有用户的时区都是刚补上的默认值 UTC，本地日期即 UTC 日期。
+    """
+    from ..models import DailyIntake, FoodLog
+
+    day = func.date(FoodLog.timestamp)
+    rows = (
+        select(
+            FoodLog.user_id,
+            day,
+            func.sum(FoodLog.calories),
+            func.count(),
+            func.sum(FoodLog.protein_g),
+            func.sum(FoodLog.carbs_g),
+            func.sum(FoodLog.fat_g),
+        )
+        .where(FoodLog.user_id.is_not(None))
+        .group_by(FoodLog.user_id, day)
+    )
+    columns = [
+        "user_id",
+        "local_date",
+        "calories",
+        "entry_count",
+        "protein_g",
+        "carbs_g",
+        "fat_g",
+    ]
+    conn.execute(insert(DailyIntake).from_select(columns, rows))
+
+
+def upgrade_schema(bind: Engine) -> None:
+    """创建缺失的表并为旧表补齐新增列，可重复执行。"""
+    new_rollup = not inspect(bind).has_table("daily_intake")
+    SQLModel.metadata.create_all(bind)
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        if new_rollup:
+            _backfill_daily_intake(conn)
 
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    upgrade_schema(engine)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
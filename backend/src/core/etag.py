@@ -0,0 +1,39 @@
+"""基于版本号的 ETag 与条件 GET（If-None-Match）。
+
+版本号取自 sync_changes 中该用户该类数据的最新变更序号，写路径在同一事务中
+追加变更，因此多个工作进程之间天然一致；路由先比较 ETag，命中时直接返回
+304，不再查询与序列化数据。
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# 客户端可缓存，但每次使用前必须携带 If-None-Match 重新验证
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """由资源标识与版本号生成强 ETag。"""
+    raw = "|".join(str(part) for part in parts).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=8).hexdigest()}"'
+
+
+def _matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较：忽略 W/ 前缀
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """ETag 命中时返回 304 响应；否则在正常响应上附加 ETag 并返回 None。"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,55 +1,194 @@
 """日志系统初始化。
 
-基于 LoggingSettings 配置，支持控制台 + 文件双输出。
+基于 LoggingSettings 配置，支持控制台 + 文件双输出。业务线程只负责把日志
+记录放入内存队列（QueueHandler），格式化与磁盘写入由后台 QueueListener
+线程完成；文件按大小或时间轮转并可压缩旧文件，支持 JSON 行格式以及按
+日志器采样（如高频的 uvicorn.access）。多进程模式下每个工作进程写入
+带序号的文件（app.worker1.log），避免多个进程各自轮转同一文件。
 """
 
+import atexit
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
-from .config import get_settings
+from .config import LoggingSettings, get_settings
 
+# LogRecord 的标准属性，JSON 格式中其余属性视为 extra 字段输出
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime"}
 
-def setup_logging() -> None:
-    """根据配置初始化日志系统。"""
+_listener: Optional[logging.handlers.QueueListener] = None
+# 多进程模式下当前工作进程的序号，主进程与单进程运行时为 None
+_worker: Optional[int] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """输出单行 JSON，便于日志采集系统解析。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """按比例保留日志（确定性计数采样），WARNING 及以上级别始终保留。"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.interval = max(1, round(1 / rate)) if rate > 0 else 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.interval == 0:
+            return False
+        with self._lock:
+            self._count += 1
+            return (self._count - 1) % self.interval == 0
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """仅合并消息参数后入队，完整格式化留给后台监听线程。"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def worker_log_path(path: Path) -> Path:
+    """工作进程写入的文件名：在扩展名前加上进程序号。"""
+    if _worker is None:
+        return path
+    return path.with_name(f"{path.stem}.worker{_worker}{path.suffix}")
+
+
+def _build_file_handler(settings: LoggingSettings, filename: Path) -> logging.Handler:
+    """按日志配置的轮转与压缩策略构建文件处理器（应用日志与追踪记录共用）。"""
+    filename = worker_log_path(filename)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    if settings.rotation == "size":
+        handler: logging.Handler = logging.handlers.RotatingFileHandler(
+            filename,
+            maxBytes=settings.max_bytes,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+        )
+    elif settings.rotation == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename,
+            when=settings.when,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+        )
+    else:
+        return logging.FileHandler(filename, encoding="utf-8")
+
+    if settings.compress:
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def stop_logging() -> None:
+    """停止后台监听线程并刷新队列中剩余的日志。"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_logging(worker: Optional[int] = None) -> None:
+    """根据配置初始化日志系统（可重复调用）。
+
+    worker 为多进程模式下的工作进程序号，设置后该进程内的重复调用（如导入
+    src.app 时）沿用同一序号。
+    """
+    global _listener, _worker
+    if worker is not None:
+        _worker = worker
     settings = get_settings().logging
 
-    level = getattr(logging, settings.level.upper(), logging.DEBUG)
+    level = getattr(logging, settings.level.upper(), logging.INFO)
 
     # 定义日志格式
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    if settings.format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
-    handlers = []
+    handlers: list[logging.Handler] = []
 
     # 控制台输出处理器
     if settings.enable_console:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(level)
-        console_handler.setFormatter(formatter)
-        handlers.append(console_handler)
+        handlers.append(logging.StreamHandler(sys.stdout))
 
     # 文件输出处理器
     if settings.enable_file:
-        log_dir = Path(settings.dir)
-        log_dir.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_dir / "app.log", encoding="utf-8")
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        handlers.append(file_handler)
+        handlers.append(_build_file_handler(settings, Path(settings.dir) / "app.log"))
+
+    for handler in handlers:
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
 
     # 配置根日志器
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
 
     # 清理现有的 handler 避免重复
+    stop_logging()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
 
-    for handler in handlers:
-        root_logger.addHandler(handler)
+    if settings.use_queue and handlers:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root_logger.addHandler(_EnqueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     # 专门处理 uvicorn 的日志器，确保它们不使用自己的默认格式
     uvicorn_loggers = ["uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"]
@@ -58,6 +197,22 @@ def setup_logging() -> None:
         u_logger.handlers = []  # 清空 uvicorn 默认的 handlers
         u_logger.propagate = True  # 让日志流向根日志器
 
+    # 高频日志器采样（过滤器挂在日志器上，被丢弃的记录不会入队）
+    for logger_name, rate in settings.sampling.items():
+        s_logger = logging.getLogger(logger_name)
+        for existing in s_logger.filters[:]:
+            if isinstance(existing, SamplingFilter):
+                s_logger.removeFilter(existing)
+        if rate < 1:
+            s_logger.addFilter(SamplingFilter(rate))
+
     logging.getLogger("loseweight").info(
-        "日志系统初始化完成 (level=%s, file=%s)", settings.level, settings.enable_file
+        "日志系统初始化完成 (level=%s, file=%s, format=%s, queue=%s)",
+        settings.level,
+        settings.enable_file,
+        settings.format,
+        settings.use_queue,
     )
+
+
+atexit.register(stop_logging)
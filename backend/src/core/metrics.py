@@ -0,0 +1,390 @@
+"""轻量级 Prometheus 指标（文本暴露格式），无第三方依赖。
+
+请求路径上只做加锁的数值累加；格式化与连接池等状态采集在 /metrics 抓取时进行。
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from .tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(
+    names: tuple[str, ...], values: tuple[str, ...], extra: str = ""
+) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [各桶计数..., 总和, 总数]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(state[-1])}")
+            base = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{base} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """注册抓取时执行的回调（用于刷新连接池等瞬时状态的 Gauge）。"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP 请求耗时（按路由模板）",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "正在处理的 HTTP 请求数", ("method",))
+)
+DB_POOL = REGISTRY.register(
+    Gauge("db_pool_connections", "SQLAlchemy 连接池状态", ("engine", "state"))
+)
+UPSTREAM_DURATION = REGISTRY.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "上游服务调用耗时",
+        ("service", "operation"),
+    )
+)
+UPSTREAM_ERRORS = REGISTRY.register(
+    Counter("upstream_errors_total", "上游服务调用失败次数", ("service", "operation"))
+)
+SSE_STREAMS_ACTIVE = REGISTRY.register(
+    Gauge("sse_streams_active", "进行中的 SSE 流数量", ("endpoint",))
+)
+SSE_STREAMS_TOTAL = REGISTRY.register(
+    Counter("sse_streams_total", "SSE 流总数（按结束状态）", ("endpoint", "outcome"))
+)
+SSE_STREAM_DURATION = REGISTRY.register(
+    Histogram(
+        "sse_stream_duration_seconds",
+        "SSE 流持续时间",
+        ("endpoint",),
+        buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+    )
+)
+
+ANSWER_CACHE_REQUESTS = REGISTRY.register(
+    Counter(
+        "answer_cache_requests_total",
+        "语义答案缓存查询次数（hit / miss / bypass）",
+        ("endpoint", "result"),
+    )
+)
+
+MODEL_ROUTER_CALLS = REGISTRY.register(
+    Counter(
+        "model_router_calls_total",
+        "模型路由各端点的调用次数（ok / error / cancelled）",
+        ("task", "target", "outcome"),
+    )
+)
+MODEL_ROUTER_HEDGES = REGISTRY.register(
+    Counter("model_router_hedges_total", "模型路由发出的对冲请求数", ("task",))
+)
+
+
+def observe_pool(engine: Any, name: str) -> None:
+    """注册连接池状态采集（QueuePool 提供 size/checkedout/overflow/checkedin）。"""
+
+    def collect() -> None:
+        pool = engine.pool
+        for state in ("size", "checkedout", "overflow", "checkedin"):
+            getter = getattr(pool, state, None)
+            if callable(getter):
+                DB_POOL.set(getter(), engine=name, state=state)
+
+    REGISTRY.add_collector(collect)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str):
+    """记录一次上游调用的耗时与失败（同时作为请求追踪中的一个 span）。"""
+    start = time.perf_counter()
+    try:
+        with span(service, operation):
+            yield
+    except BaseException as e:
+        if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+            UPSTREAM_ERRORS.inc(service=service, operation=operation)
+        raise
+    finally:
+        UPSTREAM_DURATION.observe(
+            time.perf_counter() - start, service=service, operation=operation
+        )
+
+
+async def track_sse_stream(
+    endpoint: str, stream: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    """包装 SSE 事件生成器，记录在途流数量、持续时间与结束状态。"""
+    SSE_STREAMS_ACTIVE.inc(endpoint=endpoint)
+    start = time.perf_counter()
+    outcome = "disconnected"
+    try:
+        async for chunk in stream:
+            yield chunk
+        outcome = "completed"
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        SSE_STREAMS_ACTIVE.dec(endpoint=endpoint)
+        SSE_STREAM_DURATION.observe(time.perf_counter() - start, endpoint=endpoint)
+        SSE_STREAMS_TOTAL.inc(endpoint=endpoint, outcome=outcome)
+
+
+def instrumented(service: str, operation: Optional[str] = None):
+    """为同步函数、协程函数或异步生成器函数添加上游调用指标的装饰器。"""
+
+    def decorator(func):
+        op = operation or func.__name__
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                with track_upstream(service, op):
+                    async for item in func(*args, **kwargs):
+                        yield item
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_upstream(service, op):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_upstream(service, op):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class InstrumentedProxy:
+    """包装第三方服务对象，为其公开方法的调用记录上游指标。"""
+
+    def __init__(self, target: Any, service: str):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_service", service)
+        object.__setattr__(self, "_wrapped", {})
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._wrapped[name] = instrumented(self._service, name)(attr)
+        return wrapped
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：记录每个路由的耗时与在途请求数，不缓冲响应体。"""
+
+    def __init__(self, app, exclude_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            route = scope.get("route")
+            # 使用路由模板而非原始路径，避免高基数标签
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route_path,
+                status=str(status_code),
+            )
@@ -1,15 +1,22 @@
 import io
 import logging
+import threading
 import uuid
 from datetime import timedelta
-from minio import Minio
+from functools import lru_cache
+
 from .config import get_settings
+from .metrics import instrumented
 
 logger = logging.getLogger("loseweight.minio")
 
 
 class MinIOClient:
+    """MinIO 客户端封装。SDK 在构造时才导入，存储桶检查推迟到首次上传，构造本身不访问网络。"""
+
     def __init__(self):
+        from minio import Minio
+
         settings = get_settings().minio
         self.client = Minio(
             endpoint=settings.endpoint,
@@ -18,19 +25,32 @@ class MinIOClient:
             secure=settings.secure,
         )
         self.bucket_name = settings.bucket_name
-        self._ensure_bucket_exists()
+        self._bucket_checked = False
+        self._bucket_lock = threading.Lock()
+
+    def _ensure_bucket_once(self):
+        if self._bucket_checked:
+            return
+        with self._bucket_lock:
+            if not self._bucket_checked:
+                self._bucket_checked = self._ensure_bucket_exists()
 
+    @instrumented("minio", "ensure_bucket")
     def _ensure_bucket_exists(self):
         """确保存储桶存在，不存在则创建。"""
         try:
             if not self.client.bucket_exists(self.bucket_name):
                 self.client.make_bucket(self.bucket_name)
                 logger.info(f"Created MinIO bucket: {self.bucket_name}")
+            return True
         except Exception as e:
             logger.error(f"Failed to ensure bucket exists: {e}")
+            return False
 
+    @instrumented("minio")
     def upload_image(self, image_bytes: bytes, content_type: str = "image/jpeg") -> str:
         """上传图片并返回对象键（Object Key）。"""
+        self._ensure_bucket_once()
         file_name = f"recognition_{uuid.uuid4().hex}.jpg"
         try:
             self.client.put_object(
@@ -46,6 +66,7 @@ class MinIOClient:
             logger.error(f"Failed to upload image to MinIO: {e}")
             raise e
 
+    @instrumented("minio")
     def get_presigned_url(self, object_name: str, expires_hours: int = 24) -> str:
         """生成临时的访问链接。"""
         try:
@@ -57,5 +78,7 @@ class MinIOClient:
             return ""
 
 
-# 单例对象供全局使用
-minio_client = MinIOClient()
+@lru_cache
+def get_minio_client() -> MinIOClient:
+    """进程内共享的 MinIO 客户端，首次使用时创建。"""
+    return MinIOClient()
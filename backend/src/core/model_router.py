@@ -0,0 +1,427 @@
+"""模型端点路由：每个任务（chat / meal_plan / vision / embedding）配置有序的 OpenAI
+兼容端点，按滚动延迟、错误率与在途请求数选择。
+
+- 选择：跳过熔断中与在途请求已满的端点，其余按该操作的滚动中位延迟升序；尚无
+  延迟样本的排在有样本的之后并保持配置顺序，因此启动时总是先用主端点；
+- 对冲：首选端点超过其 p95 延迟（流式为首个事件的延迟）仍未完成时，向下一个端点
+  发出一个重复请求，先成功者胜出，另一个被取消；
+- 回退：请求失败（含 429 限流、超时）时依次尝试后续端点；流式响应只在首个事件
+  之前回退，之后的错误直接抛给调用方；
+- 熔断：最近 window 次调用的错误率超过阈值时暂停使用该端点 cooldown_s 秒；
+  全部端点都不可用时仍按配置顺序尝试，而不是直接失败；
+- 幂等：对冲与回退会把同一请求发给多个端点，只用于可安全重发的操作。非幂等操作
+  （如会调用工具写入数据的对话）只发往选出的一个端点，失败直接抛给调用方，
+  端点的故障由熔断在后续请求中绕开。
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Mapping,
+    Optional,
+)
+
+from .config import ModelEndpoint, RouterSettings
+from .metrics import MODEL_ROUTER_CALLS, MODEL_ROUTER_HEDGES
+
+logger = logging.getLogger("loseweight.model_router")
+
+# 空流（首次取事件即结束）的占位
+_END = object()
+
+# 同步调用（嵌入）对冲时使用的线程池
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=32, thread_name_prefix="model-router"
+)
+
+
+class Target:
+    """一个端点的客户端与滚动统计（线程安全：嵌入调用在线程池中执行）。"""
+
+    def __init__(self, name: str, client: Any, max_concurrency: int = 0):
+        self.name = name
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.open_until = 0.0
+        self._latencies: dict[str, deque] = {}
+        self._outcomes: deque = deque()
+        self._lock = threading.Lock()
+
+    def available(self, now: float) -> bool:
+        if now < self.open_until:
+            return False
+        return not self.max_concurrency or self.in_flight < self.max_concurrency
+
+    def latency(self, op: str, quantile: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(op, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, op: str, seconds: float, window: int) -> None:
+        with self._lock:
+            samples = self._latencies.get(op)
+            if samples is None:
+                samples = self._latencies[op] = deque(maxlen=window)
+            samples.append(seconds)
+
+    def record(self, ok: bool, settings: RouterSettings) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            while len(self._outcomes) > settings.window:
+                self._outcomes.popleft()
+            if ok or len(self._outcomes) < settings.min_samples:
+                return
+            rate = self._outcomes.count(False) / len(self._outcomes)
+            if rate <= settings.error_threshold:
+                return
+            self.open_until = time.monotonic() + settings.cooldown_s
+            # 冷却结束后以新的窗口重新评估
+            self._outcomes.clear()
+        logger.warning(
+            "端点 %s 错误率 %.0f%%，暂停使用 %.0fs",
+            self.name,
+            rate * 100,
+            settings.cooldown_s,
+        )
+
+
+class ModelRouter:
+    def __init__(self, task: str, targets: list[Target], settings: RouterSettings):
+        self.task = task
+        self.targets = targets
+        self.settings = settings
+
+    @property
+    def primary(self) -> Target:
+        return self.targets[0]
+
+    def ranked(self, op: str) -> list[Target]:
+        now = time.monotonic()
+        available = [t for t in self.targets if t.available(now)]
+        if not available:
+            return list(self.targets)
+
+        def key(item: tuple[int, Target]):
+            order, target = item
+            median = target.latency(op, 0.5, self.settings.min_samples)
+            return (median is None, median or 0.0, order)
+
+        return [t for _, t in sorted(enumerate(available), key=key)]
+
+    def candidates(self, op: str, idempotent: bool) -> list[Target]:
+        """本次调用依次尝试的端点：非幂等操作只取排名第一的端点。"""
+        ranked = self.ranked(op)
+        return ranked if idempotent else ranked[:1]
+
+    def _hedge_delay(self, target: Target, op: str) -> float:
+        settings = self.settings
+        delay = target.latency(op, settings.hedge_percentile, settings.min_samples)
+        if delay is None:
+            return settings.hedge_max_s
+        return min(max(delay, settings.hedge_min_s), settings.hedge_max_s)
+
+    def _finish(self, target: Target, outcome: str) -> None:
+        MODEL_ROUTER_CALLS.inc(task=self.task, target=target.name, outcome=outcome)
+        if outcome != "cancelled":
+            target.record(outcome == "ok", self.settings)
+
+    async def _run(
+        self, target: Target, op: str, fn: Callable[[Any], Awaitable]
+    ) -> Any:
+        start = time.perf_counter()
+        target.begin()
+        try:
+            result = await fn(target.client)
+        except asyncio.CancelledError:
+            self._finish(target, "cancelled")
+            raise
+        except Exception:
+            self._finish(target, "error")
+            raise
+        finally:
+            target.end()
+        target.observe(op, time.perf_counter() - start, self.settings.window)
+        self._finish(target, "ok")
+        return result
+
+    async def call(
+        self, op: str, fn: Callable[[Any], Awaitable], idempotent: bool = True
+    ) -> Any:
+        """调用协程方法：fn(client) 返回 awaitable。"""
+        candidates = iter(self.candidates(op, idempotent))
+        pending: dict[asyncio.Task, Target] = {}
+        hedged = not (self.settings.hedge and idempotent)
+        error: Optional[BaseException] = None
+
+        def launch() -> Optional[Target]:
+            target = next(candidates, None)
+            if target is not None:
+                pending[asyncio.create_task(self._run(target, op, fn))] = target
+            return target
+
+        first = launch()
+        try:
+            while pending:
+                timeout = None if hedged else self._hedge_delay(first, op)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if launch() is not None:
+                        MODEL_ROUTER_HEDGES.inc(task=self.task)
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    first = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    async def stream(
+        self, op: str, fn: Callable[[Any], AsyncIterator], idempotent: bool = True
+    ) -> AsyncIterator:
+        """调用异步生成器方法：以首个事件的到达决定胜出端点，之后原样转发。"""
+        candidates = iter(self.candidates(op, idempotent))
+        pending: dict[asyncio.Task, tuple[Target, AsyncIterator, float]] = {}
+        hedged = not (self.settings.hedge and idempotent)
+        error: Optional[BaseException] = None
+        winner = None
+
+        def launch() -> Optional[Target]:
+            target = next(candidates, None)
+            if target is not None:
+                target.begin()
+                events = fn(target.client)
+                task = asyncio.ensure_future(events.__anext__())
+                pending[task] = (target, events, time.perf_counter())
+            return target
+
+        async def discard(target: Target, events: AsyncIterator, outcome: str):
+            target.end()
+            self._finish(target, outcome)
+            try:
+                await events.aclose()
+            except Exception:
+                pass
+
+        first = launch()
+        try:
+            while pending and winner is None:
+                timeout = None if hedged else self._hedge_delay(first, op)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if launch() is not None:
+                        MODEL_ROUTER_HEDGES.inc(task=self.task)
+                    continue
+                for task in done:
+                    target, events, start = pending.pop(task)
+                    exc = task.exception()
+                    if winner is None and (
+                        exc is None or isinstance(exc, StopAsyncIteration)
+                    ):
+                        target.observe(
+                            op, time.perf_counter() - start, self.settings.window
+                        )
+                        winner = (target, events, _END if exc else task.result())
+                    elif exc is None or isinstance(exc, StopAsyncIteration):
+                        await discard(target, events, "cancelled")
+                    else:
+                        error = exc
+                        await discard(target, events, "error")
+                if winner is None and not pending:
+                    first = launch()
+        finally:
+            # 落选的请求：先等待取消完成，再关闭其生成器
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for target, events, _ in pending.values():
+                await discard(target, events, "cancelled")
+
+        if winner is None:
+            raise error
+        target, events, item = winner
+        outcome = "error"
+        try:
+            if item is not _END:
+                yield item
+                async for item in events:
+                    yield item
+            outcome = "ok"
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            await discard(target, events, outcome)
+
+    def _run_sync(self, target: Target, op: str, fn: Callable[[Any], Any]) -> Any:
+        start = time.perf_counter()
+        target.begin()
+        try:
+            result = fn(target.client)
+        except Exception:
+            self._finish(target, "error")
+            raise
+        finally:
+            target.end()
+        target.observe(op, time.perf_counter() - start, self.settings.window)
+        self._finish(target, "ok")
+        return result
+
+    def call_sync(
+        self, op: str, fn: Callable[[Any], Any], idempotent: bool = True
+    ) -> Any:
+        """调用同步方法（嵌入）：只有一个候选端点时直接在当前线程执行。"""
+        ranked = self.candidates(op, idempotent)
+        if len(ranked) == 1:
+            return self._run_sync(ranked[0], op, fn)
+
+        candidates = iter(ranked)
+        pending: dict[concurrent.futures.Future, Target] = {}
+        hedged = not self.settings.hedge
+        error: Optional[BaseException] = None
+
+        def launch() -> Optional[Target]:
+            target = next(candidates, None)
+            if target is not None:
+                future = _executor.submit(self._run_sync, target, op, fn)
+                pending[future] = target
+            return target
+
+        first = launch()
+        while pending:
+            timeout = None if hedged else self._hedge_delay(first, op)
+            done, _ = concurrent.futures.wait(
+                pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                hedged = True
+                if launch() is not None:
+                    MODEL_ROUTER_HEDGES.inc(task=self.task)
+                continue
+            for future in done:
+                pending.pop(future)
+                if future.exception() is None:
+                    # 已开始执行的落选请求无法中断，完成后照常计入统计
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                first = launch()
+        raise error
+
+
+def build_router(
+    task: str,
+    primary: Any,
+    factory: Callable[[ModelEndpoint], Any],
+    settings: RouterSettings,
+) -> ModelRouter:
+    """主端点客户端 + 按配置构建的备用端点客户端（构建失败的端点被跳过）。"""
+    targets = [Target("primary", primary, settings.max_concurrency.get(task, 0))]
+    for i, endpoint in enumerate(settings.fallbacks.get(task, []), 1):
+        name = endpoint.name or endpoint.model or f"fallback-{i}"
+        try:
+            client = factory(endpoint)
+        except Exception as e:
+            logger.warning("备用端点 %s/%s 初始化失败，已跳过: %s", task, name, e)
+            continue
+        targets.append(Target(name, client, endpoint.max_concurrency))
+    if len(targets) > 1:
+        logger.info("模型路由 %s: %s", task, ", ".join(t.name for t in targets))
+    return ModelRouter(task, targets, settings)
+
+
+class RoutedClient:
+    """按方法名把调用分派到对应任务的路由器，方法的调用方式保持不变
+    （协程、异步生成器、同步函数），可再由 InstrumentedProxy 包装。
+
+    idempotent 列出可安全重发（对冲、回退）的方法，None 表示全部方法都可重发；
+    未列出的方法每次只发往一个端点。
+    """
+
+    def __init__(
+        self,
+        routers: Mapping[str, ModelRouter],
+        method_tasks: Mapping[str, str],
+        default_task: str,
+        idempotent: Optional[Collection[str]] = None,
+    ):
+        object.__setattr__(self, "_routers", routers)
+        object.__setattr__(self, "_method_tasks", method_tasks)
+        object.__setattr__(self, "_default_task", default_task)
+        object.__setattr__(self, "_idempotent", idempotent)
+        object.__setattr__(self, "_wrapped", {})
+
+    def __getattr__(self, name: str) -> Any:
+        router = self._routers[self._method_tasks.get(name, self._default_task)]
+        attr = getattr(router.primary.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            idempotent = self._idempotent is None or name in self._idempotent
+            wrapped = self._wrapped[name] = _route(router, name, attr, idempotent)
+        return wrapped
+
+
+def _route(
+    router: ModelRouter, name: str, attr: Callable, idempotent: bool
+) -> Callable:
+    if inspect.isasyncgenfunction(attr):
+
+        async def stream(*args, **kwargs):
+            events = router.stream(
+                name, lambda c: getattr(c, name)(*args, **kwargs), idempotent
+            )
+            async for event in events:
+                yield event
+
+        return stream
+
+    if inspect.iscoroutinefunction(attr):
+
+        async def call(*args, **kwargs):
+            return await router.call(
+                name, lambda c: getattr(c, name)(*args, **kwargs), idempotent
+            )
+
+        return call
+
+    def call_sync(*args, **kwargs):
+        return router.call_sync(
+            name, lambda c: getattr(c, name)(*args, **kwargs), idempotent
+        )
+
+    return call_sync
@@ -0,0 +1,169 @@
+"""运行中进程的按需 CPU / 内存剖析（无第三方依赖）。
+
+CPU：后台线程按固定间隔采样所有线程的调用栈（sys._current_frames），
+输出 collapsed stack 文本（可直接交给 flamegraph.pl / speedscope），或由采样
+结果合成的 pstats 文件（可用 pstats / snakeviz 打开，时间为采样估算值）。
+内存：基于 tracemalloc 的快照，返回分配最多的代码位置及与上一次快照的差异。
+"""
+
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+# pstats 中函数的唯一键：(文件名, 行号, 函数名)
+FuncKey = tuple[str, int, str]
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有剖析任务在运行。"""
+
+
+_cpu_lock = threading.Lock()
+
+
+def _frame_key(frame) -> FuncKey:
+    code = frame.f_code
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def sample_stacks(duration: float, interval: float) -> tuple[list[tuple], int]:
+    """在当前线程中阻塞采样 duration 秒，返回 (调用栈列表, 采样轮数)。
+
+    每个调用栈为从最外层到最内层的 FuncKey 元组；采样线程自身不计入。
+    """
+    if not _cpu_lock.acquire(blocking=False):
+        raise ProfilerBusyError("已有 CPU 剖析正在进行")
+    try:
+        own_id = threading.get_ident()
+        stacks: list[tuple] = []
+        rounds = 0
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_key(frame))
+                    frame = frame.f_back
+                stacks.append(tuple(reversed(stack)))
+            rounds += 1
+            time.sleep(interval)
+        return stacks, rounds
+    finally:
+        _cpu_lock.release()
+
+
+def to_collapsed(stacks: list[tuple]) -> str:
+    """折叠为 `外层;...;内层 次数` 格式，每行一个唯一调用栈。"""
+    counts = Counter(
+        ";".join(f"{name} ({filename}:{line})" for filename, line, name in stack)
+        for stack in stacks
+        if stack
+    )
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def to_pstats(stacks: list[tuple], interval: float) -> bytes:
+    """由采样结果合成 marshal 格式的 pstats 数据。
+
+    调用次数字段记录的是采样命中次数，tt / ct 为命中次数乘以采样间隔的估算值。
+    """
+    self_hits: Counter = Counter()
+    total_hits: Counter = Counter()
+    edges: Counter = Counter()
+    for stack in stacks:
+        if not stack:
+            continue
+        self_hits[stack[-1]] += 1
+        # 递归函数在同一栈中只计一次累计时间
+        for func in set(stack):
+            total_hits[func] += 1
+        for caller, callee in set(zip(stack, stack[1:])):
+            edges[(caller, callee)] += 1
+
+    callers: dict[FuncKey, dict] = {func: {} for func in total_hits}
+    for (caller, callee), n in edges.items():
+        callers[callee][caller] = (n, n, 0.0, n * interval)
+
+    stats = {
+        func: (
+            hits,
+            hits,
+            self_hits[func] * interval,
+            hits * interval,
+            callers[func],
+        )
+        for func, hits in total_hits.items()
+    }
+    return marshal.dumps(stats)
+
+
+# 上一次内存快照，用于计算差异
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+_snapshot_lock = threading.Lock()
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _site(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+def _diff_site(stat) -> dict:
+    item = _site(stat)
+    item["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+    item["count_diff"] = stat.count_diff
+    return item
+
+
+def start_tracemalloc(frames: int) -> bool:
+    """开启 tracemalloc，已开启时返回 False。"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracemalloc() -> None:
+    global _last_snapshot
+    with _snapshot_lock:
+        _last_snapshot = None
+    tracemalloc.stop()
+
+
+def take_memory_snapshot(top: int) -> dict:
+    """拍摄快照，返回按代码行汇总的分配排行及与上一次快照的差异。"""
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc 未开启")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        previous, _last_snapshot = _last_snapshot, snapshot
+
+    report = {
+        "traced_current_kb": round(current / 1024, 1),
+        "traced_peak_kb": round(peak / 1024, 1),
+        "top": [_site(stat) for stat in snapshot.statistics("lineno")[:top]],
+        "diff": None,
+    }
+    if previous is not None:
+        report["diff"] = [
+            _diff_site(stat) for stat in snapshot.compare_to(previous, "lineno")[:top]
+        ]
+    return report
@@ -0,0 +1,132 @@
+"""SQL 查询统计：按请求计数、累计数据库耗时、慢查询日志与 N+1 检测。
+
+通过 SQLAlchemy 的 cursor 执行事件挂载到引擎上（同步引擎与异步引擎的
+sync_engine 均可），统计结果保存在 contextvar 中，由 QueryStatsMiddleware
+在请求开始时创建、结束时检查。开启 `database.expose_query_stats` 后，统计值会
+写入 `X-DB-Queries` / `X-DB-Time-Ms` 响应头，便于测试按接口断言查询预算。
+"""
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+from .tracing import add_span
+
+logger = logging.getLogger("loseweight.sql")
+
+# 慢查询日志中参数 repr 的最大长度
+MAX_PARAMS_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement] += 1
+
+    def n_plus_one_suspects(self, threshold: int) -> list[tuple[str, int]]:
+        """同一请求内重复执行达到阈值的语句（参数化后的 SQL 文本相同）。"""
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _normalize(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+def _format_params(parameters: Any) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[:MAX_PARAMS_LENGTH] + "..."
+    return text
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    shape = _normalize(statement)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(shape, elapsed)
+        add_span("sql", elapsed)
+
+    threshold_ms = get_settings().database.slow_query_ms
+    if threshold_ms and elapsed * 1000 >= threshold_ms:
+        logger.warning(
+            f"慢查询 {elapsed * 1000:.1f}ms: {shape} | params={_format_params(parameters)}"
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """为同步引擎挂载查询统计事件（异步引擎请传入 async_engine.sync_engine）。"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _report(stats: QueryStats, method: str, path: str) -> None:
+    threshold = get_settings().database.n_plus_one_threshold
+    if not threshold:
+        return
+    for shape, n in stats.n_plus_one_suspects(threshold):
+        logger.warning(f"疑似 N+1 查询 {method} {path}: 重复执行 {n} 次: {shape}")
+
+
+class QueryStatsMiddleware:
+    """纯 ASGI 中间件：为每个请求建立查询统计，并在结束时报告 N+1 嫌疑。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        expose = get_settings().database.expose_query_stats
+
+        async def send_wrapper(message):
+            if expose and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append(
+                    (b"x-db-time-ms", f"{stats.total_time * 1000:.1f}".encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            _report(stats, scope["method"], scope["path"])
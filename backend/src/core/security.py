@@ -1,14 +1,18 @@
 import os
+import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from jose import jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .database import get_session
+from .config import get_settings
+from .database import get_async_session, get_session
+from .tracing import traced
 from ..models import User
 
 # Configuration
@@ -42,24 +46,56 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_username(token: str) -> str:
+    """校验 JWT 并取出用户名，失败时抛出 401。"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except Exception:
-        raise credentials_exception
+        raise _credentials_exception()
+    if username is None:
+        raise _credentials_exception()
+    return username
 
+
+@traced("auth")
+def get_current_user(
+    token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)
+) -> User:
+    username = _decode_username(token)
     statement = select(User).where(User.username == username)
     user = session.exec(statement).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
+
+
+@traced("auth")
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    """get_current_user 的异步版本，供 async 路由使用。"""
+    username = _decode_username(token)
+    statement = select(User).where(User.username == username)
+    user = (await session.exec(statement)).first()
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+def verify_api_key(x_api_key: str = Header(default="", alias="X-API-Key")) -> None:
+    """校验 X-API-Key 请求头；security.api_key 留空时跳过校验（本地开发）。"""
+    expected = get_settings().security.api_key
+    if expected and not secrets.compare_digest(x_api_key, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
+        )
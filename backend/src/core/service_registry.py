@@ -0,0 +1,222 @@
+"""外部依赖（向量检索、LLM Agent 等）的并发初始化、懒加载、后台重连与就绪探测。
+
+每个依赖由一个 ManagedService 管理：初始化在线程池中执行并受超时约束；
+失败后按指数退避在后台重试，而不是永久保持 None；就绪状态由带缓存的探测
+函数给出，供 /ready 使用，避免每次探测都访问外部服务。
+"""
+
+import asyncio
+import logging
+import socket
+import time
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+
+from .config import get_settings
+
+logger = logging.getLogger("loseweight.services")
+
+PENDING = "pending"
+INITIALIZING = "initializing"
+READY = "ready"
+FAILED = "failed"
+
+
+def tcp_probe(host: str, port: int, timeout: float) -> None:
+    """TCP 连通性探测（不依赖具体客户端 SDK）。"""
+    with socket.create_connection((host, port), timeout=timeout):
+        pass
+
+
+class ManagedService:
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        probe: Optional[Callable[[Any], None]] = None,
+        timeout: float = 15,
+        lazy: bool = False,
+    ):
+        self.name = name
+        self.factory = factory
+        self.probe_fn = probe
+        self.timeout = timeout
+        self.lazy = lazy
+
+        self.instance: Any = None
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self._init_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._probe_result: Optional[dict] = None
+        self._probe_at = 0.0
+
+    def provide(self, instance: Any) -> None:
+        """直接注入实例（测试与基准替身使用）。"""
+        self.instance = instance
+        self.status = READY
+        self.error = None
+        self._probe_result = None
+
+    async def _initialize(self) -> None:
+        self.status = INITIALIZING
+        start = time.perf_counter()
+        try:
+            instance = await asyncio.to_thread(self.factory)
+        except Exception as e:
+            self.status = FAILED
+            self.error = str(e) or type(e).__name__
+            logger.error("依赖 %s 初始化失败: %s", self.name, self.error)
+            self._schedule_reconnect()
+            return
+        self.provide(instance)
+        logger.info(
+            "依赖 %s 初始化成功 (%.0fms)",
+            self.name,
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def start(self) -> asyncio.Task:
+        """启动（或复用进行中的）初始化任务。"""
+        if self._init_task is None or self._init_task.done():
+            self._init_task = asyncio.create_task(self._initialize())
+        return self._init_task
+
+    async def get(self) -> Any:
+        """返回可用实例；必要时触发初始化并最多等待 timeout 秒，失败返回 None。"""
+        if self.status == READY:
+            return self.instance
+        if self.status == FAILED and self._reconnect_task is not None:
+            # 后台正在重连，不阻塞当前请求
+            return None
+        if self.status == INITIALIZING and self.error:
+            # 已有请求等待超时，后续请求不再重复等待
+            return None
+        task = self.start()
+        try:
+            # shield：超时只放弃等待，初始化仍在后台继续
+            await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            if self.status != READY:
+                self.error = f"初始化超过 {self.timeout:g}s"
+                logger.warning("依赖 %s %s", self.name, self.error)
+        return self.instance if self.status == READY else None
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        settings = get_settings().services
+        delay = settings.reconnect_initial_s
+        try:
+            while self.status != READY:
+                await asyncio.sleep(delay)
+                logger.info("尝试重新初始化依赖 %s", self.name)
+                await self.start()
+                delay = min(delay * 2, settings.reconnect_max_s)
+        finally:
+            self._reconnect_task = None
+
+    async def check(self, ttl: float, timeout: float) -> dict:
+        """就绪探测，结果缓存 ttl 秒。"""
+        now = time.monotonic()
+        if self._probe_result is not None and now - self._probe_at < ttl:
+            return self._probe_result
+
+        result: dict[str, Any] = {"status": self.status}
+        if self.status == READY and self.probe_fn is not None:
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(self.probe_fn, self.instance), timeout
+                )
+                result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            except Exception as e:
+                result["status"] = "unreachable"
+                result["error"] = str(e) or type(e).__name__
+        elif self.error:
+            result["error"] = self.error
+        self._probe_result, self._probe_at = result, now
+        return result
+
+    async def close(self) -> None:
+        for task in (self._reconnect_task, self._init_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self.services: dict[str, ManagedService] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        probe: Optional[Callable[[Any], None]] = None,
+    ) -> ManagedService:
+        settings = get_settings().services
+        service = ManagedService(
+            name,
+            factory,
+            probe=probe,
+            timeout=settings.timeouts.get(name, settings.init_timeout_s),
+            lazy=name in settings.lazy,
+        )
+        self.services[name] = service
+        return service
+
+    def provide(
+        self, name: str, instance: Any, probe: Optional[Callable[[Any], None]] = None
+    ) -> None:
+        """以现成实例替换依赖（测试与基准替身使用），不再执行原工厂与探测。"""
+        self.register(name, lambda: instance, probe=probe).provide(instance)
+
+    async def start(self) -> None:
+        """并发初始化所有非懒加载依赖；默认不阻塞启动，由 /ready 反映进度。"""
+        tasks = [
+            service.start()
+            for service in self.services.values()
+            if not service.lazy and service.status == PENDING
+        ]
+        if tasks and get_settings().services.block_startup:
+            timeout = max(s.timeout for s in self.services.values())
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def get(self, name: str) -> Any:
+        service = self.services.get(name)
+        return await service.get() if service is not None else None
+
+    async def readiness(self) -> tuple[bool, dict]:
+        settings = get_settings().services
+        names = list(self.services)
+        results = await asyncio.gather(
+            *(
+                self.services[name].check(
+                    settings.probe_ttl_s, settings.probe_timeout_s
+                )
+                for name in names
+            )
+        )
+        report = {}
+        ready = True
+        for name, result in zip(names, results):
+            service = self.services[name]
+            required = name in settings.required
+            report[name] = {**result, "required": required, "lazy": service.lazy}
+            # 懒加载依赖在首次使用前处于 pending，不影响就绪
+            pending_lazy = service.lazy and result["status"] == PENDING
+            if required and result["status"] != READY and not pending_lazy:
+                ready = False
+        return ready, report
+
+    async def close(self) -> None:
+        await asyncio.gather(*(s.close() for s in self.services.values()))
+
+
+async def get_service(request: Request, name: str) -> Any:
+    """在路由中获取依赖实例（懒加载依赖首次访问时初始化），不可用时返回 None。"""
+    registry: ServiceRegistry = request.app.state.services
+    return await registry.get(name)
@@ -0,0 +1,14 @@
+"""多进程间共享的只读数据。
+
+工作进程由预加载后的主进程 fork 而来，模块级只读对象（如食物目录）天然位于
+写时复制页中；但 CPython 的引用计数与 GC 会写对象头，导致页面被逐步复制。
+freeze_heap 在 fork 前把现有对象移出 GC 跟踪，减少这类复制。
+"""
+
+import gc
+
+
+def freeze_heap() -> None:
+    """fork 前调用：回收垃圾后冻结现有对象，避免 GC 触碰共享页。"""
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,63 @@
+"""优雅退出（drain）期间的在途流收尾。
+
+收到退出信号后 uvicorn 停止接受新连接并等待在途请求结束，超过
+server.graceful_timeout_s 仍未结束的请求会被直接取消，SSE 客户端只会看到连接
+中断。begin_drain 记录收尾截止时间，drain_stream 在截止前主动发送收尾事件并
+结束流，客户端据此提示稍后重试。
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+_deadline: Optional[float] = None
+
+
+def begin_drain(grace: float) -> None:
+    """进入收尾阶段，grace 秒后仍未结束的流将被主动关闭。"""
+    global _deadline
+    _deadline = time.monotonic() + grace
+
+
+def end_drain() -> None:
+    global _deadline
+    _deadline = None
+
+
+def drain_remaining() -> Optional[float]:
+    """距收尾截止的剩余秒数，未处于收尾阶段时返回 None。"""
+    if _deadline is None:
+        return None
+    return max(0.0, _deadline - time.monotonic())
+
+
+async def drain_stream(stream: AsyncIterator[str], farewell: str) -> AsyncIterator[str]:
+    """透传流式响应；收尾截止时取消上游生成器并以 farewell 结束。"""
+    iterator = aiter(stream)
+    while True:
+        remaining = drain_remaining()
+        if remaining is None:
+            # 常规路径不创建额外任务
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            yield chunk
+            continue
+
+        pending = asyncio.ensure_future(anext(iterator))
+        try:
+            done, _ = await asyncio.wait({pending}, timeout=remaining)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        if not done:
+            pending.cancel()
+            await asyncio.wait({pending})
+            yield farewell
+            return
+        try:
+            chunk = pending.result()
+        except StopAsyncIteration:
+            return
+        yield chunk
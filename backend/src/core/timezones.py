@@ -0,0 +1,43 @@
+"""用户本地时区相关的日期换算工具。"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@lru_cache(maxsize=256)
+def resolve_timezone(name: str | None) -> ZoneInfo:
+    """解析 IANA 时区名，无效或为空时回退到 UTC。"""
+    if not name:
+        return ZoneInfo("UTC")
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def local_date_of(moment: datetime, tz_name: str | None) -> date:
+    """返回某一时刻在用户时区下的日期（无时区信息的时间按 UTC 处理）。"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(resolve_timezone(tz_name)).date()
+
+
+def local_today(tz_name: str | None) -> date:
+    return local_date_of(datetime.now(timezone.utc), tz_name)
+
+
+def local_day_bounds(day: date, tz_name: str | None) -> tuple[datetime, datetime]:
+    """返回用户本地某一天对应的 UTC 起止时间 [start, end)。"""
+    tz = resolve_timezone(tz_name)
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
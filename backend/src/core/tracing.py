@@ -0,0 +1,244 @@
+"""轻量级请求内链路追踪（基于 contextvars，无需外部采集器）。
+
+每个 HTTP 请求创建一个 Trace，`span()` 记录各阶段耗时（认证、数据库、
+食物检索、LLM 等）。请求结束时按名称汇总为 `Server-Timing` 响应头；开启
+tracing.export 后，按采样率（或超过慢请求阈值时）将完整 span 列表以 JSON
+行写入本地文件，文件按日志配置轮转与压缩。
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .config import get_settings
+from .logging import _build_file_handler
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float = 0.0
+    detail: Optional[str] = None
+
+
+@dataclass
+class Trace:
+    method: str
+    path: str
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+
+    def summary(self) -> dict[str, tuple[float, int]]:
+        """按名称汇总：{name: (总耗时秒, 次数)}。"""
+        totals: dict[str, tuple[float, int]] = {}
+        for span in list(self.spans):
+            total, count = totals.get(span.name, (0.0, 0))
+            totals[span.name] = (total + span.duration, count + 1)
+        return totals
+
+    def server_timing(self) -> str:
+        parts = []
+        for name, (total, count) in self.summary().items():
+            entry = f"{name};dur={total * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            parts.append(entry)
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, detail: Optional[str] = None):
+    """记录一个阶段的耗时；不在请求上下文中时为空操作。"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    item = Span(name=name, start=time.perf_counter() - trace.start, detail=detail)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        item.duration = time.perf_counter() - started
+        # list.append 是原子操作，线程池中的同步依赖也可安全写入
+        trace.spans.append(item)
+
+
+def add_span(name: str, duration: float, detail: Optional[str] = None) -> None:
+    """记录一个已知耗时的 span（用于事件回调等无法包裹代码块的场景）。"""
+    trace = _current_trace.get()
+    if trace is not None:
+        start = time.perf_counter() - trace.start - duration
+        trace.spans.append(
+            Span(name=name, start=start, duration=duration, detail=detail)
+        )
+
+
+def traced(name: str):
+    """为同步函数、协程函数或异步生成器函数添加 span 的装饰器。"""
+
+    def decorator(func):
+        detail = func.__qualname__
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                with span(name, detail):
+                    async for item in func(*args, **kwargs):
+                        yield item
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, detail):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, detail):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_class(name: str):
+    """类装饰器：为类中所有公开方法添加同名 span（用于仓储层）。"""
+
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            setattr(cls, attr, traced(name)(value))
+        return cls
+
+    return decorator
+
+
+_trace_logger: Optional[logging.Logger] = None
+_trace_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _get_trace_logger() -> logging.Logger:
+    """追踪记录写入独立的 JSON 行文件，同样经由队列在后台线程落盘。"""
+    global _trace_logger, _trace_listener
+    if _trace_logger is None:
+        settings = get_settings()
+        file_handler = _build_file_handler(
+            settings.logging, Path(settings.tracing.file)
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _trace_listener = logging.handlers.QueueListener(trace_queue, file_handler)
+        _trace_listener.start()
+
+        logger = logging.getLogger("loseweight.trace")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.handlers = [logging.handlers.QueueHandler(trace_queue)]
+        _trace_logger = logger
+    return _trace_logger
+
+
+def stop_trace_export() -> None:
+    """停止追踪记录的后台线程并刷新队列中剩余的记录。"""
+    global _trace_logger, _trace_listener
+    if _trace_listener is not None:
+        _trace_listener.stop()
+        for handler in _trace_listener.handlers:
+            handler.close()
+        _trace_listener = None
+        _trace_logger = None
+
+
+atexit.register(stop_trace_export)
+
+
+def _export(trace: Trace, status: int) -> None:
+    settings = get_settings().tracing
+    if not settings.export:
+        return
+    elapsed_ms = (time.perf_counter() - trace.start) * 1000
+    if elapsed_ms < settings.slow_threshold_ms and (
+        settings.sample_rate <= 0 or random.random() >= settings.sample_rate
+    ):
+        return
+    record = {
+        "trace_id": trace.trace_id,
+        "method": trace.method,
+        "path": trace.path,
+        "status": status,
+        "duration_ms": round(elapsed_ms, 2),
+        "spans": [
+            {
+                "name": s.name,
+                "detail": s.detail,
+                "start_ms": round(s.start * 1000, 2),
+                "duration_ms": round(s.duration * 1000, 2),
+            }
+            for s in list(trace.spans)
+        ],
+    }
+    _get_trace_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+class TracingMiddleware:
+    """纯 ASGI 中间件：创建请求级 Trace，写入 Server-Timing 与 X-Trace-Id 响应头。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings().tracing
+        if scope["type"] != "http" or not settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(method=scope["method"], path=scope["path"])
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", trace.trace_id.encode()))
+                if settings.server_timing:
+                    headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            _export(trace, status_code)
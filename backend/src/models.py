@@ -1,5 +1,6 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional, List
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy.orm import relationship
 
@@ -106,6 +107,7 @@ class UserBase(SQLModel):
     bmr: Optional[float] = None
     tdee: Optional[float] = None
     daily_calorie_goal: Optional[float] = None
+    timezone: str = Field(default="UTC")  # IANA 时区名，用于按本地日期汇总摄入
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = Field(default=True)
 
@@ -131,6 +133,9 @@ class User(UserBase, table=True):
     chat_messages: List["ChatMessage"] = Relationship(
         back_populates="user", sa_relationship_kwargs={"cascade": "all, delete-orphan"}
     )
+    daily_intakes: List["DailyIntake"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+    )
 
 
 class Ingredient(SQLModel, table=True):
@@ -160,10 +165,29 @@ class FoodLog(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, foreign_key="users.id")
     food_name: str
     calories: float
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    fat_g: Optional[float] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     user: Optional[User] = Relationship(back_populates="food_logs")
 
 
+class DailyIntake(SQLModel, table=True):
+    """按用户本地日期汇总的每日摄入（随 FoodLog 写入增量维护）。"""
+
+    __tablename__ = "daily_intake"
+    __table_args__ = (UniqueConstraint("user_id", "local_date"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    local_date: date = Field(index=True)
+    calories: float = 0
+    entry_count: int = 0
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    fat_g: Optional[float] = None
+    user: Optional[User] = Relationship(back_populates="daily_intakes")
+
+
 class ChatMessage(SQLModel, table=True):
     __tablename__ = "chat_messages"
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -175,6 +199,42 @@ class ChatMessage(SQLModel, table=True):
     user: Optional[User] = Relationship(back_populates="chat_messages")
 
 
+class ChatEmbedding(SQLModel, table=True):
+    """聊天消息的嵌入向量（float32 原始字节），用于长期记忆召回。"""
+
+    __tablename__ = "chat_embeddings"
+    __table_args__ = (
+        Index("ix_chat_embeddings_user_message", "user_id", "message_id"),
+    )
+    message_id: int = Field(foreign_key="chat_messages.id", primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    vector: bytes
+
+
+class SyncChange(SQLModel, table=True):
+    """增量同步变更日志：自增 id 即变更序号，删除以 deleted=True 的墓碑记录。
+
+    同一用户的变更在该用户行的锁下写入，序号按提交顺序递增；超过保留期的
+    记录被定期清理（每个用户每类数据保留最新一条，版本号不回退）。
+    """
+
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        Index("ix_sync_changes_user_seq", "user_id", "id"),
+        # 按数据类型取最新序号（ETag 版本号）
+        Index("ix_sync_changes_user_entity_seq", "user_id", "entity", "id"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    # weights / food_logs / chat_messages / profile
+    entity: str
+    entity_id: int
+    deleted: bool = False
+    created_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+
+
 # Update User model to include chat_messages relationship
 # (Since I cannot easily re-read the User class and replace it perfectly without risks,
 # I will use a separate replacement for User class if needed,
@@ -1,8 +1,13 @@
-from typing import List
+from typing import Iterable, List
 from sqlmodel import Session, select, desc, delete
-from ..models import ChatMessage
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.tracing import traced_class
+from ..models import ChatEmbedding, ChatMessage
+from .projection import fetch_dicts_async, select_fields
+from .sync_repository import entity_version, lock_users, record_changes
 
 
+@traced_class("db")
 class ChatRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -41,7 +46,110 @@ class ChatRepository:
         self.session.commit()
 
     def clear_history(self, user_id: int):
-        """清除用户的所有聊天历史记录。"""
-        statement = delete(ChatMessage).where(ChatMessage.user_id == user_id)
-        self.session.exec(statement)
+        """清除用户的所有聊天历史记录（连同其嵌入向量）。"""
+        self.session.exec(delete(ChatEmbedding).where(ChatEmbedding.user_id == user_id))
+        statement = (
+            delete(ChatMessage)
+            .where(ChatMessage.user_id == user_id)
+            .returning(ChatMessage.id)
+        )
+        ids = self.session.exec(statement).scalars().all()
+        if ids:
+            self.session.exec(lock_users([user_id]))
+            self.session.exec(
+                record_changes(user_id, "chat_messages", ids, deleted=True)
+            )
         self.session.commit()
+
+
+@traced_class("db")
+class AsyncChatRepository:
+    """ChatRepository 的异步版本，供 async 路由使用，避免阻塞事件循环。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_history_rows(
+        self, user_id: int, fields: Iterable[str], limit: int | None = 20
+    ) -> List[dict]:
+        """按字段读取用户最近的聊天记录，按时间正序返回字典。"""
+        statement = (
+            select_fields(ChatMessage, fields)
+            .where(ChatMessage.user_id == user_id)
+            .order_by(desc(ChatMessage.timestamp))
+        )
+        if limit is not None:
+            statement = statement.limit(limit)
+        rows = await fetch_dicts_async(self.session, statement)
+        return rows[::-1]
+
+    async def get_version(self, user_id: int) -> int:
+        statement = entity_version(user_id, "chat_messages")
+        return (await self.session.exec(statement)).one() or 0
+
+    async def add_messages(
+        self, user_id: int, messages: List[tuple[str, str]]
+    ) -> List[ChatMessage]:
+        """批量保存聊天记录，单事务提交，返回已分配 id 的记录。"""
+        if not messages:
+            return []
+
+        records = [
+            ChatMessage(user_id=user_id, role=role, content=content)
+            for role, content in messages
+        ]
+        self.session.add_all(records)
+        await self.session.commit()
+        return records
+
+    async def clear_history(self, user_id: int):
+        """清除用户的所有聊天历史记录（连同其嵌入向量）。"""
+        await self.session.exec(
+            delete(ChatEmbedding).where(ChatEmbedding.user_id == user_id)
+        )
+        statement = (
+            delete(ChatMessage)
+            .where(ChatMessage.user_id == user_id)
+            .returning(ChatMessage.id)
+        )
+        ids = (await self.session.exec(statement)).scalars().all()
+        if ids:
+            await self.session.exec(lock_users([user_id]))
+            await self.session.exec(
+                record_changes(user_id, "chat_messages", ids, deleted=True)
+            )
+        await self.session.commit()
+
+    async def get_messages(self, user_id: int, ids: List[int]) -> List[ChatMessage]:
+        """按 id 取用户的聊天记录（已删除的 id 被忽略），按时间正序返回。"""
+        if not ids:
+            return []
+        statement = (
+            select(ChatMessage)
+            .where(ChatMessage.user_id == user_id, ChatMessage.id.in_(ids))
+            .order_by(ChatMessage.id)
+        )
+        return list((await self.session.exec(statement)).all())
+
+    async def add_embeddings(
+        self, user_id: int, vectors: List[tuple[int, bytes]]
+    ) -> None:
+        """保存消息嵌入向量（message_id, float32 字节）。"""
+        self.session.add_all(
+            ChatEmbedding(message_id=message_id, user_id=user_id, vector=vector)
+            for message_id, vector in vectors
+        )
+        await self.session.commit()
+
+    async def get_embeddings(
+        self, user_id: int, after_id: int = 0
+    ) -> List[tuple[int, bytes]]:
+        """取 message_id 大于 after_id 的嵌入向量，按 message_id 升序（增量加载）。"""
+        statement = (
+            select(ChatEmbedding.message_id, ChatEmbedding.vector)
+            .where(
+                ChatEmbedding.user_id == user_id, ChatEmbedding.message_id > after_id
+            )
+            .order_by(ChatEmbedding.message_id)
+        )
+        return [tuple(row) for row in (await self.session.exec(statement)).all()]
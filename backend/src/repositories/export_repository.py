@@ -0,0 +1,54 @@
+from typing import AsyncIterator, Sequence
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.tracing import traced_class
+from ..models import ChatMessage, FoodLog, FoodRecognition, WeightRecord
+from .projection import select_fields
+
+# 导出实体名 -> (模型, 导出列)
+EXPORT_ENTITIES = {
+    "weights": (WeightRecord, ("id", "recorded_at", "weight_kg", "notes")),
+    "food_logs": (
+        FoodLog,
+        ("id", "timestamp", "food_name", "calories", "protein_g", "carbs_g", "fat_g"),
+    ),
+    "recognitions": (
+        FoodRecognition,
+        (
+            "id",
+            "timestamp",
+            "food_name",
+            "calories",
+            "verification_status",
+            "reason",
+            "image_path",
+        ),
+    ),
+    "chat_messages": (ChatMessage, ("id", "timestamp", "role", "content")),
+}
+
+
+@traced_class("db")
+class AsyncExportRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def stream_rows(
+        self, entity: str, user_id: int, batch_size: int
+    ) -> AsyncIterator[Sequence[tuple]]:
+        """按主键顺序分批读取该用户的全部行。
+
+        使用服务端游标（stream + yield_per），每次只在内存中保留一批，
+        导出多年数据时内存占用与总行数无关。
+        """
+        model, fields = EXPORT_ENTITIES[entity]
+        statement = (
+            select_fields(model, fields)
+            .where(model.user_id == user_id)
+            .order_by(model.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(statement)
+        async for partition in result.partitions():
+            yield partition
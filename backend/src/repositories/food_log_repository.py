@@ -1,22 +1,179 @@
-from datetime import datetime, time, timedelta, timezone
-from typing import List
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional
 
-from sqlmodel import Session, select, and_
+from sqlalchemy import Connection, event, func, insert, inspect, literal, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select, and_, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..models import FoodLog
+from ..core.database import local_date
+from ..core.timezones import (
+    local_date_of,
+    local_day_bounds,
+    local_today,
+    resolve_timezone,
+)
+from ..core.tracing import traced_class
+from ..models import DailyIntake, FoodLog, User
+from .projection import fetch_dicts, select_fields
+from .sync_repository import entity_version
 
+MACRO_FIELDS = ("protein_g", "carbs_g", "fat_g")
+# 参与每日汇总的字段（顺序即 _rollup_values 返回值的顺序）
+ROLLUP_FIELDS = ("user_id", "timestamp", "calories", *MACRO_FIELDS)
 
+
+def _rollup_values(log: FoodLog, previous: Optional[tuple] = None) -> tuple:
+    """饮食记录参与汇总的字段值；给出 previous（flush 前的数据库值）时，
+    本次未修改的字段沿用原值，避免加载已过期的属性。"""
+    attrs = inspect(log).attrs
+    if previous is None:
+        return tuple(getattr(log, field) for field in ROLLUP_FIELDS)
+    values = []
+    for field, old in zip(ROLLUP_FIELDS, previous):
+        added = attrs[field].history.added
+        values.append(added[0] if added else old)
+    return tuple(values)
+
+
+def _apply_intake_delta(connection: Connection, delta: DailyIntake) -> None:
+    """原子地把增量累加到当日汇总行；新增记录且行不存在时插入
+    （并发插入冲突时回退为更新），减少时只更新。"""
+    values = {
+        "calories": DailyIntake.calories + delta.calories,
+        "entry_count": DailyIntake.entry_count + delta.entry_count,
+    }
+    for field in MACRO_FIELDS:
+        amount = getattr(delta, field)
+        if amount is not None:
+            column = getattr(DailyIntake, field)
+            values[field] = func.coalesce(column, 0) + amount
+
+    statement = (
+        update(DailyIntake)
+        .where(
+            DailyIntake.user_id == delta.user_id,
+            DailyIntake.local_date == delta.local_date,
+        )
+        .values(**values)
+    )
+    if connection.execute(statement).rowcount or delta.entry_count <= 0:
+        return
+
+    row = delta.model_dump(exclude={"id"})
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(DailyIntake).values(**row))
+    except IntegrityError:
+        connection.execute(statement)
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _capture_previous_logs(session: OrmSession, _flush_context, _instances) -> None:
+    """修改或删除的饮食记录在 flush 之前从数据库读取原值：
+    属性可能已过期（提交后再修改），删除之后也无法再加载。"""
+    ids = [
+        inspect(log).identity[0]
+        for log in (*session.dirty, *session.deleted)
+        if isinstance(log, FoodLog) and inspect(log).identity
+    ]
+    previous = {}
+    if ids:
+        columns = [getattr(FoodLog, field) for field in ROLLUP_FIELDS]
+        statement = select(FoodLog.id, *columns).where(FoodLog.id.in_(ids))
+        for row in session.connection().execute(statement):
+            previous[row[0]] = tuple(row[1:])
+    session.info["previous_food_logs"] = previous
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _sync_daily_intake(session: OrmSession, _flush_context) -> None:
+    """在模型层维护每日汇总：任何会话（包括 Agent 工具使用的 Session(engine)）
+    flush 的 FoodLog 增删改，都在同一事务中按 (用户, 本地日期) 合并后累加。"""
+    previous = session.info.pop("previous_food_logs", {})
+    changes = []
+    for log in session.new:
+        if isinstance(log, FoodLog):
+            changes.append((_rollup_values(log), 1))
+    for log in session.dirty:
+        if not isinstance(log, FoodLog):
+            continue
+        before = previous.get(inspect(log).identity[0])
+        after = _rollup_values(log, before) if before else None
+        if before != after:
+            changes += [(before, -1), (after, 1)]
+    for log in session.deleted:
+        before = previous.get(inspect(log).identity[0])
+        if isinstance(log, FoodLog) and before:
+            changes.append((before, -1))
+    changes = [(values, sign) for values, sign in changes if values[0] is not None]
+    if not changes:
+        return
+
+    connection = session.connection()
+    user_ids = {values[0] for values, _ in changes}
+    zones = dict(
+        connection.execute(
+            select(User.id, User.timezone).where(User.id.in_(user_ids))
+        ).all()
+    )
+    totals: dict[tuple[int, date], DailyIntake] = {}
+    for (user_id, timestamp, calories, *macros), sign in changes:
+        day = local_date_of(timestamp, zones.get(user_id))
+        row = totals.get((user_id, day))
+        if row is None:
+            row = totals[user_id, day] = DailyIntake(user_id=user_id, local_date=day)
+        row.calories += sign * calories
+        row.entry_count += sign
+        for field, amount in zip(MACRO_FIELDS, macros):
+            if amount is not None:
+                setattr(row, field, (getattr(row, field) or 0) + sign * amount)
+    for delta in totals.values():
+        _apply_intake_delta(connection, delta)
+
+
+@traced_class("db")
 class FoodLogRepository:
     def __init__(self, session: Session):
         self.session = session
 
-    def create_log(self, user_id: int, food_name: str, calories: float) -> FoodLog:
-        log = FoodLog(user_id=user_id, food_name=food_name, calories=calories)
+    def create_log(
+        self,
+        user_id: int,
+        food_name: str,
+        calories: float,
+        timestamp: Optional[datetime] = None,
+        protein_g: Optional[float] = None,
+        carbs_g: Optional[float] = None,
+        fat_g: Optional[float] = None,
+    ) -> FoodLog:
+        """写入饮食记录（每日汇总与变更日志由 flush 钩子在同一事务中维护）。"""
+        log = FoodLog(
+            user_id=user_id,
+            food_name=food_name,
+            calories=calories,
+            protein_g=protein_g,
+            carbs_g=carbs_g,
+            fat_g=fat_g,
+            timestamp=timestamp or datetime.now(timezone.utc),
+        )
         self.session.add(log)
         self.session.commit()
         self.session.refresh(log)
         return log
 
+    def create_logs(self, user_id: int, logs: List[FoodLog]) -> List[int]:
+        """批量写入饮食记录：一次 flush（多行 INSERT ... RETURNING）取回 id，
+        汇总由 flush 钩子按本地日期合并更新（每个日期一条语句），整体一次提交。"""
+        for log in logs:
+            log.user_id = user_id
+        self.session.add_all(logs)
+        self.session.flush()
+        ids = [log.id for log in logs]
+        self.session.commit()
+        return ids
+
     def get_logs_by_date_range(
         self, user_id: int, start_date: datetime, end_date: datetime
     ) -> List[FoodLog]:
@@ -43,8 +200,89 @@ class FoodLogRepository:
         )
         return self.session.exec(statement).all()
 
-    def get_today_logs(self, user_id: int) -> List[FoodLog]:
-        now = datetime.now(timezone.utc)
-        start_of_day = datetime.combine(now.date(), time.min, tzinfo=timezone.utc)
-        end_of_day = start_of_day + timedelta(days=1)
+    def get_version(self, user_id: int) -> int:
+        return self.session.exec(entity_version(user_id, "food_logs")).one() or 0
+
+    def get_today_logs(
+        self, user_id: int, tz_name: Optional[str] = None
+    ) -> List[FoodLog]:
+        start_of_day, end_of_day = local_day_bounds(local_today(tz_name), tz_name)
         return self.get_logs_by_date_range(user_id, start_of_day, end_of_day)
+
+    def get_today_rows(
+        self, user_id: int, tz_name: Optional[str], fields: Iterable[str]
+    ) -> List[dict]:
+        """按字段读取今日（用户本地时区）的饮食记录，供只读列表直接序列化。"""
+        start_of_day, end_of_day = local_day_bounds(local_today(tz_name), tz_name)
+        statement = (
+            select_fields(FoodLog, fields)
+            .where(
+                FoodLog.user_id == user_id,
+                FoodLog.timestamp >= start_of_day,
+                FoodLog.timestamp < end_of_day,
+            )
+            .order_by(FoodLog.timestamp.asc())
+        )
+        return fetch_dicts(self.session, statement)
+
+    def get_daily_intake(
+        self, user_id: int, start_date: date, end_date: date
+    ) -> List[DailyIntake]:
+        """读取 [start_date, end_date] 范围内的每日汇总（闭区间，按日期升序）。"""
+        statement = (
+            select(DailyIntake)
+            .where(
+                DailyIntake.user_id == user_id,
+                DailyIntake.local_date >= start_date,
+                DailyIntake.local_date <= end_date,
+            )
+            .order_by(DailyIntake.local_date.asc())
+        )
+        return list(self.session.exec(statement).all())
+
+    def rebuild_daily_intake(self, user_id: int, tz_name: Optional[str]) -> None:
+        """按新时区从原始记录重建该用户的全部每日汇总（用户修改时区时调用）。
+
+        在数据库中按本地日期分组汇总后写回，不逐行加载饮食记录；不提交，
+        由调用方与时区修改在同一事务中提交。
+        """
+        self.session.exec(delete(DailyIntake).where(DailyIntake.user_id == user_id))
+
+        # 时区名内联为字面量，SELECT 与 GROUP BY 中的表达式才能被视为相同
+        zone = literal(resolve_timezone(tz_name).key, literal_execute=True)
+        day = local_date(FoodLog.timestamp, zone)
+        rows = (
+            select(
+                FoodLog.user_id,
+                day,
+                func.sum(FoodLog.calories),
+                func.count(),
+                *(func.sum(getattr(FoodLog, field)) for field in MACRO_FIELDS),
+            )
+            .where(FoodLog.user_id == user_id)
+            .group_by(FoodLog.user_id, day)
+        )
+        columns = ["user_id", "local_date", "calories", "entry_count", *MACRO_FIELDS]
+        self.session.exec(insert(DailyIntake).from_select(columns, rows))
+
+
+@traced_class("db")
+class AsyncFoodLogRepository:
+    """FoodLogRepository 的异步只读版本（供 async 聊天路由读取每日汇总）。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_daily_intake(
+        self, user_id: int, start_date: date, end_date: date
+    ) -> List[DailyIntake]:
+        statement = (
+            select(DailyIntake)
+            .where(
+                DailyIntake.user_id == user_id,
+                DailyIntake.local_date >= start_date,
+                DailyIntake.local_date <= end_date,
+            )
+            .order_by(DailyIntake.local_date.asc())
+        )
+        return list((await self.session.exec(statement)).all())
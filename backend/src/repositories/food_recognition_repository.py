@@ -3,9 +3,11 @@ from typing import List, Optional
 
 from sqlmodel import Session, select
 
+from ..core.tracing import traced_class
 from ..models import FoodRecognition
 
 
+@traced_class("db")
 class FoodRecognitionRepository:
     def __init__(self, session: Session):
         self.session = session
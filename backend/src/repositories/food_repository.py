@@ -1,10 +1,13 @@
 from typing import Dict, List, Any, Optional
 
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-from ..models import Food
+from ..core.tracing import traced_class
+from ..models import Food, FoodNutrient
 
 
+@traced_class("db")
 class FoodRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -13,11 +16,20 @@ class FoodRepository:
         statement = select(Food).where(Food.fdc_id == fdc_id)
         return self.session.exec(statement).first()
 
-    def get_foods_by_ids(self, fdc_ids: List[int]) -> Dict[int, Food]:
-        """批量查询食物，返回 {fdc_id: Food} 的字典，解决 N+1 查询问题。"""
+    def get_foods_by_ids(
+        self, fdc_ids: List[int], with_nutrients: bool = False
+    ) -> Dict[int, Food]:
+        """批量查询食物，返回 {fdc_id: Food} 的字典，解决 N+1 查询问题。
+
+        with_nutrients 为 True 时一并预加载营养素，避免逐个食物懒加载。
+        """
         if not fdc_ids:
             return {}
         statement = select(Food).where(Food.fdc_id.in_(fdc_ids))  # type: ignore[attr-defined]
+        if with_nutrients:
+            statement = statement.options(
+                selectinload(Food.nutrients).selectinload(FoodNutrient.nutrient)
+            )
         foods = self.session.exec(statement).all()
         return {food.fdc_id: food for food in foods}
 
@@ -32,7 +44,7 @@ class FoodRepository:
 
     def get_foods_simple_details(self, fdc_ids: List[int]) -> Dict[int, Dict[str, Any]]:
         """批量获取食物的简要信息（描述、分类、热量）。"""
-        foods_map = self.get_foods_by_ids(fdc_ids)
+        foods_map = self.get_foods_by_ids(fdc_ids, with_nutrients=True)
         result: Dict[int, Dict[str, Any]] = {}
         for fdc_id, food in foods_map.items():
             result[fdc_id] = {
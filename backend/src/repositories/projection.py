@@ -0,0 +1,34 @@
+from typing import Any, Iterable, List
+
+from sqlalchemy import Select
+from sqlmodel import Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def select_fields(model: type[SQLModel], fields: Iterable[str]) -> Select:
+    """只选取响应所需的列。"""
+    return select(*(getattr(model, name) for name in fields))
+
+
+def fetch_dicts(session: Session, statement: Select) -> List[dict[str, Any]]:
+    """执行按列查询并返回普通字典列表。
+
+    只读列表不需要 ORM 实体：跳过实体构造与 identity map，响应模型从 dict 校验
+    也远快于 from_attributes 逐个 getattr（RowMapping 走通用 Mapping 路径，同样较慢）。
+    """
+    return _to_dicts(statement, session.exec(statement))
+
+
+async def fetch_dicts_async(
+    session: AsyncSession, statement: Select
+) -> List[dict[str, Any]]:
+    """fetch_dicts 的异步版本。"""
+    return _to_dicts(statement, await session.exec(statement))
+
+
+def _to_dicts(statement: Select, result) -> List[dict[str, Any]]:
+    keys = list(statement.selected_columns.keys())
+    if len(keys) == 1:
+        # 单列查询时 SQLModel 返回标量结果
+        return [{keys[0]: value} for value in result]
+    return [dict(zip(keys, row)) for row in result]
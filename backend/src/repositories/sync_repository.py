@@ -0,0 +1,199 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Delete, Insert, Select, delete, event, func, insert, or_
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.tracing import traced_class
+from ..models import ChatMessage, FoodLog, SyncChange, User, WeightRecord
+from .projection import fetch_dicts, select_fields
+
+# 同步实体名 -> 模型（profile 单独处理）
+SYNC_ENTITIES = {
+    "weights": WeightRecord,
+    "food_logs": FoodLog,
+    "chat_messages": ChatMessage,
+}
+
+# 由 flush 钩子记录变更的模型 -> 同步实体名（资料的实体 id 即用户 id）
+TRACKED_MODELS = {
+    **{model: entity for entity, model in SYNC_ENTITIES.items()},
+    User: "profile",
+}
+
+# (user_id, entity, entity_id) -> 是否为删除
+ChangeKeys = dict[tuple[int, str, int], bool]
+
+
+def _change_row(user_id: int, entity: str, entity_id: int, deleted: bool) -> dict:
+    return {
+        "user_id": user_id,
+        "entity": entity,
+        "entity_id": entity_id,
+        "deleted": deleted,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def lock_users(user_ids: Iterable[int]) -> Select:
+    """按 id 顺序锁定用户行（SELECT ... FOR UPDATE），须在写入变更日志前执行。
+
+    同一用户的变更日志写入因此串行：后一个事务在前一个提交后才分配序号，
+    序号顺序与提交顺序一致，客户端按游标增量读取不会跳过并发提交的变更。
+    SQLite 不支持行锁，但写事务本身是串行的。
+    """
+    return (
+        select(User.id)
+        .where(User.id.in_(sorted(set(user_ids))))
+        .order_by(User.id)
+        .with_for_update()
+    )
+
+
+def record_changes(
+    user_id: int, entity: str, entity_ids: Iterable[int], deleted: bool = False
+) -> Optional[Insert]:
+    """构造写入变更日志的语句（同步/异步会话通用）。
+
+    ORM 写入由 flush 钩子自动记录，只有绕过 ORM 单元的批量语句（如清空聊天记录）
+    需要在提交前显式执行，并先执行 lock_users。
+    """
+    rows = [_change_row(user_id, entity, i, deleted) for i in entity_ids]
+    return insert(SyncChange).values(rows) if rows else None
+
+
+def _change_key(obj) -> tuple[Optional[int], str, int]:
+    entity = TRACKED_MODELS[type(obj)]
+    return (obj.id if entity == "profile" else obj.user_id), entity, obj.id
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _capture_changes(session: OrmSession, _flush_context, _instances) -> None:
+    """修改与删除在 flush 之前取键：属性可能已过期，删除之后也无法再加载。"""
+    changes: ChangeKeys = {}
+    for obj in session.dirty:
+        if type(obj) in TRACKED_MODELS and session.is_modified(
+            obj, include_collections=False
+        ):
+            changes[_change_key(obj)] = False
+    for obj in session.deleted:
+        # 用户注销时其数据随之删除，不再下发资料墓碑
+        if type(obj) in TRACKED_MODELS and type(obj) is not User:
+            changes[_change_key(obj)] = True
+    session.info["sync_changes"] = changes
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _record_flushed_changes(session: OrmSession, _flush_context) -> None:
+    """在模型层记录变更日志：任何会话（包括 Agent 工具使用的 Session(engine)）
+    flush 的体重、饮食、聊天与资料增删改，都在同一事务中写入 sync_changes，
+    增量同步与 ETag 版本号因此不会遗漏。"""
+    changes: ChangeKeys = session.info.pop("sync_changes", {})
+    for obj in session.new:
+        if type(obj) in TRACKED_MODELS:
+            changes[_change_key(obj)] = False
+    rows = [
+        _change_row(user_id, entity, entity_id, deleted)
+        for (user_id, entity, entity_id), deleted in changes.items()
+        if user_id is not None
+    ]
+    if rows:
+        connection = session.connection()
+        connection.execute(lock_users(row["user_id"] for row in rows))
+        connection.execute(insert(SyncChange), rows)
+
+
+def prune_changes(before: datetime) -> Delete:
+    """删除 before 之前的变更（无时间的旧记录同样视为过期）。
+
+    每个用户每类数据保留最新一条：它决定 ETag 版本号，删掉后版本号回退，
+    可能与客户端早先缓存的 ETag 重合而误返回 304。
+    """
+    latest = select(func.max(SyncChange.id)).group_by(
+        SyncChange.user_id, SyncChange.entity
+    )
+    return delete(SyncChange).where(
+        or_(SyncChange.created_at < before, SyncChange.created_at.is_(None)),
+        SyncChange.id.not_in(latest),
+    )
+
+
+def entity_version(user_id: int, *entities: str) -> Select:
+    """该用户某（几）类数据的最新变更序号（无变更时为 NULL），
+    用作 ETag 与跨进程缓存的版本号。"""
+    if len(entities) == 1:
+        condition = SyncChange.entity == entities[0]
+    else:
+        condition = SyncChange.entity.in_(entities)
+    return select(func.max(SyncChange.id)).where(
+        SyncChange.user_id == user_id, condition
+    )
+
+
+@traced_class("db")
+class SyncRepository:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def latest_seq(self) -> int:
+        """全局最新变更序号（主键最大值，走索引）。"""
+        return self.session.exec(select(func.max(SyncChange.id))).one() or 0
+
+    def latest_user_seq(self, user_id: int) -> int:
+        statement = select(func.max(SyncChange.id)).where(SyncChange.user_id == user_id)
+        return self.session.exec(statement).one() or 0
+
+    def get_changes(self, user_id: int, since: int) -> List[SyncChange]:
+        """读取序号大于 since 的变更（按序号升序）。"""
+        statement = (
+            select(SyncChange)
+            .where(SyncChange.user_id == user_id, SyncChange.id > since)
+            .order_by(SyncChange.id.asc())
+        )
+        return list(self.session.exec(statement).all())
+
+    def get_rows(
+        self,
+        entity: str,
+        user_id: int,
+        ids: Optional[List[int]] = None,
+        fields: Optional[Iterable[str]] = None,
+    ):
+        """读取实体行；ids 为 None 时返回该用户全部行（全量快照）。
+
+        指定 fields 时只取这些列并返回字典，否则返回 ORM 实体。
+        """
+        model = SYNC_ENTITIES[entity]
+        statement = select(model) if fields is None else select_fields(model, fields)
+        statement = statement.where(model.user_id == user_id)
+        if ids is not None:
+            statement = statement.where(model.id.in_(ids))
+        statement = statement.order_by(model.id.asc())
+        if fields is not None:
+            return fetch_dicts(self.session, statement)
+        return list(self.session.exec(statement).all())
+
+    def get_profile(self, user_id: int) -> Optional[User]:
+        return self.session.get(User, user_id)
+
+    def get_version(self, user_id: int, *entities: str) -> int:
+        return self.session.exec(entity_version(user_id, *entities)).one() or 0
+
+    def prune(self, before: datetime) -> int:
+        """清理过期变更并提交，返回删除的行数。"""
+        deleted = self.session.exec(prune_changes(before)).rowcount
+        self.session.commit()
+        return deleted
+
+
+@traced_class("db")
+class AsyncSyncRepository:
+    """变更日志的异步只读访问（供 async 路由读取数据版本号）。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_version(self, user_id: int, *entities: str) -> int:
+        return (await self.session.exec(entity_version(user_id, *entities))).one() or 0
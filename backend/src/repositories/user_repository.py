@@ -2,9 +2,12 @@ from typing import List, Optional
 
 from sqlmodel import Session, select
 
+from ..core.tracing import traced_class
 from ..models import Ingredient, User
+from .sync_repository import entity_version
 
 
+@traced_class("db")
 class UserRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -18,6 +21,9 @@ class UserRepository:
         statement = select(User).where(User.username == username)
         return self.session.exec(statement).first()
 
+    def get_profile_version(self, user_id: int) -> int:
+        return self.session.exec(entity_version(user_id, "profile")).one() or 0
+
     def create_user(self, user: User) -> User:
         self.session.add(user)
         self.session.commit()
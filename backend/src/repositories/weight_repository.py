@@ -1,8 +1,14 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.tracing import traced_class
 from ..models import WeightRecord
+from .projection import fetch_dicts, select_fields
+from .sync_repository import entity_version
 
 
+@traced_class("db")
 class WeightRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -20,6 +26,28 @@ class WeightRepository:
             statement = statement.limit(limit)
         return list(self.session.exec(statement).all())
 
+    def get_weight_rows(self, user_id: int, fields: Iterable[str]) -> List[dict]:
+        """按字段读取体重记录（时间倒序），供只读列表直接序列化。"""
+        statement = (
+            select_fields(WeightRecord, fields)
+            .where(WeightRecord.user_id == user_id)
+            .order_by(WeightRecord.recorded_at.desc())
+        )
+        return fetch_dicts(self.session, statement)
+
+    def get_version(self, user_id: int) -> int:
+        return self.session.exec(entity_version(user_id, "weights")).one() or 0
+
+    def get_weight_series(self, user_id: int) -> Tuple[List[datetime], List[float]]:
+        """仅查询时间与体重两列，按时间升序返回列式数据。"""
+        statement = (
+            select(WeightRecord.recorded_at, WeightRecord.weight_kg)
+            .where(WeightRecord.user_id == user_id)
+            .order_by(WeightRecord.recorded_at.asc())
+        )
+        rows = self.session.exec(statement).all()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
     def add_weight(
         self, weight: float, user_id: int, notes: Optional[str] = ""
     ) -> WeightRecord:
@@ -30,6 +58,17 @@ class WeightRepository:
         self.session.refresh(record)
         return record
 
+    def add_weights(self, user_id: int, records: List[WeightRecord]) -> List[int]:
+        """批量写入体重记录：一次 flush（多行 INSERT ... RETURNING）取回 id，
+        变更日志由 flush 钩子记录，整体一次提交。"""
+        for record in records:
+            record.user_id = user_id
+        self.session.add_all(records)
+        self.session.flush()
+        ids = [record.id for record in records]
+        self.session.commit()
+        return ids
+
     def delete_weight(self, record_id: int, user_id: int) -> bool:
         """删除特定用户的体重记录（安全验证）。"""
         statement = select(WeightRecord).where(
@@ -41,3 +80,25 @@ class WeightRepository:
         self.session.delete(record)
         self.session.commit()
         return True
+
+
+@traced_class("db")
+class AsyncWeightRepository:
+    """WeightRepository 的异步只读版本（供 async 聊天路由构建用户上下文），
+    写入统一经 WeightService，以便同时失效上下文与趋势缓存。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_weights(
+        self, user_id: int, limit: Optional[int] = None
+    ) -> List[WeightRecord]:
+        """获取指定用户的体重记录（按时间倒序）。"""
+        statement = (
+            select(WeightRecord)
+            .where(WeightRecord.user_id == user_id)
+            .order_by(WeightRecord.recorded_at.desc())
+        )
+        if limit:
+            statement = statement.limit(limit)
+        return list((await self.session.exec(statement)).all())
@@ -1,10 +1,47 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Union
 
 
 class FoodSearchResult(BaseModel):
+    """食物检索结果（与 LoseWeightAgent 的 FoodNutritionSearchResult 字段一致）。
+
+    在后端本地定义，避免导入路由时加载 LoseWeightAgent；extra="allow"
+    保证检索服务返回的其他字段原样透传。
+    """
+
+    model_config = ConfigDict(extra="allow", from_attributes=True)
+
     fdc_id: int
     description: str
-    category: Optional[str] = None
+    food_category: Optional[str] = None
     calories_per_100g: Optional[float] = None
-    similarity: float
+    protein_per_100g: Optional[float] = None
+    fat_per_100g: Optional[float] = None
+    carbs_per_100g: Optional[float] = None
+    similarity: float = 0.0
+
+
+# 目录条目的列顺序（items 中每行按此顺序排列，category 为 categories 的下标）
+CATALOG_FIELDS = (
+    "fdc_id",
+    "description",
+    "category",
+    "calories_per_100g",
+    "protein_per_100g",
+    "fat_per_100g",
+    "carbs_per_100g",
+)
+
+
+class FoodCatalog(BaseModel):
+    """离线食物目录快照或版本间增量（行式紧凑编码）。"""
+
+    version: str = Field(description="目录内容哈希，同时作为 ETag")
+    full: bool = Field(description="为 true 时为全量快照，客户端应替换本地目录")
+    base: Optional[str] = Field(default=None, description="增量的起始版本")
+    fields: List[str] = Field(default_factory=lambda: list(CATALOG_FIELDS))
+    categories: List[str] = Field(default_factory=list)
+    items: List[List[Union[int, str, float, None]]] = Field(
+        default_factory=list, description="新增或变化的条目"
+    )
+    deleted: List[int] = Field(default_factory=list, description="删除的 fdc_id")
@@ -1,11 +1,14 @@
-from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class FoodLogBase(BaseModel):
     food_name: str
     calories: float
+    protein_g: Optional[float] = Field(default=None, ge=0)
+    carbs_g: Optional[float] = Field(default=None, ge=0)
+    fat_g: Optional[float] = Field(default=None, ge=0)
     timestamp: Optional[datetime] = None
 
 
@@ -13,6 +16,19 @@ class FoodLogCreate(FoodLogBase):
     pass
 
 
+# 单次批量写入的最大条数
+MAX_BATCH_SIZE = 500
+
+
+class FoodLogBatchCreate(BaseModel):
+    items: List[FoodLogCreate] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class FoodLogBatchResult(BaseModel):
+    # 与请求 items 顺序一致
+    ids: List[int]
+
+
 class FoodLogRead(FoodLogBase):
     id: int
     user_id: int
@@ -20,3 +36,25 @@ class FoodLogRead(FoodLogBase):
 
     class Config:
         from_attributes = True
+
+
+class DailyIntakeRead(BaseModel):
+    local_date: date
+    calories: float
+    entry_count: int
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    fat_g: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class FoodLogSummary(BaseModel):
+    start_date: date
+    end_date: date
+    timezone: str
+    days: List[DailyIntakeRead]
+    total_calories: float
+    total_entries: int
+    average_daily_calories: float
@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class AllocationSite(BaseModel):
+    location: str
+    size_kb: float
+    count: int
+    size_diff_kb: Optional[float] = None
+    count_diff: Optional[int] = None
+
+
+class MemorySnapshotReport(BaseModel):
+    traced_current_kb: float
+    traced_peak_kb: float
+    top: list[AllocationSite]
+    diff: Optional[list[AllocationSite]] = None
@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .chat import ChatMessageRead
+from .food_log import FoodLogRead
+from .user import UserRead
+from .weight import WeightRead
+
+
+class SyncDeleted(BaseModel):
+    weights: List[int] = Field(default_factory=list)
+    food_logs: List[int] = Field(default_factory=list)
+    chat_messages: List[int] = Field(default_factory=list)
+
+
+class SyncResponse(BaseModel):
+    cursor: str = Field(description="下次请求的 since 参数（不透明）")
+    full: bool = Field(description="为 true 时为全量快照，客户端应替换本地数据")
+    weights: List[WeightRead] = Field(default_factory=list)
+    food_logs: List[FoodLogRead] = Field(default_factory=list)
+    chat_messages: List[ChatMessageRead] = Field(default_factory=list)
+    profile: Optional[UserRead] = Field(default=None, description="资料未变化时为空")
+    deleted: SyncDeleted = Field(default_factory=SyncDeleted)
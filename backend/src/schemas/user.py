@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, field_validator
 from datetime import datetime
 from typing import Optional
 
+from ..core.timezones import is_valid_timezone
+
 
 class UserCreate(BaseModel):
     username: str = Field(min_length=3, max_length=50)
@@ -32,6 +34,7 @@ class UserRead(BaseModel):
     bmr: Optional[float] = None
     tdee: Optional[float] = None
     daily_calorie_goal: Optional[float] = None
+    timezone: str = "UTC"
     created_at: datetime
 
     class Config:
@@ -45,3 +48,13 @@ class UserProfileUpdate(BaseModel):
     initial_weight_kg: float = Field(ge=10, le=500)
     target_weight_kg: float = Field(ge=10, le=500)
     activity_level: Optional[str] = Field(default="sedentary")
+    timezone: Optional[str] = Field(
+        default=None, description="IANA 时区名，如 Asia/Shanghai"
+    )
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and not is_valid_timezone(value):
+            raise ValueError("无效的时区名称")
+        return value
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
 
 class WeightCreate(BaseModel):
@@ -8,6 +8,24 @@ class WeightCreate(BaseModel):
     notes: Optional[str] = Field(default="", max_length=200)
 
 
+# 单次批量写入的最大条数
+MAX_BATCH_SIZE = 500
+
+
+class WeightBatchItem(WeightCreate):
+    # 离线记录的实际测量时间，缺省为写入时间
+    recorded_at: Optional[datetime] = None
+
+
+class WeightBatchCreate(BaseModel):
+    items: List[WeightBatchItem] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class WeightBatchResult(BaseModel):
+    # 与请求 items 顺序一致
+    ids: List[int]
+
+
 class WeightUpdate(BaseModel):
     weight_kg: Optional[float] = Field(default=None, ge=0.1, le=500)
     notes: Optional[str] = Field(default=None, max_length=200)
@@ -21,3 +39,29 @@ class WeightRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# 图表序列的最大点数（points 参数上限）
+MAX_SERIES_POINTS = 2000
+
+
+class WeightSeries(BaseModel):
+    """列式体重序列（按时间升序），供图表绘制。"""
+
+    timestamps: List[int] = Field(description="记录时间（epoch 秒）")
+    weights: List[float] = Field(description="体重 (kg)，与 timestamps 一一对应")
+    total_points: int = Field(description="降采样前的记录数")
+
+
+class WeightTrend(BaseModel):
+    points: int
+    latest_weight_kg: Optional[float] = None
+    trend_weight_kg: Optional[float] = Field(
+        default=None, description="指数平滑后的体重"
+    )
+    rate_7d_kg_per_week: Optional[float] = None
+    rate_30d_kg_per_week: Optional[float] = None
+    target_weight_kg: Optional[float] = None
+    projected_target_date: Optional[date] = None
+    days_to_target: Optional[int] = None
+    is_plateau: bool = False
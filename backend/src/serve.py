@@ -0,0 +1,244 @@
+"""生产环境多进程启动入口：python -m src.serve [--workers N] [--host H] [--port P]
+
+主进程绑定监听端口并预加载应用（导入全部模块、建表），随后 fork 出 N 个
+工作进程共享同一监听 socket；预加载后冻结 GC 堆，只读对象留在写时复制页中
+由各进程共享。主进程只负责监督：工作进程异常退出时重新拉起，收到
+SIGTERM/SIGINT 时转发给所有工作进程，等待其完成在途请求（含 SSE 流）后退出。
+
+不支持 fork 的平台（Windows）或只需 1 个工作进程时退化为单进程运行。
+每个工作进程拥有独立的连接池、/metrics 指标与日志文件（app.workerN.log），
+主进程的日志写入 app.log。
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+from .core.config import ServerSettings, get_settings
+from .core.logging import setup_logging, stop_logging
+from .core.shared_data import freeze_heap
+from .core.shutdown import begin_drain
+from .core.tracing import stop_trace_export
+
+logger = logging.getLogger("loseweight.serve")
+
+APP_PATH = "src.app:app"
+
+# 工作进程启动后存活不足该秒数即退出，视为启动失败，重启前退避
+_MIN_WORKER_LIFETIME_S = 5
+
+
+def available_cpus() -> int:
+    """可用 CPU 数：进程亲和性与 cgroup v2 配额（容器 CPU 限制）取较小值。"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def resolve_workers(settings: ServerSettings) -> int:
+    if settings.workers:
+        return settings.workers
+    return min(available_cpus(), settings.max_workers)
+
+
+class DrainingServer(uvicorn.Server):
+    """退出前为在途 SSE 流设置收尾截止时间，使其在强制取消前正常结束。"""
+
+    async def shutdown(self, sockets=None) -> None:
+        settings = get_settings().server
+        timeout = self.config.timeout_graceful_shutdown or settings.graceful_timeout_s
+        begin_drain(max(timeout - settings.sse_drain_margin_s, 0))
+        await super().shutdown(sockets=sockets)
+
+
+def build_config(app, settings: ServerSettings) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=settings.host,
+        port=settings.port,
+        loop=settings.loop,
+        http=settings.http,
+        backlog=settings.backlog,
+        timeout_graceful_shutdown=settings.graceful_timeout_s,
+        # 日志由 setup_logging 统一配置
+        log_config=None,
+    )
+
+
+def _describe_runtime(settings: ServerSettings) -> str:
+    def pick(value: str, fast: str, default: str) -> str:
+        if value != "auto":
+            return value
+        return fast if importlib.util.find_spec(fast) else default
+
+    return (
+        f"loop={pick(settings.loop, 'uvloop', 'asyncio')}, "
+        f"http={pick(settings.http, 'httptools', 'h11')}"
+    )
+
+
+def _preload(app=None):
+    """主进程中导入应用并建表；释放连接后冻结堆，供工作进程共享。"""
+    if app is None:
+        from .app import app
+    from .core.database import engine, init_db
+    from .services.food_catalog_service import get_food_catalog
+
+    init_db()
+    # 已建立的连接不能跨 fork 使用，工作进程各自重建连接池
+    engine.dispose()
+    # 食物目录（含预压缩副本）在 fork 前构建，工作进程共享
+    try:
+        get_food_catalog()
+    except (OSError, ValueError) as e:
+        logger.warning("食物目录预加载失败: %s", e)
+    freeze_heap()
+    return app
+
+
+def _run_worker(config: uvicorn.Config, sock, index: int) -> None:
+    # 启动前忽略退出信号；uvicorn 接管信号后会在退出时恢复此处理器
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # 各工作进程写入自己的日志文件，只有主进程写 app.log
+    setup_logging(worker=index)
+    DrainingServer(config).run(sockets=[sock])
+
+
+def _spawn(config: uvicorn.Config, sock, index: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(config, sock, index)
+        except BaseException:
+            logger.exception("工作进程异常退出")
+            code = 1
+        finally:
+            # os._exit 不执行 atexit，先刷新日志与追踪记录
+            stop_trace_export()
+            stop_logging()
+            os._exit(code)
+    return pid
+
+
+def serve(app=None, workers: Optional[int] = None) -> None:
+    """启动服务；app 为空时按配置预加载或由工作进程各自导入 src.app。"""
+    setup_logging()
+    settings = get_settings().server
+    count = workers or resolve_workers(settings)
+
+    if count <= 1 or not hasattr(os, "fork"):
+        logger.info("单进程启动 (%s)", _describe_runtime(settings))
+        DrainingServer(build_config(app or APP_PATH, settings)).run()
+        return
+
+    preloaded = settings.preload or app is not None
+    config = build_config(_preload(app) if preloaded else APP_PATH, settings)
+    sock = config.bind_socket()
+    logger.info(
+        "启动 %d 个工作进程 %s:%d (preload=%s, %s)",
+        count,
+        settings.host,
+        settings.port,
+        preloaded,
+        _describe_runtime(settings),
+    )
+
+    # fork 前停止日志线程并刷新队列，工作进程各自重建
+    stop_logging()
+    # pid -> (工作进程序号, 启动时间)；重启的进程沿用原序号与日志文件
+    started: dict[int, tuple[int, float]] = {}
+    for index in range(1, count + 1):
+        started[_spawn(config, sock, index)] = (index, time.monotonic())
+    setup_logging()
+
+    stopping = False
+
+    def handle_exit(signum, _frame):
+        nonlocal stopping
+        if not stopping:
+            logger.info("收到信号 %s，等待工作进程完成在途请求", signum)
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.signal(signal.SIGINT, handle_exit)
+
+    while not stopping:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        index, spawned_at = started.pop(pid, (None, 0))
+        if index is None:
+            continue
+        lifetime = time.monotonic() - spawned_at
+        logger.warning(
+            "工作进程 %d 退出 (code=%s)，重新启动",
+            pid,
+            os.waitstatus_to_exitcode(status),
+        )
+        if lifetime < _MIN_WORKER_LIFETIME_S:
+            time.sleep(_MIN_WORKER_LIFETIME_S - lifetime)
+        if stopping:
+            break
+        stop_logging()
+        started[_spawn(config, sock, index)] = (index, time.monotonic())
+        setup_logging()
+
+    _shutdown_workers(started, settings.graceful_timeout_s + 5)
+    sock.close()
+
+
+def _shutdown_workers(workers: dict[int, tuple[int, float]], timeout: float) -> None:
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + timeout
+    alive = set(workers)
+    while alive and time.monotonic() < deadline:
+        for pid in list(alive):
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                alive.discard(pid)
+        time.sleep(0.1)
+    for pid in alive:
+        logger.error("工作进程 %d 未在 %.0fs 内退出，强制结束", pid, timeout)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="LoseWeightEasily 多进程启动入口")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="0 表示按 CPU 数自动计算")
+    args = parser.parse_args(argv)
+
+    settings = get_settings().server
+    for name in ("host", "port", "workers"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(settings, name, value)
+    serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""语义答案缓存：近似重复的教练问题直接复用已生成的回答，省去一次 LLM 调用。
+
+问题向量与长期记忆召回共用（每轮只嵌入一次）。条目按粗粒度用户画像分组
+（减重目标、BMI 区间、性别），只在同组内查找，避免把针对增重用户的建议
+返回给减重用户。缓存在进程内，各工作进程独立积累；含当天数据或上下文
+指代（“今天”“这个”）的问题、过短的追问不读也不写。
+
+写入缓存的回答会被同组其他用户读到，因此不复用用户本人收到的个性化回答，
+而是未命中后在后台以匿名的分组提示（bucket_prompt）另行生成一次，不带个人资料、
+当天数据、对话历史与长期记忆；生成时调用过工具的回答丢弃。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from ..core.config import AnswerCacheSettings, get_settings
+from ..core.metrics import ANSWER_CACHE_REQUESTS
+from .user_context_service import UserContextSnapshot
+
+logger = logging.getLogger("loseweight.answer_cache")
+
+# (goal, bmi_band, gender)
+ProfileBucket = tuple[str, str, str]
+
+UNKNOWN = "unknown"
+# 目标体重与当前体重相差不超过该值视为维持
+MAINTAIN_MARGIN_KG = 1.0
+# 中国成人 BMI 分级：偏瘦 / 正常 / 超重 / 肥胖
+BMI_BANDS = ((18.5, "under"), (24, "normal"), (28, "over"))
+
+
+def profile_bucket(snapshot: Optional[UserContextSnapshot]) -> ProfileBucket:
+    if snapshot is None:
+        return (UNKNOWN, UNKNOWN, UNKNOWN)
+    weight = snapshot.current_weight_kg
+
+    goal = UNKNOWN
+    if weight and snapshot.target_weight_kg:
+        diff = snapshot.target_weight_kg - weight
+        if diff < -MAINTAIN_MARGIN_KG:
+            goal = "lose"
+        elif diff > MAINTAIN_MARGIN_KG:
+            goal = "gain"
+        else:
+            goal = "maintain"
+
+    band = UNKNOWN
+    if weight and snapshot.height_cm:
+        bmi = weight / (snapshot.height_cm / 100) ** 2
+        band = next((name for limit, name in BMI_BANDS if bmi < limit), "obese")
+
+    return (goal, band, (snapshot.gender or UNKNOWN).lower())
+
+
+GOAL_LABELS = {"lose": "减重", "gain": "增重", "maintain": "维持体重"}
+BMI_LABELS = {"under": "偏瘦", "normal": "正常", "over": "超重", "obese": "肥胖"}
+GENDER_LABELS = {"female": "女", "male": "男"}
+
+
+def bucket_prompt(bucket: ProfileBucket) -> str:
+    """画像分组的匿名提示：生成可在同组用户间共享的回答。"""
+    goal, band, gender = bucket
+    return (
+        "匿名用户画像（本回答将提供给同类用户）："
+        f"目标 {GOAL_LABELS.get(goal, '未知')}，"
+        f"BMI 区间 {BMI_LABELS.get(band, '未知')}，"
+        f"性别 {GENDER_LABELS.get(gender, '未知')}。\n"
+        "请只给出适用于这类用户的通用建议，不要假设具体的姓名、体重或饮食记录。"
+    )
+
+
+@dataclass
+class _Bucket:
+    """同一画像分组的条目，按写入时间排列；matrix 每行为对应问题的单位向量。"""
+
+    matrix: np.ndarray
+    answers: list[str] = field(default_factory=list)
+    created_at: list[float] = field(default_factory=list)
+
+    def expire(self, deadline: float) -> None:
+        n = next((i for i, t in enumerate(self.created_at) if t >= deadline), None)
+        if n is None:
+            n = len(self.created_at)
+        if n:
+            self.matrix = self.matrix[n:]
+            del self.answers[:n], self.created_at[:n]
+
+    def best(self, query: np.ndarray) -> tuple[int, float]:
+        if not self.answers:
+            return -1, -1.0
+        scores = self.matrix @ query
+        i = int(np.argmax(scores))
+        return i, float(scores[i])
+
+
+class AnswerCache:
+    """按画像分组保存 (问题向量, 回答)，TTL 过期，超出容量时淘汰最早写入的条目。"""
+
+    def __init__(self, settings: Optional[AnswerCacheSettings] = None):
+        self.settings = settings or get_settings().answer_cache
+        self._buckets: dict[ProfileBucket, _Bucket] = {}
+        self._lock = threading.Lock()
+        # 后台生成中的 (分组, 问题) -> 任务，同一问题并发未命中时只生成一次
+        self._pending: dict[tuple[ProfileBucket, str], asyncio.Task] = {}
+
+    def accepts(self, question: str) -> bool:
+        """问题是否适合缓存（与当天数据、上下文指代无关）。"""
+        if not self.settings.enabled:
+            return False
+        text = question.strip().casefold()
+        if not self.settings.min_chars <= len(text) <= self.settings.max_chars:
+            return False
+        return not any(
+            marker.casefold() in text for marker in self.settings.skip_markers
+        )
+
+    def bypass(self, endpoint: str) -> None:
+        """记录一次未查缓存的请求（用户关闭、问题不适合或无问题向量）。"""
+        if self.settings.enabled:
+            ANSWER_CACHE_REQUESTS.inc(endpoint=endpoint, result="bypass")
+
+    def _bucket(self, bucket: ProfileBucket, dim: int) -> Optional[_Bucket]:
+        entries = self._buckets.get(bucket)
+        if entries is None or entries.matrix.shape[1] != dim:
+            return None
+        entries.expire(time.monotonic() - self.settings.ttl_s)
+        return entries
+
+    def lookup(
+        self, endpoint: str, bucket: ProfileBucket, query: np.ndarray
+    ) -> Optional[str]:
+        with self._lock:
+            entries = self._bucket(bucket, query.shape[0])
+            answer = None
+            if entries is not None:
+                i, score = entries.best(query)
+                if score >= self.settings.min_score:
+                    answer = entries.answers[i]
+        ANSWER_CACHE_REQUESTS.inc(
+            endpoint=endpoint, result="miss" if answer is None else "hit"
+        )
+        return answer
+
+    def store(self, bucket: ProfileBucket, query: np.ndarray, answer: str) -> None:
+        if not answer:
+            return
+        with self._lock:
+            entries = self._bucket(bucket, query.shape[0])
+            if entries is None:
+                entries = _Bucket(np.empty((0, query.shape[0]), dtype=np.float32))
+                self._buckets[bucket] = entries
+            # 并发的相同问题只保留先写入的回答
+            if entries.best(query)[1] >= self.settings.min_score:
+                return
+            entries.matrix = np.vstack([entries.matrix, query[None, :]])
+            entries.answers.append(answer)
+            entries.created_at.append(time.monotonic())
+            overflow = len(entries.answers) - self.settings.max_entries
+            if overflow > 0:
+                entries.matrix = entries.matrix[overflow:]
+                del entries.answers[:overflow], entries.created_at[:overflow]
+
+    def fill(
+        self, agent: Any, bucket: ProfileBucket, query: np.ndarray, question: str
+    ) -> None:
+        """在后台以匿名分组提示生成回答并写入缓存，不阻塞当前响应。"""
+        key = (bucket, question.strip().casefold())
+        if key in self._pending:
+            return
+        if len(self._pending) >= self.settings.fill_max_pending:
+            logger.debug("待生成的缓存回答已达上限，跳过")
+            return
+        task = asyncio.create_task(self._generate(agent, bucket, query, question))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def _generate(
+        self, agent: Any, bucket: ProfileBucket, query: np.ndarray, question: str
+    ) -> None:
+        reply = ""
+        try:
+            # 不关联任何用户；调用过工具的回答依赖具体数据，不可共享
+            async for event in agent.chat_stream(
+                message=question,
+                user_info=bucket_prompt(bucket),
+                history=[],
+                user_id=None,
+            ):
+                event_type = event.get("event", "text")
+                if event_type == "action_result":
+                    return
+                if event_type == "text":
+                    reply += str(event.get("data", ""))
+        except Exception as e:
+            logger.warning("生成缓存回答失败: %s", e)
+            return
+        self.store(bucket, query, reply)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """等待后台生成任务完成（关闭应用与测试时使用）。"""
+        if self._pending:
+            await asyncio.wait(set(self._pending.values()), timeout=timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def replay_chunks(answer: str, size: int) -> list[str]:
+    """把缓存的回答切成若干段，供流式接口按 text 事件回放。"""
+    return [answer[i : i + size] for i in range(0, len(answer), size)]
+
+
+# 单例对象供全局使用
+answer_cache = AnswerCache()
@@ -0,0 +1,185 @@
+"""聊天长期记忆：新消息在后台嵌入并落库，每轮对话按问题召回窗口之外的相关历史消息。
+
+向量以 float32 字节存于 chat_embeddings 表；各工作进程按用户在内存中维护归一化
+后的 NumPy 矩阵，每次召回只增量加载 message_id 大于已加载最大值的向量。单个用户
+的消息量（数千条以内）下暴力内积只需毫秒级，不必为每个用户建 Milvus 分区。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.cache import UserCache
+from ..core.config import MemorySettings, get_settings
+from ..core.database import get_async_engine
+from ..models import ChatMessage
+from ..repositories.chat_repository import AsyncChatRepository
+from .query_embedding import normalize
+
+logger = logging.getLogger("loseweight.chat_memory")
+
+ROLE_NAMES = {"user": "用户", "assistant": "教练"}
+
+# 其他进程写入的向量若提交顺序与 id 顺序不一致，增量加载会漏掉，靠 TTL 兜底重建
+INDEX_TTL_S = 600
+
+
+def _embed_texts(embedding: Any, texts: List[str]) -> List[np.ndarray]:
+    return [normalize(embedding.get_text_embedding(text)) for text in texts]
+
+
+def _default_session() -> AsyncSession:
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
+@dataclass(frozen=True)
+class MemoryIndex:
+    """单个用户已加载的向量：ids 升序，matrix 每行为对应消息的归一化向量。"""
+
+    ids: np.ndarray
+    matrix: np.ndarray
+
+    @classmethod
+    def empty(cls, dim: int) -> "MemoryIndex":
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32))
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def last_id(self) -> int:
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def extend(self, rows: List[tuple[int, bytes]]) -> "MemoryIndex":
+        """追加新向量（返回新对象，已缓存的索引不被原地修改）；维度不符的行被跳过。"""
+        size = self.dim * 4
+        rows = [row for row in rows if len(row[1]) == size]
+        if not rows:
+            return self
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32)
+        return MemoryIndex(
+            np.concatenate([self.ids, ids]),
+            np.vstack([self.matrix, matrix.reshape(len(rows), self.dim)]),
+        )
+
+    def search(
+        self, query: np.ndarray, k: int, min_score: float, before_id: int
+    ) -> List[int]:
+        """返回 id 小于 before_id、相似度不低于 min_score 的前 k 条消息 id。"""
+        n = int(np.searchsorted(self.ids, before_id))
+        scores = self.matrix[:n] @ query
+        candidates = np.flatnonzero(scores >= min_score)
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return self.ids[top].tolist()
+
+
+class ChatMemory:
+    """消息嵌入的后台写入与按问题召回，按用户缓存已加载的向量矩阵。"""
+
+    def __init__(
+        self,
+        settings: Optional[MemorySettings] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.settings = settings or get_settings().memory
+        self.session_factory = session_factory or _default_session
+        self.cache: UserCache[MemoryIndex] = UserCache(
+            max_size=self.settings.cache_users, ttl_seconds=INDEX_TTL_S
+        )
+        self._pending: set[asyncio.Task] = set()
+
+    def remember(
+        self, embedding: Any, user_id: int, messages: List[ChatMessage]
+    ) -> None:
+        """在后台嵌入并保存新消息，不阻塞当前响应。"""
+        if embedding is None or not self.settings.enabled:
+            return
+        items = [
+            (message.id, message.content)
+            for message in messages
+            if message.role in self.settings.roles
+            and len(message.content.strip()) >= self.settings.min_chars
+        ]
+        if not items:
+            return
+        if len(self._pending) >= self.settings.max_pending:
+            logger.warning("待嵌入任务已达上限，丢弃 %d 条消息", len(items))
+            return
+        task = asyncio.create_task(self._embed(embedding, user_id, items))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _embed(
+        self, embedding: Any, user_id: int, items: List[tuple[int, str]]
+    ) -> None:
+        try:
+            vectors = await asyncio.to_thread(
+                _embed_texts, embedding, [text for _, text in items]
+            )
+            async with self.session_factory() as session:
+                await AsyncChatRepository(session).add_embeddings(
+                    user_id,
+                    [(mid, v.tobytes()) for (mid, _), v in zip(items, vectors)],
+                )
+        except Exception as e:
+            logger.warning("聊天消息嵌入失败 (user=%s): %s", user_id, e)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """等待后台嵌入任务完成（关闭应用与测试时使用）。"""
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=timeout)
+
+    async def recall(
+        self,
+        repo: AsyncChatRepository,
+        user_id: int,
+        query: Optional[np.ndarray],
+        before_id: int,
+    ) -> List[ChatMessage]:
+        """按问题向量召回 id 小于 before_id 的相关历史消息（按时间正序）。"""
+        if query is None or not self.settings.enabled or not self.settings.top_k:
+            return []
+        index = await self._index(repo, user_id, query.shape[0])
+        ids = index.search(
+            query, self.settings.top_k, self.settings.min_score, before_id
+        )
+        if not ids:
+            return []
+        messages = await repo.get_messages(user_id, ids)
+        if len(messages) < len(ids):
+            # 部分消息已被删除（清空历史），下次召回时重建该用户的向量
+            self.cache.invalidate(user_id)
+        return messages
+
+    async def _index(
+        self, repo: AsyncChatRepository, user_id: int, dim: int
+    ) -> MemoryIndex:
+        index = self.cache.get(user_id)
+        if index is None or index.dim != dim:
+            index = MemoryIndex.empty(dim)
+        rows = await repo.get_embeddings(user_id, after_id=index.last_id)
+        if rows:
+            index = index.extend(rows)
+            self.cache.set(user_id, index)
+        return index
+
+
+def format_memories(messages: List[ChatMessage]) -> str:
+    """把召回的历史消息拼成追加在用户信息之后的提示片段。"""
+    if not messages:
+        return ""
+    lines = [
+        f"- [{m.timestamp:%Y-%m-%d}] {ROLE_NAMES.get(m.role, m.role)}：{m.content}"
+        for m in messages
+    ]
+    return "\n\n与当前问题相关的早期对话（仅供参考）：\n" + "\n".join(lines)
+
+
+# 单例对象供全局使用
+chat_memory = ChatMemory()
@@ -1,9 +1,10 @@
 import logging
 import asyncio
-from sqlmodel import Session, select
-from ..core.database import engine
-from ..core.minio_client import MinIOClient
-from ..models import FoodRecognition, User
+from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.database import get_async_engine
+from ..core.minio_client import get_minio_client
+from ..models import FoodRecognition
 from ..schemas.food_analysis import FoodAnalysisResult, FoodRecognitionResponse
 
 logger = logging.getLogger("loseweight.food_analysis")
@@ -14,9 +15,11 @@ class FoodAnalysisService:
 
     def __init__(self, agent):
         self.agent = agent
-        self.minio = MinIOClient()
+        self.minio = get_minio_client()
 
-    async def analyze_food_image(self, image_data: bytes) -> FoodRecognitionResponse:
+    async def analyze_food_image(
+        self, image_data: bytes, user_id: Optional[int] = None
+    ) -> FoodRecognitionResponse:
         """识别食物图片并进行持久化存储，包含回退和重试逻辑。"""
         if not self.agent:
             logger.error("AI Agent 未初始化，无法进行识别")
@@ -47,14 +50,13 @@ class FoodAnalysisService:
 
         # 4. 持久化存储（闭环：即便识别不太理想也要存，以便后期优化数据集）
         try:
-            # 上传到 MinIO (带重试逻辑的上传由客户端实现或这里处理)
-            object_name = self.minio.upload_image(image_data)
-
-            # 记录到数据库
-            with Session(engine) as session:
-                user = session.exec(select(User)).first()
-                user_id = user.id if user else None
+            # 上传到 MinIO（同步客户端，放到线程池中执行以免阻塞事件循环）
+            object_name = await asyncio.to_thread(self.minio.upload_image, image_data)
 
+            # 记录到数据库（异步会话）
+            async with AsyncSession(
+                get_async_engine(), expire_on_commit=False
+            ) as session:
                 recognition_record = FoodRecognition(
                     user_id=user_id,
                     image_path=object_name,
@@ -64,7 +66,7 @@ class FoodAnalysisService:
                     reason=f"三路并发聚合结果 ({len(response.raw_data)} 路)",
                 )
                 session.add(recognition_record)
-                session.commit()
+                await session.commit()
                 logger.info(f"成功保存识别数据: ID={recognition_record.id}")
         except Exception as e:
             logger.error(f"数据持久化失败: {e}")
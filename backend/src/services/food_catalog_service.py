@@ -0,0 +1,187 @@
+"""离线食物目录：带版本的紧凑快照与版本间增量，供客户端本地联想输入。
+
+条目来自 data/food_metadata.json（id、名称、分类），每 100 g 营养素取自
+FoodData Central 原始数据（文件不存在时为空）。版本号为条目内容的哈希，数据
+不变时各工作进程、各次部署得到相同版本。每个版本的条目落盘到数据缓存目录，
+保留最近 data.catalog_history 个，用于计算旧版本到当前版本的增量。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ..core.compression import PrecompressedBody
+from ..core.config import get_settings
+from ..schemas.food import FoodCatalog
+
+logger = logging.getLogger("loseweight.food_catalog")
+
+# fdc_id -> (description, category, kcal, protein, fat, carbs)
+Entries = dict[int, tuple]
+
+VERSION_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+# FoodData Central 营养素编号；能量优先取 208，基础食物常只有 Atwater 系数的 957 / 958
+ENERGY_NUMBERS = ("208", "957", "958")
+MACRO_NUMBERS = ("203", "204", "205")  # 蛋白质、脂肪、碳水
+
+
+def _round(value) -> Optional[float]:
+    return None if value is None else round(float(value), 1)
+
+
+def _macros(food: dict) -> tuple:
+    amounts = {}
+    for item in food.get("foodNutrients", []):
+        number = str((item.get("nutrient") or {}).get("number", ""))
+        if "amount" in item:
+            amounts.setdefault(number, item["amount"])
+    energy = next((amounts[n] for n in ENERGY_NUMBERS if n in amounts), None)
+    return (_round(energy), *(_round(amounts.get(n)) for n in MACRO_NUMBERS))
+
+
+def load_macros(path: Path) -> dict[int, tuple]:
+    """从 FoodData Central JSON 读取每 100 g 的 (热量, 蛋白质, 脂肪, 碳水)。"""
+    data = json.loads(path.read_bytes())
+    if isinstance(data, dict):
+        # 顶层为 {"FoundationFoods": [...]} / {"SRLegacyFoods": [...]} 等
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+    return {int(food["fdcId"]): _macros(food) for food in data if "fdcId" in food}
+
+
+def load_entries(metadata_path: Path, fdc_path: Optional[Path] = None) -> Entries:
+    macros = load_macros(fdc_path) if fdc_path and fdc_path.exists() else {}
+    empty = (None, None, None, None)
+    entries = {}
+    for item in json.loads(metadata_path.read_bytes()):
+        fdc_id = int(item["fdc_id"])
+        entries[fdc_id] = (
+            item["description"],
+            item.get("category"),
+            *macros.get(fdc_id, empty),
+        )
+    return dict(sorted(entries.items()))
+
+
+def content_version(entries: Entries) -> str:
+    raw = json.dumps(
+        [[fdc_id, *entry] for fdc_id, entry in entries.items()],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def encode_catalog(
+    version: str,
+    entries: Entries,
+    base: Optional[str] = None,
+    deleted: Iterable[int] = (),
+) -> bytes:
+    """编码为紧凑 JSON：分类去重为下标，条目为定长数组。"""
+    categories = sorted({entry[1] for entry in entries.values() if entry[1]})
+    index = {name: i for i, name in enumerate(categories)}
+    catalog = FoodCatalog(
+        version=version,
+        full=base is None,
+        base=base,
+        categories=categories,
+        items=[
+            [fdc_id, entry[0], index.get(entry[1]), *entry[2:]]
+            for fdc_id, entry in entries.items()
+        ],
+        deleted=sorted(deleted),
+    )
+    return catalog.model_dump_json().encode()
+
+
+class FoodCatalogService:
+    def __init__(self, entries: Entries, history_dir: Optional[Path], history: int):
+        self.entries = entries
+        self.version = content_version(entries)
+        self.snapshot = PrecompressedBody(
+            encode_catalog(self.version, entries)
+        ).precompress()
+        self.history_dir = history_dir
+        self._deltas: dict[str, PrecompressedBody] = {}
+        if history_dir is not None:
+            self._save(history)
+
+    def body(self, since: Optional[str] = None) -> PrecompressedBody:
+        """since 为空或未知（过旧、已清理）时返回全量快照，否则返回增量。"""
+        if not since:
+            return self.snapshot
+        delta = self._deltas.get(since)
+        if delta is None:
+            old = self._load(since)
+            if old is None:
+                return self.snapshot
+            changed = {
+                fdc_id: entry
+                for fdc_id, entry in self.entries.items()
+                if old.get(fdc_id) != entry
+            }
+            deleted = old.keys() - self.entries.keys()
+            delta = PrecompressedBody(
+                encode_catalog(self.version, changed, base=since, deleted=deleted)
+            ).precompress()
+            self._deltas[since] = delta
+        return delta
+
+    def _path(self, version: str) -> Path:
+        return self.history_dir / f"{version}.json"
+
+    def _load(self, version: str) -> Optional[Entries]:
+        if version == self.version:
+            return self.entries
+        if self.history_dir is None or not VERSION_PATTERN.fullmatch(version):
+            return None
+        try:
+            rows = json.loads(self._path(version).read_bytes())
+        except (OSError, ValueError):
+            return None
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def _save(self, history: int) -> None:
+        path = self._path(self.version)
+        try:
+            self.history_dir.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                rows = [[fdc_id, *entry] for fdc_id, entry in self.entries.items()]
+                # 先写临时文件再原子替换，多个进程同时构建时不会读到半个文件
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, path)
+            else:
+                path.touch()
+            versions = sorted(
+                self.history_dir.glob("*.json"),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+            for old in versions[history:]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("食物目录历史版本保存失败: %s", e)
+
+
+@lru_cache(maxsize=1)
+def get_food_catalog() -> FoodCatalogService:
+    """按配置构建目录（进程内只构建一次；多进程启动时在主进程预加载）。"""
+    settings = get_settings()
+    data_dir = Path(settings.data.dir)
+    catalog = FoodCatalogService(
+        load_entries(
+            data_dir / settings.data.metadata_file,
+            data_dir / settings.data.json_file,
+        ),
+        history_dir=Path(settings.server.data_cache_dir) / "food_catalog",
+        history=settings.data.catalog_history,
+    )
+    logger.info("食物目录版本 %s，共 %d 条", catalog.version, len(catalog.entries))
+    return catalog
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+
+from ..core.timezones import local_today
+from ..models import FoodLog, User
+from ..repositories.food_log_repository import FoodLogRepository
+from ..schemas.food_log import (
+    DailyIntakeRead,
+    FoodLogCreate,
+    FoodLogRead,
+    FoodLogSummary,
+)
+from .user_context_service import invalidate_user_context
+
+# 单次汇总查询允许的最大天数
+MAX_SUMMARY_DAYS = 366
+
+
+class FoodLogService:
+    def __init__(self, repository: FoodLogRepository):
+        self.repo = repository
+
+    def log_food(self, user: User, data: FoodLogCreate) -> FoodLog:
+        log = self.repo.create_log(
+            user.id,
+            data.food_name,
+            data.calories,
+            timestamp=data.timestamp,
+            protein_g=data.protein_g,
+            carbs_g=data.carbs_g,
+            fat_g=data.fat_g,
+        )
+        invalidate_user_context(user.id)
+        return log
+
+    def log_foods(self, user: User, items: List[FoodLogCreate]) -> List[int]:
+        """批量记录（离线同步），单事务写入，返回与 items 顺序一致的 id。"""
+        logs = [
+            FoodLog(user_id=user.id, **item.model_dump(exclude_none=True))
+            for item in items
+        ]
+        ids = self.repo.create_logs(user.id, logs)
+        invalidate_user_context(user.id)
+        return ids
+
+    def get_version(self, user_id: int) -> int:
+        """饮食记录版本号（每次写入递增），用于 ETag。"""
+        return self.repo.get_version(user_id)
+
+    def get_today_logs(self, user: User) -> List[dict]:
+        """今日饮食记录，只取 FoodLogRead 的字段。"""
+        return self.repo.get_today_rows(
+            user.id, user.timezone, FoodLogRead.model_fields
+        )
+
+    def get_summary(
+        self, user: User, start_date: Optional[date], end_date: Optional[date]
+    ) -> FoodLogSummary:
+        """从每日汇总表读取区间统计（默认最近 7 天，闭区间）。"""
+        end_date = end_date or local_today(user.timezone)
+        start_date = start_date or end_date - timedelta(days=6)
+        if start_date > end_date:
+            raise ValueError("from 不能晚于 to")
+        if (end_date - start_date).days + 1 > MAX_SUMMARY_DAYS:
+            raise ValueError(f"查询范围不能超过 {MAX_SUMMARY_DAYS} 天")
+
+        rows = self.repo.get_daily_intake(user.id, start_date, end_date)
+        days = [DailyIntakeRead.model_validate(row) for row in rows]
+        total_calories = sum(day.calories for day in days)
+        return FoodLogSummary(
+            start_date=start_date,
+            end_date=end_date,
+            timezone=user.timezone,
+            days=days,
+            total_calories=total_calories,
+            total_entries=sum(day.entry_count for day in days),
+            average_daily_calories=total_calories / len(days) if days else 0,
+        )
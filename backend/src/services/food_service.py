@@ -1,18 +1,24 @@
 """食物搜索服务，基于 Milvus 向量数据库。"""
 
-from LoseWeightAgent.src.services.food_search import FoodSearchService
-from LoseWeightAgent.src.schemas import FoodNutritionSearchResult
+from typing import TYPE_CHECKING
 
+from ..core.tracing import traced_class
 
+if TYPE_CHECKING:
+    from LoseWeightAgent.src.schemas import FoodNutritionSearchResult
+    from LoseWeightAgent.src.services.food_search import FoodSearchService
+
+
+@traced_class("food_search")
 class FoodService:
     """食物搜索服务（代理到 LoseWeightAgent 的 FoodSearchService）。"""
 
-    def __init__(self, food_search: FoodSearchService):
+    def __init__(self, food_search: "FoodSearchService"):
         self.food_search = food_search
 
     def search_by_text(
         self, query: str, limit: int = 10
-    ) -> list[FoodNutritionSearchResult]:
+    ) -> list["FoodNutritionSearchResult"]:
         """通过文本搜索食物。"""
         return self.food_search.search_by_text(query, limit)
 
@@ -21,6 +27,6 @@ class FoodService:
         image_data: bytes,
         limit: int = 10,
         image_format: str = "jpeg",
-    ) -> list[FoodNutritionSearchResult]:
+    ) -> list["FoodNutritionSearchResult"]:
         """通过图片搜索食物。"""
         return self.food_search.search_by_image(image_data, limit, image_format)
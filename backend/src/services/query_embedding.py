@@ -0,0 +1,30 @@
+"""对话问题的文本嵌入：长期记忆召回与语义答案缓存共用，每轮对话只调用一次嵌入服务。"""
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger("loseweight.query_embedding")
+
+
+def normalize(vector) -> np.ndarray:
+    """转为 float32 单位向量，之后内积即余弦相似度。"""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+async def embed_query(
+    embedding: Any, text: str, timeout: float
+) -> Optional[np.ndarray]:
+    """在线程池中嵌入文本并归一化；失败或超时返回 None，调用方按“无向量”降级。"""
+    try:
+        vector = await asyncio.wait_for(
+            asyncio.to_thread(embedding.get_text_embedding, text), timeout
+        )
+    except Exception as e:
+        logger.warning("问题嵌入失败: %r", e)
+        return None
+    return normalize(vector)
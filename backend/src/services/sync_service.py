@@ -0,0 +1,140 @@
+import asyncio
+import base64
+import binascii
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from ..core.config import SyncSettings, get_settings
+from ..models import User
+from ..repositories.sync_repository import SYNC_ENTITIES, SyncRepository
+from ..schemas.chat import ChatMessageRead
+from ..schemas.food_log import FoodLogRead
+from ..schemas.sync import SyncDeleted, SyncResponse
+from ..schemas.weight import WeightRead
+
+logger = logging.getLogger("loseweight.sync")
+
+# v2 游标：序号 + 签发时间（epoch 秒）；v1 游标不带时间，视为已过期
+CURSOR_PREFIX = "v2:"
+LEGACY_PREFIX = "v1:"
+# 游标签发时仍未提交的事务、各进程间时钟偏差的余量
+CURSOR_MARGIN_S = 3600
+
+# 各实体按响应字段取列
+ROW_FIELDS = {
+    "weights": tuple(WeightRead.model_fields),
+    "food_logs": tuple(FoodLogRead.model_fields),
+    "chat_messages": tuple(ChatMessageRead.model_fields),
+}
+
+
+def encode_cursor(seq: int, issued_at: Optional[float] = None) -> str:
+    issued = int(time.time() if issued_at is None else issued_at)
+    raw = f"{CURSOR_PREFIX}{seq}:{issued}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """解析游标，返回 (序号, 签发时间)。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("无效的同步游标") from None
+    if raw.startswith(LEGACY_PREFIX) and raw[len(LEGACY_PREFIX) :].isdigit():
+        return int(raw[len(LEGACY_PREFIX) :]), 0
+    parts = raw[len(CURSOR_PREFIX) :].split(":")
+    if (
+        not raw.startswith(CURSOR_PREFIX)
+        or len(parts) != 2
+        or not all(part.isdigit() for part in parts)
+    ):
+        raise ValueError("无效的同步游标")
+    return int(parts[0]), int(parts[1])
+
+
+class SyncService:
+    """基于变更日志的增量同步。
+
+    变更序号为 sync_changes 的自增主键，与业务写入在同一事务中分配。
+    同一实体多次变更只返回最后状态；客户端按 id 合并，重复下发是幂等的。
+    变更日志只保留 retention_days 天，更早签发的游标退回全量快照。
+    """
+
+    def __init__(
+        self, repository: SyncRepository, settings: Optional[SyncSettings] = None
+    ):
+        self.repo = repository
+        self.settings = settings or get_settings().sync
+
+    def sync(self, user: User, cursor: Optional[str]) -> SyncResponse:
+        since, issued_at = decode_cursor(cursor) if cursor else (None, 0)
+        # 游标早于保留期（之后的变更可能已被清理）或超过当前最大序号
+        # （如数据库重置）时退回全量快照
+        horizon = time.time() - self.settings.retention_days * 86400
+        if since is not None and (
+            issued_at < horizon + CURSOR_MARGIN_S or since > self.repo.latest_seq()
+        ):
+            since = None
+        if since is None:
+            return self._snapshot(user)
+
+        changes = self.repo.get_changes(user.id, since)
+        latest = {(c.entity, c.entity_id): c.deleted for c in changes}
+        upserts: dict[str, list[int]] = defaultdict(list)
+        deleted: dict[str, list[int]] = defaultdict(list)
+        for (entity, entity_id), is_deleted in latest.items():
+            (deleted if is_deleted else upserts)[entity].append(entity_id)
+
+        rows = {
+            entity: self._rows(entity, user.id, upserts[entity])
+            for entity in SYNC_ENTITIES
+            if upserts[entity]
+        }
+        return SyncResponse(
+            cursor=encode_cursor(changes[-1].id if changes else since),
+            full=False,
+            **rows,
+            profile=user if upserts["profile"] else None,
+            deleted=SyncDeleted(
+                **{entity: deleted[entity] for entity in SYNC_ENTITIES}
+            ),
+        )
+
+    def _snapshot(self, user: User) -> SyncResponse:
+        # 先取序号再读数据：期间的新写入会在下次增量中重复下发，而不会遗漏
+        seq = self.repo.latest_user_seq(user.id)
+        return SyncResponse(
+            cursor=encode_cursor(seq),
+            full=True,
+            **{entity: self._rows(entity, user.id) for entity in SYNC_ENTITIES},
+            profile=user,
+        )
+
+    def _rows(self, entity: str, user_id: int, ids: Optional[List[int]] = None):
+        return self.repo.get_rows(entity, user_id, ids, ROW_FIELDS[entity])
+
+
+def prune_change_log(engine: Engine, settings: SyncSettings) -> int:
+    """删除超过保留期的变更，返回删除的行数。"""
+    before = datetime.now(timezone.utc) - timedelta(days=settings.retention_days)
+    with Session(engine) as session:
+        return SyncRepository(session).prune(before)
+
+
+async def run_change_log_pruning(engine: Engine, settings: SyncSettings) -> None:
+    """后台定期清理变更日志（各工作进程各自执行，删除是幂等的）。"""
+    while True:
+        try:
+            deleted = await asyncio.to_thread(prune_change_log, engine, settings)
+            if deleted:
+                logger.info("已清理 %d 条过期同步变更", deleted)
+        except Exception as e:
+            logger.warning("清理同步变更失败: %r", e)
+        await asyncio.sleep(settings.prune_interval_s)
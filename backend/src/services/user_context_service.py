@@ -0,0 +1,240 @@
+"""用户教练上下文快照服务。
+
+聊天每一轮都需要把用户资料、最新体重、今日摄入和近期趋势拼进提示词。
+这些数据只在写操作（记录体重、更新资料、记录饮食）时变化，因此按用户
+计算一次快照并缓存在进程内。快照记录构建时资料、体重与饮食的数据版本号
+（变更日志最新序号），读取时用一次查询比对，其他工作进程或 Agent 工具的
+写入因此同样可见；写路径调用的 `invalidate_user_context` 只是本进程内的提前释放。
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from ..core.cache import UserCache
+from ..core.timezones import local_today
+from ..models import DailyIntake, User, WeightRecord
+from ..repositories.food_log_repository import (
+    AsyncFoodLogRepository,
+    FoodLogRepository,
+)
+from ..repositories.sync_repository import AsyncSyncRepository, SyncRepository
+from ..repositories.weight_repository import AsyncWeightRepository, WeightRepository
+
+logger = logging.getLogger("loseweight.user_context")
+
+# 参与趋势计算的最近体重记录条数
+TREND_WINDOW = 7
+# 快照依赖的数据类型（变更日志实体名）
+CONTEXT_ENTITIES = ("profile", "weights", "food_logs")
+
+FALLBACK_PROMPT = "提示：无法获取用户详细资料。请礼貌地询问用户的身体基本信息（身高、体重、年龄、活动量等）。"
+
+
+@dataclass(frozen=True)
+class UserContextSnapshot:
+    """某一时刻的用户教练上下文（只读）。"""
+
+    user_id: int
+    day: date
+    timezone: str
+    username: str
+    full_name: Optional[str]
+    gender: Optional[str]
+    age: Optional[int]
+    height_cm: Optional[float]
+    activity_level: Optional[str]
+    tdee: Optional[float]
+    target_weight_kg: Optional[float]
+    daily_calorie_goal: Optional[float]
+    current_weight_kg: Optional[float]
+    today_calories: float
+    today_entries: int
+    trend_kg: Optional[float]
+    trend_days: Optional[int]
+    # 构建时 CONTEXT_ENTITIES 的最新变更序号
+    version: int = 0
+
+    def missing_fields(self) -> list[str]:
+        missing = []
+        if not self.height_cm:
+            missing.append("身高")
+        if not self.current_weight_kg:
+            missing.append("体重")
+        if not self.age:
+            missing.append("年龄")
+        if not self.gender:
+            missing.append("性别")
+        if not self.activity_level:
+            missing.append("活动水平")
+        return missing
+
+    def to_prompt(self) -> str:
+        """渲染为注入提示词的上下文字符串。"""
+        missing = self.missing_fields()
+        if missing:
+            return f"提示：当前用户资料不完整（缺失：{', '.join(missing)}）。请引导用户补充这些信息，以便计算 TDEE 并制定个性化减重计划。"
+
+        parts = [
+            f"用户信息：姓名 {self.full_name or self.username}, 性别 {self.gender}, "
+            f"当前体重 {self.current_weight_kg}kg, 身高 {self.height_cm}cm, 年龄 {self.age}, "
+            f"活动水平 {self.activity_level}, TDEE {self.tdee or 0:.0f}kcal, "
+            f"目标体重 {self.target_weight_kg}kg。"
+        ]
+        if self.daily_calorie_goal:
+            remaining = self.daily_calorie_goal - self.today_calories
+            parts.append(
+                f"今日已摄入 {self.today_calories:.0f}kcal（{self.today_entries} 条记录），"
+                f"每日目标 {self.daily_calorie_goal:.0f}kcal，剩余 {remaining:.0f}kcal。"
+            )
+        else:
+            parts.append(
+                f"今日已摄入 {self.today_calories:.0f}kcal（{self.today_entries} 条记录）。"
+            )
+        if self.trend_kg is not None and self.trend_days:
+            parts.append(f"近 {self.trend_days} 天体重变化 {self.trend_kg:+.1f}kg。")
+        return "".join(parts)
+
+
+class UserContextCache(UserCache[UserContextSnapshot]):
+    """用户上下文快照缓存，跨越用户本地日期后自动失效（今日摄入需重新计算）。"""
+
+    def is_fresh(self, value: UserContextSnapshot) -> bool:
+        return value.day == local_today(value.timezone)
+
+
+# 单例对象供全局使用
+user_context_cache = UserContextCache()
+
+
+def invalidate_user_context(user_id: Optional[int]) -> None:
+    """用户数据发生写入后调用，使其上下文快照失效。"""
+    if user_id is not None:
+        user_context_cache.invalidate(user_id)
+
+
+def compose_snapshot(
+    user: User,
+    today: date,
+    records: list[WeightRecord],
+    today_intake: list[DailyIntake],
+    version: int = 0,
+) -> UserContextSnapshot:
+    """由最近体重记录（按时间倒序）与今日汇总组装快照。"""
+    current_weight = records[0].weight_kg if records else user.initial_weight_kg
+
+    trend_kg = None
+    trend_days = None
+    if len(records) >= 2:
+        newest, oldest = records[0], records[-1]
+        trend_kg = newest.weight_kg - oldest.weight_kg
+        trend_days = max(1, (newest.recorded_at - oldest.recorded_at).days)
+
+    return UserContextSnapshot(
+        user_id=user.id,
+        day=today,
+        timezone=user.timezone,
+        username=user.username,
+        full_name=user.full_name,
+        gender=user.gender,
+        age=user.age,
+        height_cm=user.height_cm,
+        activity_level=user.activity_level,
+        tdee=user.tdee,
+        target_weight_kg=user.target_weight_kg,
+        daily_calorie_goal=user.daily_calorie_goal,
+        current_weight_kg=current_weight,
+        today_calories=today_intake[0].calories if today_intake else 0,
+        today_entries=today_intake[0].entry_count if today_intake else 0,
+        trend_kg=trend_kg,
+        trend_days=trend_days,
+        version=version,
+    )
+
+
+class UserContextService:
+    def __init__(
+        self,
+        weight_repository: WeightRepository,
+        food_log_repository: FoodLogRepository,
+        sync_repository: SyncRepository,
+        cache: UserContextCache = user_context_cache,
+    ):
+        self.weight_repo = weight_repository
+        self.food_log_repo = food_log_repository
+        self.sync_repo = sync_repository
+        self.cache = cache
+
+    def get_snapshot(self, user: User) -> UserContextSnapshot:
+        # 先取版本号再构建：构建期间的写入会在下次读取时重新构建
+        version = self.sync_repo.get_version(user.id, *CONTEXT_ENTITIES)
+        snapshot = self.cache.get(user.id)
+        if snapshot is None or snapshot.version != version:
+            snapshot = self.build_snapshot(user, version)
+            self.cache.set(user.id, snapshot)
+        return snapshot
+
+    def build_snapshot(self, user: User, version: int = 0) -> UserContextSnapshot:
+        """查询数据库构建快照（仅在缓存未命中或版本变化时调用）。"""
+        today = local_today(user.timezone)
+        return compose_snapshot(
+            user,
+            today,
+            self.weight_repo.get_weights(user.id, limit=TREND_WINDOW),
+            self.food_log_repo.get_daily_intake(user.id, today, today),
+            version,
+        )
+
+    def get_prompt(self, user: User) -> str:
+        try:
+            return self.get_snapshot(user).to_prompt()
+        except Exception as e:
+            logger.error(f"构建用户信息上下文失败: {e}", exc_info=True)
+        return FALLBACK_PROMPT
+
+
+class AsyncUserContextService:
+    """UserContextService 的异步版本（共享同一快照缓存），供 async 聊天路由使用。"""
+
+    def __init__(
+        self,
+        weight_repository: AsyncWeightRepository,
+        food_log_repository: AsyncFoodLogRepository,
+        sync_repository: AsyncSyncRepository,
+        cache: UserContextCache = user_context_cache,
+    ):
+        self.weight_repo = weight_repository
+        self.food_log_repo = food_log_repository
+        self.sync_repo = sync_repository
+        self.cache = cache
+
+    async def get_snapshot(self, user: User) -> UserContextSnapshot:
+        version = await self.sync_repo.get_version(user.id, *CONTEXT_ENTITIES)
+        snapshot = self.cache.get(user.id)
+        if snapshot is None or snapshot.version != version:
+            snapshot = await self.build_snapshot(user, version)
+            self.cache.set(user.id, snapshot)
+        return snapshot
+
+    async def build_snapshot(self, user: User, version: int = 0) -> UserContextSnapshot:
+        today = local_today(user.timezone)
+        return compose_snapshot(
+            user,
+            today,
+            await self.weight_repo.get_weights(user.id, limit=TREND_WINDOW),
+            await self.food_log_repo.get_daily_intake(user.id, today, today),
+            version,
+        )
+
+    async def find_snapshot(self, user: User) -> Optional[UserContextSnapshot]:
+        """获取快照，失败时记录日志并返回 None（调用方按缺少用户资料降级）。"""
+        try:
+            return await self.get_snapshot(user)
+        except Exception as e:
+            logger.error(f"构建用户信息上下文失败: {e}", exc_info=True)
+        return None
+
+    async def get_prompt(self, user: User) -> str:
+        snapshot = await self.find_snapshot(user)
+        return snapshot.to_prompt() if snapshot is not None else FALLBACK_PROMPT
@@ -1,9 +1,11 @@
 from typing import Optional
 
 from ..models import User
+from ..repositories.food_log_repository import FoodLogRepository
 from ..repositories.user_repository import UserRepository
 from ..schemas.user import UserCreate, UserProfileUpdate
 from ..core.security import get_password_hash
+from .user_context_service import invalidate_user_context
 
 
 class UserService:
@@ -15,8 +17,12 @@ class UserService:
         "very_active": 1.9,
     }
 
-    def __init__(self, repository: UserRepository):
+    def __init__(self, repository: UserRepository, food_logs: FoodLogRepository):
         self.repo = repository
+        self.food_logs = food_logs
+
+    def get_profile_version(self, user_id: int) -> int:
+        return self.repo.get_profile_version(user_id)
 
     def calculate_bmr(
         self, weight: float, height: float, age: int, gender: str
@@ -50,6 +56,8 @@ class UserService:
     def update_profile(self, user: User, profile: UserProfileUpdate) -> User:
         """更新用户个人身体资料并自动计算代谢指标。"""
         data = profile.model_dump()
+        if data["timezone"] is None:
+            data.pop("timezone")
 
         # 重新计算 BMR 和 TDEE
         bmr = self.calculate_bmr(
@@ -63,4 +71,9 @@ class UserService:
         # 默认设置为减重目标 (TDEE - 500)
         data["daily_calorie_goal"] = max(1200, tdee - 500)
 
-        return self.repo.update_user(user, data)
+        if data.get("timezone", user.timezone) != user.timezone:
+            # 按新时区的本地日期重建每日汇总，与资料更新在同一事务中提交
+            self.food_logs.rebuild_daily_intake(user.id, data["timezone"])
+        updated = self.repo.update_user(user, data)
+        invalidate_user_context(updated.id)
+        return updated
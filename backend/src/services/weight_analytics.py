@@ -0,0 +1,148 @@
+"""体重趋势分析（基于 NumPy 的列式计算）。
+
+输入为按时间升序的两列数组：记录时间（epoch 秒）与体重（kg）。
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+
+from ..schemas.weight import WeightTrend
+
+SECONDS_PER_DAY = 86400.0
+# 指数平滑系数（每条记录向新值靠拢 10%）
+EMA_ALPHA = 0.1
+# 分块计算指数平滑，避免 (1 - alpha)^-k 过大导致精度损失
+_EMA_BLOCK = 64
+# 平台期判断：最近 14 天内至少 4 条记录，且趋势斜率绝对值低于 0.1 kg/周
+PLATEAU_WINDOW_DAYS = 14
+PLATEAU_MIN_POINTS = 4
+PLATEAU_MAX_RATE = 0.1
+# 目标日期预测使用的回归窗口与最长预测范围
+PROJECTION_WINDOW_DAYS = 30
+MAX_PROJECTION_DAYS = 3 * 365
+
+
+def exponential_smoothing(values: np.ndarray, alpha: float = EMA_ALPHA) -> np.ndarray:
+    """向量化的指数移动平均：y[0] = x[0]，y[i] = (1 - a) * y[i-1] + a * x[i]。"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if values.size == 0:
+        return out
+
+    decay = 1.0 - alpha
+    prev = values[0]
+    # 块内闭式解：y[j] = d^(j+1) * (prev + a * sum_{i<=j} d^-(i+1) * x[i])
+    powers = decay ** np.arange(1, _EMA_BLOCK + 1)
+    for start in range(0, values.size, _EMA_BLOCK):
+        block = values[start : start + _EMA_BLOCK]
+        p = powers[: block.size]
+        smoothed = p * (prev + alpha * np.cumsum(block / p))
+        out[start : start + block.size] = smoothed
+        prev = smoothed[-1]
+    return out
+
+
+def linear_rate(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """最小二乘拟合斜率（kg/天），点数不足或时间跨度为零时返回 None。"""
+    if days.size < 2 or np.ptp(days) == 0:
+        return None
+    centered = days - days.mean()
+    return float(np.dot(centered, values - values.mean()) / np.dot(centered, centered))
+
+
+def _window_rate(
+    days: np.ndarray, values: np.ndarray, window: float
+) -> Optional[float]:
+    mask = days >= days[-1] - window
+    rate = linear_rate(days[mask], values[mask])
+    return None if rate is None else rate * 7
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标（升序）。
+
+    首尾点固定保留，其余点按下标均分为 threshold - 2 个桶，每个桶选取与
+    “上一个已选点、下一个桶均值点”构成三角形面积最大的点，保留峰谷形状。
+    x 需升序；threshold < 3 或不少于点数时原样返回全部下标。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.size
+    if threshold < 3 or threshold >= n:
+        return np.arange(n)
+
+    buckets = threshold - 2
+    # 桶宽 (n - 2) / buckets >= 1，取整后的边界严格递增，每个桶非空
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (
+            (edges[i + 1], edges[i + 2]) if i + 1 < buckets else (n - 1, n)
+        )
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def compute_weight_trend(
+    timestamps: np.ndarray,
+    weights: np.ndarray,
+    target_weight_kg: Optional[float] = None,
+) -> WeightTrend:
+    """根据按时间升序的体重序列计算趋势指标。"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.size == 0:
+        return WeightTrend(points=0, target_weight_kg=target_weight_kg)
+
+    days = (timestamps - timestamps[-1]) / SECONDS_PER_DAY
+    smoothed = exponential_smoothing(weights)
+    trend_weight = float(smoothed[-1])
+
+    rate_7d = _window_rate(days, weights, 7)
+    rate_30d = _window_rate(days, weights, 30)
+
+    plateau_mask = days >= -PLATEAU_WINDOW_DAYS
+    plateau_rate = linear_rate(days[plateau_mask], weights[plateau_mask])
+    is_plateau = (
+        int(plateau_mask.sum()) >= PLATEAU_MIN_POINTS
+        and plateau_rate is not None
+        and abs(plateau_rate * 7) < PLATEAU_MAX_RATE
+        and (target_weight_kg is None or abs(trend_weight - target_weight_kg) > 0.5)
+    )
+
+    projected_date = None
+    days_to_target = None
+    projection_mask = days >= -PROJECTION_WINDOW_DAYS
+    slope = linear_rate(days[projection_mask], weights[projection_mask])
+    if target_weight_kg is not None and slope:
+        remaining = target_weight_kg - trend_weight
+        estimate = remaining / slope
+        # 仅在趋势朝向目标时给出预测
+        if 0 <= estimate <= MAX_PROJECTION_DAYS:
+            days_to_target = int(np.ceil(estimate))
+            last_recorded = datetime.fromtimestamp(timestamps[-1], tz=timezone.utc)
+            projected_date = (last_recorded + timedelta(days=days_to_target)).date()
+
+    return WeightTrend(
+        points=int(weights.size),
+        latest_weight_kg=float(weights[-1]),
+        trend_weight_kg=round(trend_weight, 2),
+        rate_7d_kg_per_week=None if rate_7d is None else round(rate_7d, 3),
+        rate_30d_kg_per_week=None if rate_30d is None else round(rate_30d, 3),
+        target_weight_kg=target_weight_kg,
+        projected_target_date=projected_date,
+        days_to_target=days_to_target,
+        is_plateau=is_plateau,
+    )
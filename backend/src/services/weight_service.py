@@ -1,14 +1,33 @@
-from typing import List, Optional
+from datetime import timezone
+from typing import TYPE_CHECKING, List, Optional
+
+from ..core.cache import UserCache
 from ..repositories.weight_repository import WeightRepository
 from ..models import WeightRecord
+from ..schemas.weight import WeightBatchItem, WeightRead, WeightSeries, WeightTrend
+from .user_context_service import invalidate_user_context
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 体重趋势缓存：(体重数据版本号, 目标体重, 趋势结果)。版本号取自变更日志，
+# 读取时比对，其他工作进程的写入同样使缓存失效
+weight_trend_cache: UserCache[tuple[int, Optional[float], WeightTrend]] = UserCache(
+    ttl_seconds=None
+)
 
 
 class WeightService:
     def __init__(self, repository: WeightRepository):
         self.repo = repository
 
-    def get_weight_history(self, user_id: int) -> List[WeightRecord]:
-        return self.repo.get_weights(user_id)
+    def get_weight_history(self, user_id: int) -> List[dict]:
+        """体重历史（时间倒序），只取 WeightRead 的字段。"""
+        return self.repo.get_weight_rows(user_id, WeightRead.model_fields)
+
+    def get_version(self, user_id: int) -> int:
+        """体重数据版本号（每次写入递增），用于 ETag。"""
+        return self.repo.get_version(user_id)
 
     def get_records(self, user_id: int, limit: int = 1) -> List[WeightRecord]:
         return self.repo.get_weights(user_id, limit=limit)
@@ -16,7 +35,74 @@ class WeightService:
     def record_weight(
         self, weight: float, user_id: int, notes: Optional[str] = ""
     ) -> WeightRecord:
-        return self.repo.add_weight(weight, user_id, notes)
+        record = self.repo.add_weight(weight, user_id, notes)
+        self._invalidate(user_id)
+        return record
+
+    def record_weights(self, user_id: int, items: List[WeightBatchItem]) -> List[int]:
+        """批量记录体重（离线同步），单事务写入，返回与 items 顺序一致的 id。"""
+        records = [
+            WeightRecord(user_id=user_id, **item.model_dump(exclude_none=True))
+            for item in items
+        ]
+        ids = self.repo.add_weights(user_id, records)
+        self._invalidate(user_id)
+        return ids
 
     def delete_record(self, record_id: int, user_id: int) -> bool:
-        return self.repo.delete_weight(record_id, user_id)
+        success = self.repo.delete_weight(record_id, user_id)
+        if success:
+            self._invalidate(user_id)
+        return success
+
+    def get_trend(
+        self, user_id: int, target_weight_kg: Optional[float] = None
+    ) -> WeightTrend:
+        """计算体重趋势（结果按用户缓存，体重数据或目标体重变化时重新计算）。"""
+        version = self.repo.get_version(user_id)
+        cached = weight_trend_cache.get(user_id)
+        if cached is not None and cached[:2] == (version, target_weight_kg):
+            return cached[2]
+
+        from .weight_analytics import compute_weight_trend
+
+        trend = compute_weight_trend(*self._series(user_id), target_weight_kg)
+        weight_trend_cache.set(user_id, (version, target_weight_kg, trend))
+        return trend
+
+    def get_series(self, user_id: int, points: Optional[int] = None) -> WeightSeries:
+        """列式体重序列；指定 points 时以 LTTB 降采样到至多 points 个点。"""
+        import numpy as np
+
+        from .weight_analytics import lttb_indices
+
+        timestamps, weights = self._series(user_id)
+        total = int(weights.size)
+        if points is not None:
+            keep = lttb_indices(timestamps, weights, points)
+            timestamps, weights = timestamps[keep], weights[keep]
+        return WeightSeries(
+            timestamps=timestamps.astype(np.int64).tolist(),
+            weights=weights.tolist(),
+            total_points=total,
+        )
+
+    def _series(self, user_id: int) -> tuple["np.ndarray", "np.ndarray"]:
+        """按时间升序的 (epoch 秒, 体重) 两列数组（NumPy 用到时才导入）。"""
+        import numpy as np
+
+        recorded_at, weights = self.repo.get_weight_series(user_id)
+        timestamps = np.fromiter(
+            (
+                (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+                for ts in recorded_at
+            ),
+            dtype=np.float64,
+            count=len(recorded_at),
+        )
+        return timestamps, np.asarray(weights, dtype=np.float64)
+
+    @staticmethod
+    def _invalidate(user_id: int) -> None:
+        weight_trend_cache.invalidate(user_id)
+        invalidate_user_context(user_id)
@@ -1,12 +1,14 @@
 """测试配置和共享 fixtures。
 
-使用 SQLite 内存数据库运行测试，无需 PostgreSQL。
+使用临时 SQLite 数据库运行测试，无需 PostgreSQL。同步会话与异步会话
+（aiosqlite）指向同一个数据库文件，保证 async 路由能读到同步写入的数据。
 """
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 import sys
 from unittest.mock import MagicMock
@@ -15,31 +17,58 @@ from unittest.mock import MagicMock
 sys.modules["sentence_transformers"] = MagicMock()
 sys.modules["faiss"] = MagicMock()
 
-from src.app import fastapi_server as app  # noqa: E402
-from src.core.database import get_session  # noqa: E402
+from src.app import app  # noqa: E402
+from src.core.config import get_settings  # noqa: E402
+from src.core.database import get_async_session, get_session  # noqa: E402
+from src.core.query_stats import instrument_engine  # noqa: E402
+
+# 响应头返回每请求查询次数，供测试断言查询预算
+get_settings().database.expose_query_stats = True
+
+
+@pytest.fixture(name="db_path")
+def db_path_fixture(tmp_path):
+    return tmp_path / "test.db"
 
 
 @pytest.fixture(name="session")
-def session_fixture():
-    """创建一个使用内存 SQLite 的测试数据库会话。"""
+def session_fixture(db_path):
+    """创建一个使用临时 SQLite 文件的测试数据库会话。"""
     engine = create_engine(
-        "sqlite://",
+        f"sqlite:///{db_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
+    instrument_engine(engine)
     SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
         yield session
+    engine.dispose()
 
 
 @pytest.fixture(name="client")
-def client_fixture(session: Session):
+def client_fixture(session: Session, db_path):
     """创建带依赖覆盖的 TestClient。"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    instrument_engine(async_engine.sync_engine)
 
     def get_session_override():
         return session
 
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as s:
+            yield s
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="auth_headers")
+def auth_headers_fixture(client: TestClient) -> dict:
+    """注册并登录一个测试用户，返回带 Bearer token 的请求头。"""
+    credentials = {"username": "api_user", "password": "secret123"}
+    assert client.post("/user/register", json=credentials).status_code == 200
+    token = client.post("/user/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,213 @@
+"""语义答案缓存测试。"""
+
+from dataclasses import replace
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from src.app import app
+from src.core.config import AnswerCacheSettings, MemorySettings
+from src.core.metrics import ANSWER_CACHE_REQUESTS
+from src.core.security import get_current_user_async
+from src.core.service_registry import ServiceRegistry
+from src.models import ChatMessage, User
+from src.services import answer_cache_service, chat_memory_service
+from src.services.answer_cache_service import (
+    AnswerCache,
+    bucket_prompt,
+    profile_bucket,
+)
+from src.services.chat_memory_service import ChatMemory
+from src.services.user_context_service import UserContextSnapshot
+
+SNAPSHOT = UserContextSnapshot(
+    user_id=1,
+    day=date(2026, 1, 1),
+    timezone="Asia/Shanghai",
+    username="u",
+    full_name=None,
+    gender="Female",
+    age=30,
+    height_cm=160,
+    activity_level="moderate",
+    tdee=2000,
+    target_weight_kg=55,
+    daily_calorie_goal=1600,
+    current_weight_kg=65,
+    today_calories=0,
+    today_entries=0,
+    trend_kg=None,
+    trend_days=None,
+)
+
+
+def vec(*values) -> np.ndarray:
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def count(endpoint: str, result: str) -> float:
+    return ANSWER_CACHE_REQUESTS._values.get((endpoint, result), 0)
+
+
+class HashEmbedding:
+    """同一文本得到同一向量，不同文本近似正交。"""
+
+    def get_text_embedding(self, text: str) -> np.ndarray:
+        seed = sum(text.encode())
+        return np.random.default_rng(seed).standard_normal(64).astype(np.float32)
+
+
+class CountingAgent:
+    def __init__(self):
+        self.calls = 0
+        self.prompts = []
+        self.tool_calls = False
+
+    async def get_guidance_direct(self, question, user_info, history, user_id):
+        self.calls += 1
+        self.prompts.append((user_info, history, user_id))
+        return f"回答 {self.calls}"
+
+    async def chat_stream(self, message, user_info, history, user_id):
+        self.calls += 1
+        self.prompts.append((user_info, history, user_id))
+        if self.tool_calls:
+            yield {"event": "action_result", "data": {"ok": True}}
+        yield {"event": "text", "data": f"流式回答 {self.calls}"}
+        yield {"event": "done", "data": ""}
+
+
+def test_profile_bucket():
+    assert profile_bucket(SNAPSHOT) == ("lose", "over", "female")
+    assert profile_bucket(replace(SNAPSHOT, target_weight_kg=65.5))[0] == "maintain"
+    assert profile_bucket(replace(SNAPSHOT, height_cm=None))[1] == "unknown"
+    assert profile_bucket(None) == ("unknown", "unknown", "unknown")
+
+
+def test_accepts_skips_contextual_questions():
+    cache = AnswerCache(AnswerCacheSettings())
+    assert cache.accepts("晚上能吃水果吗")
+    assert not cache.accepts("今天还能吃多少")
+    assert not cache.accepts("那呢")
+    assert not cache.accepts("How much is MY protein goal")
+
+
+def test_lookup_threshold_bucket_and_ttl(monkeypatch):
+    cache = AnswerCache(AnswerCacheSettings(min_score=0.9, max_entries=2))
+    lose = ("lose", "over", "female")
+    cache.store(lose, vec(1, 0, 0), "少吃多动")
+
+    hits = count("test", "hit")
+    assert cache.lookup("test", lose, vec(1, 0.1, 0)) == "少吃多动"
+    assert count("test", "hit") == hits + 1
+    assert cache.lookup("test", lose, vec(0, 1, 0)) is None
+    assert cache.lookup("test", ("gain", "under", "female"), vec(1, 0, 0)) is None
+
+    # 容量满时淘汰最早写入的
+    cache.store(lose, vec(0, 1, 0), "b")
+    cache.store(lose, vec(0, 0, 1), "c")
+    assert cache.lookup("test", lose, vec(1, 0, 0)) is None
+
+    monkeypatch.setattr(cache.settings, "ttl_s", 0.0)
+    assert cache.lookup("test", lose, vec(0, 0, 1)) is None
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, session: Session, monkeypatch):
+    user = User(username="cache_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    agent = CountingAgent()
+    registry = ServiceRegistry()
+    registry.provide("agent", agent)
+    registry.provide("embedding", HashEmbedding())
+    monkeypatch.setattr(app.state, "services", registry)
+    monkeypatch.setattr(
+        chat_memory_service, "chat_memory", ChatMemory(MemorySettings(roles=[]))
+    )
+    monkeypatch.setattr(
+        answer_cache_service, "answer_cache", AnswerCache(AnswerCacheSettings())
+    )
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    client.agent = agent
+    client.user = user
+    # 保持同一个事件循环，请求结束后后台生成缓存回答的任务继续执行
+    with client:
+        yield client
+
+
+def post(client: TestClient, path: str, **body):
+    """发送请求并等待后台生成缓存回答的任务完成。"""
+    response = client.post(path, json=body)
+    client.portal.call(answer_cache_service.answer_cache.drain)
+    return response
+
+
+ANONYMOUS = bucket_prompt(("unknown", "unknown", "unknown"))
+
+
+def test_chat_serves_cached_answer(auth_client: TestClient, session: Session):
+    first = post(auth_client, "/chat", message="晚上能吃水果吗")
+    assert first.json() == {"reply": "回答 1"}
+    # 未命中后在后台另行生成一次匿名回答写入缓存
+    cached = post(auth_client, "/chat", message="晚上能吃水果吗")
+    assert cached.json() == {"reply": "流式回答 2"}
+    assert auth_client.agent.calls == 2
+
+    # 用户关闭缓存时照常调用 Agent
+    bypass = post(auth_client, "/chat", message="晚上能吃水果吗", use_cache=False)
+    assert bypass.json() == {"reply": "回答 3"}
+
+    # 命中缓存的对话同样写入历史
+    contents = session.exec(
+        select(ChatMessage.content).where(ChatMessage.user_id == auth_client.user.id)
+    ).all()
+    assert contents.count("流式回答 2") == 1
+
+
+def test_stream_replays_cached_answer(auth_client: TestClient):
+    post(auth_client, "/chat/stream", message="每天应该吃多少蛋白质")
+    response = post(auth_client, "/chat/stream", message="每天应该吃多少蛋白质")
+    assert auth_client.agent.calls == 2
+    lines = response.text.splitlines()
+    assert "data: 流式回答 2" in lines
+    assert lines.count("event: done") == 1
+
+
+def test_user_reply_personal_and_cache_filled_anonymously(auth_client: TestClient):
+    """测试用户本人按个性化提示与历史作答，缓存回答另行以匿名分组提示生成。"""
+    post(auth_client, "/chat", message="你好", use_cache=False)
+    reply = post(auth_client, "/chat/stream", message="晚上能吃水果吗")
+    assert "data: 流式回答 2" in reply.text.splitlines()
+
+    user_info, history, user_id = auth_client.agent.prompts[1]
+    assert user_info != ANONYMOUS
+    assert [m["content"] for m in history] == ["你好", "回答 1"]
+    assert user_id == auth_client.user.id
+    # 匿名生成不带个人资料、对话历史，也不关联用户
+    assert auth_client.agent.prompts[2] == (ANONYMOUS, [], None)
+
+    cached = post(auth_client, "/chat/stream", message="晚上能吃水果吗")
+    assert "data: 流式回答 3" in cached.text.splitlines()
+    assert auth_client.agent.calls == 3
+
+
+def test_answers_not_cached_after_tools(auth_client: TestClient):
+    """测试用户本轮或匿名生成调用过工具时都不写入缓存。"""
+    auth_client.agent.tool_calls = True
+    # 流式回答调用过工具，不再另行生成
+    post(auth_client, "/chat/stream", message="每天应该吃多少蛋白质")
+    post(auth_client, "/chat/stream", message="每天应该吃多少蛋白质")
+    assert auth_client.agent.calls == 2
+
+    # 非流式接口照常另行生成，但匿名生成调用了工具，回答被丢弃
+    post(auth_client, "/chat", message="晚上能吃水果吗")
+    post(auth_client, "/chat", message="晚上能吃水果吗")
+    assert auth_client.agent.calls == 6
+    assert all(p[0] != ANONYMOUS for p in auth_client.agent.prompts[::2])
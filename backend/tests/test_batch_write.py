@@ -0,0 +1,86 @@
+"""批量写入（离线同步）测试。"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from src.app import app
+from src.core.security import get_current_user
+from src.models import DailyIntake, FoodLog, User, WeightRecord
+
+
+@pytest.fixture(name="user")
+def user_fixture(session: Session) -> User:
+    user = User(username="batch_user", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, user: User) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: user
+    return client
+
+
+def test_food_log_batch_single_transaction(
+    auth_client: TestClient, session: Session, user: User
+):
+    """测试批量写入饮食记录：id 顺序与请求一致，汇总按本地日期合并更新。"""
+    items = [
+        {
+            "food_name": f"食物{i}",
+            "calories": 100,
+            "protein_g": 2,
+            # 上海时区：前 2 条在 1 月 1 日，后 2 条在 1 月 2 日
+            "timestamp": datetime(
+                2026, 1, 1, 13 + i * 2, tzinfo=timezone.utc
+            ).isoformat(),
+        }
+        for i in range(4)
+    ]
+    response = auth_client.post("/food-logs/batch", json={"items": items})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert len(ids) == 4
+
+    logs = {log.id: log for log in session.exec(select(FoodLog)).all()}
+    assert [logs[i].food_name for i in ids] == [item["food_name"] for item in items]
+
+    rows = session.exec(select(DailyIntake).order_by(DailyIntake.local_date)).all()
+    assert [(r.local_date, r.entry_count, r.calories, r.protein_g) for r in rows] == [
+        (date(2026, 1, 1), 2, 200, 4),
+        (date(2026, 1, 2), 2, 200, 4),
+    ]
+
+
+def test_food_log_batch_rejects_invalid_item(auth_client: TestClient, session: Session):
+    """测试整体校验：任一条目非法时不写入任何记录。"""
+    items = [
+        {"food_name": "米饭", "calories": 200},
+        {"food_name": "鸡蛋", "calories": 80, "protein_g": -1},
+    ]
+    response = auth_client.post("/food-logs/batch", json={"items": items})
+    assert response.status_code == 422
+    assert session.exec(select(FoodLog)).all() == []
+
+
+def test_weight_batch_keeps_recorded_at(auth_client: TestClient, session: Session):
+    """测试批量写入体重记录并保留离线测量时间。"""
+    items = [
+        {"weight_kg": 80 - i, "recorded_at": f"2026-01-0{i + 1}T08:00:00Z"}
+        for i in range(3)
+    ]
+    response = auth_client.post("/weight/batch", json={"items": items})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+
+    records = {r.id: r for r in session.exec(select(WeightRecord)).all()}
+    assert [records[i].weight_kg for i in ids] == [80, 79, 78]
+    assert records[ids[2]].recorded_at.day == 3
+    assert records[ids[0]].notes == ""
+
+    assert auth_client.post("/weight/batch", json={"items": []}).status_code == 422
@@ -0,0 +1,140 @@
+"""聊天长期记忆测试。"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.api import chat
+from src.app import app
+from src.core.config import MemorySettings
+from src.core.security import get_current_user_async
+from src.core.service_registry import ServiceRegistry
+from src.models import ChatEmbedding, ChatMessage, User
+from src.repositories.chat_repository import AsyncChatRepository
+from src.services import answer_cache_service, chat_memory_service
+from src.services.answer_cache_service import AnswerCache
+from src.services.chat_memory_service import ChatMemory
+from src.services.query_embedding import embed_query
+
+VOCAB = ["乳糖", "牛奶", "膝盖", "跑步", "水果"]
+
+
+class KeywordEmbedding:
+    """按关键词计数的伪嵌入，使相似度可预期。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_text_embedding(self, text: str) -> np.ndarray:
+        self.calls.append(text)
+        return np.array([text.count(w) for w in VOCAB] + [0.1], dtype=np.float32)
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.calls = []
+
+    async def get_guidance_direct(self, question, user_info, history, user_id):
+        self.calls.append({"user_info": user_info, "history": history})
+        return "好的"
+
+
+@pytest.fixture(name="user")
+def user_fixture(session: Session) -> User:
+    user = User(username="memory_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def test_remember_then_recall(user: User, db_path):
+    embedding = KeywordEmbedding()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        memory = ChatMemory(
+            MemorySettings(top_k=2, min_score=0.5),
+            session_factory=lambda: AsyncSession(engine, expire_on_commit=False),
+        )
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            repo = AsyncChatRepository(session)
+            records = await repo.add_messages(
+                user.id,
+                [
+                    ("user", "我乳糖不耐受，喝牛奶会胀气"),
+                    ("assistant", "可以换成无乳糖牛奶"),
+                    ("user", "我膝盖不好，不能跑步"),
+                    ("user", "好的"),
+                ],
+            )
+            memory.remember(embedding, user.id, records)
+            await memory.drain()
+            # 只嵌入足够长的用户消息
+            assert embedding.calls == [records[0].content, records[2].content]
+
+            query = await embed_query(embedding, "早餐能喝牛奶吗", timeout=1)
+            recalled = await memory.recall(
+                repo, user.id, query, before_id=records[-1].id
+            )
+            # 只召回窗口之前的消息
+            window = await memory.recall(repo, user.id, query, before_id=records[0].id)
+
+            await repo.clear_history(user.id)
+            cleared = await memory.recall(
+                repo, user.id, query, before_id=records[-1].id
+            )
+        await engine.dispose()
+        return records, recalled, window, cleared
+
+    records, recalled, window, cleared = asyncio.run(run())
+    assert [m.id for m in recalled] == [records[0].id]
+    assert window == []
+    assert cleared == []
+
+
+def test_chat_sends_window_and_recalled_memories(
+    client: TestClient, session: Session, user: User, db_path, monkeypatch
+):
+    embedding = KeywordEmbedding()
+    old = ChatMessage(
+        user_id=user.id, role="user", content="我乳糖不耐受，喝牛奶会胀气"
+    )
+    session.add(old)
+    session.add_all(
+        ChatMessage(user_id=user.id, role=role, content=f"第 {i} 条")
+        for i, role in enumerate(["user", "assistant"] * 2)
+    )
+    session.commit()
+    vector = embedding.get_text_embedding(old.content)
+    session.add(
+        ChatEmbedding(
+            message_id=old.id,
+            user_id=user.id,
+            vector=(vector / np.linalg.norm(vector)).tobytes(),
+        )
+    )
+    session.commit()
+
+    agent = RecordingAgent()
+    registry = ServiceRegistry()
+    registry.provide("agent", agent)
+    registry.provide("embedding", embedding)
+    monkeypatch.setattr(app.state, "services", registry)
+    monkeypatch.setattr(
+        chat_memory_service, "chat_memory", ChatMemory(MemorySettings(roles=[]))
+    )
+    monkeypatch.setattr(answer_cache_service, "answer_cache", AnswerCache())
+    monkeypatch.setattr(chat.get_settings().memory, "history_window", 4)
+    app.dependency_overrides[get_current_user_async] = lambda: user
+
+    response = client.post("/chat", json={"message": "晚上能喝牛奶吗"})
+    assert response.status_code == 200
+    call = agent.calls[0]
+    assert [h["content"] for h in call["history"]] == [f"第 {i} 条" for i in range(4)]
+    assert "我乳糖不耐受" in call["user_info"]
@@ -0,0 +1,119 @@
+"""响应压缩中间件测试。"""
+
+import zlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.core.compression import (
+    CompressionMiddleware,
+    PrecompressedBody,
+    encoder,
+    is_compressible,
+    negotiate,
+)
+from src.core.config import CompressionSettings
+
+ROWS = [{"id": i, "food_name": "鸡胸肉", "calories": 165} for i in range(200)]
+CATALOG = PrecompressedBody(b'{"foods": [' + b'"apple",' * 500 + b'"kale"]}')
+
+
+@pytest.fixture(name="client")
+def client_fixture() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/rows")
+    def rows():
+        return ROWS
+
+    @app.get("/raw-rows")
+    def raw_rows():
+        return ROWS
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/events")
+    def events():
+        chunks = (f"data: {i}\n\n" * 200 for i in range(3))
+        return StreamingResponse(chunks, media_type="text/event-stream")
+
+    @app.get("/export")
+    def export():
+        chunks = (b'{"id": 1, "name": "apple"}\n' * 100 for _ in range(3))
+        return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+    @app.get("/catalog")
+    def catalog(request: Request):
+        return CATALOG.response(request, headers={"ETag": '"v1"'})
+
+    settings = CompressionSettings(route_levels={"/raw-rows": {"gzip": 0}})
+    app.add_middleware(CompressionMiddleware, settings=settings)
+    return TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+
+def test_negotiate_respects_quality():
+    assert negotiate("gzip, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate("br, gzip", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0, *;q=0.1", ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+    assert negotiate(None, ["gzip"]) is None
+
+
+def test_content_types():
+    assert is_compressible("application/json")
+    assert is_compressible("text/csv; charset=utf-8")
+    assert is_compressible("application/problem+json")
+    assert not is_compressible("text/event-stream; charset=utf-8")
+    assert not is_compressible("image/jpeg")
+
+
+def test_large_json_compressed_small_json_not(client: TestClient):
+    response = client.get("/rows")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == ROWS
+
+    small = client.get("/small")
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"ok": True}
+
+    identity = client.get("/rows", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_route_level_zero_disables_compression(client: TestClient):
+    response = client.get("/raw-rows")
+    assert "content-encoding" not in response.headers
+    assert response.json() == ROWS
+
+
+def test_sse_bypassed_and_streams_compressed_per_chunk(client: TestClient):
+    events = client.get("/events")
+    assert "content-encoding" not in events.headers
+    assert events.text.count("data:") == 600
+
+    with client.stream("GET", "/export") as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert zlib.decompress(raw, 31) == b'{"id": 1, "name": "apple"}\n' * 300
+
+    # 每块压缩后立即刷新，已发送的字节可独立解出该块内容
+    stream = encoder("gzip", 6)
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(stream.chunk(b"data: 1\n\n")) == b"data: 1\n\n"
+
+
+def test_precompressed_body_passes_through(client: TestClient):
+    response = client.get("/catalog")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.content == CATALOG.body
+
+    plain = client.get("/catalog", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == '"v1"'
@@ -0,0 +1,82 @@
+"""ETag 与条件 GET 测试。"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from src.app import app
+from src.core.security import get_current_user, get_current_user_async
+from src.models import FoodLog, User, WeightRecord
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, session: Session) -> TestClient:
+    user = User(username="etag_user", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    return client
+
+
+@pytest.mark.parametrize(
+    "path", ["/weight", "/food-logs/today", "/chat/history", "/user/me"]
+)
+def test_unchanged_resource_returns_304(auth_client: TestClient, path: str):
+    """测试携带当前 ETag 时返回 304 且不再查询数据。"""
+    first = auth_client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = auth_client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+    # 只执行版本号查询
+    assert again.headers["x-db-queries"] == "1"
+
+
+def test_write_changes_etag(auth_client: TestClient):
+    """测试写入后 ETag 变化，旧 ETag 不再命中；其他数据类型的 ETag 不受影响。"""
+    weight_etag = auth_client.get("/weight").headers["etag"]
+    logs_etag = auth_client.get("/food-logs/today").headers["etag"]
+
+    auth_client.post("/weight", json={"weight_kg": 70})
+
+    response = auth_client.get("/weight", headers={"If-None-Match": weight_etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["etag"] != weight_etag
+    assert (
+        auth_client.get(
+            "/food-logs/today", headers={"If-None-Match": f"W/{logs_etag}"}
+        ).status_code
+        == 304
+    )
+
+
+@pytest.mark.parametrize(
+    "path, model",
+    [
+        ("/weight", lambda user_id: WeightRecord(user_id=user_id, weight_kg=70)),
+        (
+            "/food-logs/today",
+            lambda user_id: FoodLog(user_id=user_id, food_name="苹果", calories=52),
+        ),
+    ],
+)
+def test_direct_session_write_changes_etag(
+    auth_client: TestClient, session: Session, path, model
+):
+    """测试绕过仓储、直接经会话写入（如 Agent 工具）后 ETag 同样变化。"""
+    user_id = session.exec(select(User.id)).one()
+    etag = auth_client.get(path).headers["etag"]
+
+    with Session(session.get_bind()) as agent_session:
+        agent_session.add(model(user_id))
+        agent_session.commit()
+
+    response = auth_client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
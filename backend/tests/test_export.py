@@ -0,0 +1,86 @@
+"""用户数据流式导出测试。"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.app import app
+from src.core.security import get_current_user_async
+from src.models import ChatMessage, FoodLog, User, WeightRecord
+from src.repositories.export_repository import AsyncExportRepository
+from src.services import export_service
+from src.services.export_service import ExportService
+
+
+@pytest.fixture(name="user")
+def user_fixture(session: Session) -> User:
+    user = User(username="export_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    session.add_all(WeightRecord(user_id=user.id, weight_kg=80 - i) for i in range(3))
+    session.add(FoodLog(user_id=user.id, food_name='米饭, "大碗"', calories=350))
+    session.add(ChatMessage(user_id=user.id, role="user", content="你好\n世界"))
+    other = User(username="other_user", hashed_password="x")
+    session.add(other)
+    session.commit()
+    session.add(WeightRecord(user_id=other.id, weight_kg=60))
+    session.commit()
+    return user
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, user: User) -> TestClient:
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    return client
+
+
+def test_export_ndjson(auth_client: TestClient):
+    response = auth_client.get("/user/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in response.headers["content-disposition"]
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["type"] for r in rows] == ["weights"] * 3 + ["food_logs", "chat_messages"]
+    assert [r["weight_kg"] for r in rows[:3]] == [80, 79, 78]
+    assert rows[4]["content"] == "你好\n世界"
+    assert "recorded_at" in rows[0]
+
+
+def test_export_csv_gzip_file(auth_client: TestClient):
+    response = auth_client.get("/user/export", params={"format": "csv", "gzip": True})
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.csv.gz"')
+
+    text = gzip.decompress(response.content).decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [r["type"] for r in rows] == ["weights"] * 3 + ["food_logs", "chat_messages"]
+    assert rows[3]["food_name"] == '米饭, "大碗"'
+    assert rows[3]["weight_kg"] == ""
+    assert rows[4]["content"] == "你好\n世界"
+
+
+def test_export_streams_in_batches(user: User, db_path, monkeypatch):
+    """测试按批读取并逐批输出，而不是一次性加载全部行。"""
+    monkeypatch.setattr(export_service, "BATCH_SIZE", 2)
+
+    async def collect():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with AsyncSession(engine) as session:
+            service = ExportService(AsyncExportRepository(session))
+            chunks = [chunk async for chunk in service.stream(user.id, "ndjson")]
+        await engine.dispose()
+        return chunks
+
+    chunks = asyncio.run(collect())
+    # 3 条体重分 2 批，饮食与聊天各 1 批
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 1, 1, 1]
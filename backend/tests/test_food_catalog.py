@@ -0,0 +1,97 @@
+"""离线食物目录测试。"""
+
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import food
+from src.services.food_catalog_service import FoodCatalogService, load_entries
+
+METADATA = [
+    {"fdc_id": 2, "description": "Apples, raw", "category": "Fruits"},
+    {"fdc_id": 1, "description": "Hummus, commercial", "category": "Legumes"},
+    {"fdc_id": 3, "description": "Kale, raw", "category": "Vegetables"},
+]
+FDC = {
+    "FoundationFoods": [
+        {
+            "fdcId": 1,
+            "foodNutrients": [
+                {"nutrient": {"number": "957"}, "amount": 229.4},
+                {"nutrient": {"number": "203"}, "amount": 7.35},
+                {"nutrient": {"number": "204"}, "amount": 17.1},
+                {"nutrient": {"number": "205"}, "amount": 14.9},
+            ],
+        }
+    ]
+}
+
+
+@pytest.fixture(name="data_dir")
+def data_dir_fixture(tmp_path):
+    (tmp_path / "food_metadata.json").write_text(json.dumps(METADATA))
+    (tmp_path / "fdc.json").write_text(json.dumps(FDC))
+    return tmp_path
+
+
+def build(data_dir, metadata=None) -> FoodCatalogService:
+    if metadata is not None:
+        (data_dir / "food_metadata.json").write_text(json.dumps(metadata))
+    entries = load_entries(data_dir / "food_metadata.json", data_dir / "fdc.json")
+    return FoodCatalogService(entries, history_dir=data_dir / "history", history=3)
+
+
+def test_snapshot_is_compact_and_versioned(data_dir):
+    catalog = build(data_dir)
+    snapshot = json.loads(catalog.snapshot.body)
+    assert snapshot["full"] is True
+    assert snapshot["version"] == catalog.version
+    assert snapshot["categories"] == ["Fruits", "Legumes", "Vegetables"]
+    assert snapshot["items"][0] == [1, "Hummus, commercial", 1, 229.4, 7.3, 17.1, 14.9]
+    assert snapshot["items"][1][3:] == [None, None, None, None]
+    # 内容不变时版本号不变
+    assert build(data_dir).version == catalog.version
+
+
+def test_delta_between_versions(data_dir):
+    old = build(data_dir)
+    changed = [dict(METADATA[0], description="Apples, fuji, raw"), METADATA[1]]
+    new = build(data_dir, changed + [{"fdc_id": 4, "description": "Oats"}])
+    assert new.version != old.version
+
+    delta = json.loads(new.body(old.version).body)
+    assert delta["full"] is False
+    assert delta["base"] == old.version
+    assert [item[:2] for item in delta["items"]] == [
+        [2, "Apples, fuji, raw"],
+        [4, "Oats"],
+    ]
+    assert delta["deleted"] == [3]
+
+    # 未知或非法版本退回全量快照
+    assert json.loads(new.body("0" * 16).body)["full"] is True
+    assert json.loads(new.body("../etc").body)["full"] is True
+
+
+def test_catalog_endpoint_etag_and_precompressed(
+    client: TestClient, data_dir, monkeypatch
+):
+    catalog = build(data_dir)
+    monkeypatch.setattr(food, "get_food_catalog", lambda: catalog)
+
+    response = client.get("/food/catalog", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["version"] == catalog.version
+    etag = response.headers["etag"]
+    assert etag == f'W/"{catalog.version}"'
+    assert gzip.decompress(catalog.snapshot.variant("gzip")) == catalog.snapshot.body
+
+    again = client.get("/food/catalog", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    idle = client.get("/food/catalog", params={"since": catalog.version})
+    assert idle.json()["full"] is False
+    assert idle.json()["items"] == []
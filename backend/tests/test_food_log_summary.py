@@ -0,0 +1,171 @@
+"""每日摄入汇总（daily_intake）测试。"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, create_engine, delete, select
+
+from src.core.database import upgrade_schema
+from src.models import DailyIntake, FoodLog, User
+from src.repositories.food_log_repository import FoodLogRepository
+from src.repositories.user_repository import UserRepository
+from src.schemas.food_log import FoodLogCreate
+from src.schemas.user import UserProfileUpdate
+from src.services.food_log_service import FoodLogService
+from src.services.user_service import UserService
+
+PROFILE = dict(
+    age=30, gender="female", height_cm=165, initial_weight_kg=70, target_weight_kg=60
+)
+
+
+def _log(service: FoodLogService, user: User, calories: float, hour: int, **macros):
+    service.log_food(
+        user,
+        FoodLogCreate(
+            food_name="测试食物",
+            calories=calories,
+            timestamp=datetime(2026, 1, 1, hour, 0, tzinfo=timezone.utc),
+            **macros,
+        ),
+    )
+
+
+def test_summary_uses_local_day_buckets(session: Session):
+    """测试按用户时区划分本地日期并累加宏量营养素。"""
+    user = User(username="tz_user", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    service = FoodLogService(FoodLogRepository(session))
+
+    _log(service, user, 200, hour=15)  # 上海 23:00，仍是 1 月 1 日
+    _log(service, user, 100, hour=17, protein_g=5)  # 上海 1 月 2 日 01:00
+    _log(service, user, 50, hour=18, protein_g=2)
+
+    summary = service.get_summary(user, date(2026, 1, 1), date(2026, 1, 2))
+    assert [d.local_date for d in summary.days] == [date(2026, 1, 1), date(2026, 1, 2)]
+    assert summary.days[0].calories == 200
+    assert summary.days[0].protein_g is None
+    assert summary.days[1].entry_count == 2
+    assert summary.days[1].protein_g == 7
+    assert summary.total_calories == 350
+
+
+def test_rebuild_after_timezone_change(session: Session):
+    """测试修改时区时在数据库中按新的本地日期分组重建汇总。"""
+    user = User(username="tz_user2", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    service = FoodLogService(FoodLogRepository(session))
+    _log(service, user, 200, hour=15)
+    _log(service, user, 100, hour=17, protein_g=5)
+
+    users = UserService(UserRepository(session), FoodLogRepository(session))
+    users.update_profile(user, UserProfileUpdate(**PROFILE, timezone="UTC"))
+
+    summary = service.get_summary(user, date(2026, 1, 1), date(2026, 1, 2))
+    assert len(summary.days) == 1
+    assert summary.days[0].calories == 300
+    assert summary.days[0].entry_count == 2
+    assert summary.days[0].protein_g == 5
+
+
+def test_timezone_change_rolls_back_with_failed_rebuild(session: Session, monkeypatch):
+    """测试重建汇总失败时时区修改一同回滚，汇总仍与原时区一致。"""
+    user = User(username="tz_user3", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    _log(FoodLogService(FoodLogRepository(session)), user, 200, hour=17)
+
+    def fail(self, user_id, tz_name):
+        session.exec(delete(DailyIntake).where(DailyIntake.user_id == user_id))
+        raise RuntimeError("rebuild failed")
+
+    monkeypatch.setattr(FoodLogRepository, "rebuild_daily_intake", fail)
+    users = UserService(UserRepository(session), FoodLogRepository(session))
+    with pytest.raises(RuntimeError):
+        users.update_profile(user, UserProfileUpdate(**PROFILE, timezone="UTC"))
+    session.rollback()
+
+    session.refresh(user)
+    assert user.timezone == "Asia/Shanghai"
+    days = session.exec(
+        select(DailyIntake.local_date).where(DailyIntake.user_id == user.id)
+    ).all()
+    assert days == [date(2026, 1, 2)]
+
+
+def test_rollup_follows_direct_orm_writes(session: Session):
+    """测试不经 FoodLogService 的写入（如 Agent 工具）同样维护汇总，含修改与删除。"""
+    user = User(username="agent_user", hashed_password="x", timezone="Asia/Shanghai")
+    session.add(user)
+    session.commit()
+    noon = datetime(2026, 1, 1, 4, tzinfo=timezone.utc)  # 上海 12:00
+    lunch = FoodLog(user_id=user.id, food_name="午餐", calories=500, timestamp=noon)
+    snack = FoodLog(user_id=user.id, food_name="加餐", calories=100, fat_g=3)
+    snack.timestamp = noon
+    session.add_all([lunch, snack])
+    session.commit()
+
+    def day():
+        session.expire_all()
+        row = session.exec(select(DailyIntake)).one()
+        return row.local_date, row.entry_count, row.calories, row.fat_g
+
+    assert day() == (date(2026, 1, 1), 2, 600, 3)
+
+    lunch.calories = 450
+    session.add(lunch)
+    session.commit()
+    assert day() == (date(2026, 1, 1), 2, 550, 3)
+
+    session.delete(snack)
+    session.commit()
+    assert day() == (date(2026, 1, 1), 1, 450, 0)
+
+
+def test_upgrade_schema_adds_columns_and_backfills(tmp_path):
+    """测试旧库升级：补齐新增列、从已有记录生成汇总，重复执行无副作用。"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, "
+                "hashed_password VARCHAR, email VARCHAR, full_name VARCHAR, "
+                "age INTEGER, gender VARCHAR, height_cm FLOAT, "
+                "initial_weight_kg FLOAT, target_weight_kg FLOAT, "
+                "activity_level VARCHAR, bmr FLOAT, tdee FLOAT, "
+                "daily_calorie_goal FLOAT, created_at DATETIME, is_active BOOLEAN)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE food_logs (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                "food_name VARCHAR, calories FLOAT, timestamp DATETIME)"
+            )
+        )
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'old')"))
+        conn.execute(
+            text(
+                "INSERT INTO food_logs (user_id, food_name, calories, timestamp) "
+                "VALUES (1, 'a', 100, '2026-01-01 23:00:00'), "
+                "(1, 'b', 50, '2026-01-01 08:00:00')"
+            )
+        )
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("food_logs")}
+    assert {"protein_g", "carbs_g", "fat_g"} <= columns
+    with Session(engine) as session:
+        assert session.get(User, 1).timezone == "UTC"
+        rows = session.exec(select(DailyIntake)).all()
+        assert [(r.local_date, r.entry_count, r.calories) for r in rows] == [
+            (date(2026, 1, 1), 2, 150)
+        ]
+    engine.dispose()
@@ -0,0 +1,67 @@
+"""启动导入开销测试：用 -X importtime 检查 src.app 的导入耗时与重量级依赖。"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 这些 SDK 与依赖 NumPy 的模块只应在首次使用时导入，导入 src.app 时不得加载
+DEFERRED_MODULES = (
+    "pymilvus",
+    "dashscope",
+    "openai",
+    "minio",
+    "PIL",
+    "LoseWeightAgent",
+    "numpy",
+    "src.services.chat_memory_service",
+    "src.services.answer_cache_service",
+    "src.services.weight_analytics",
+)
+
+# Web 框架与 ORM 的导入开销固定且不受本项目控制，先行导入，预算只衡量项目自身
+FRAMEWORK_IMPORTS = "import fastapi, fastapi.routing, sqlmodel, sqlalchemy.ext.asyncio"
+
+
+def import_profile() -> dict[str, int]:
+    """在子进程中（框架已导入后）导入 src.app，返回 {模块名: 累计微秒}。"""
+    env = {**os.environ, "LOSS_DATABASE__URL": "sqlite://"}
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"{FRAMEWORK_IMPORTS}; import src.app",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_app_import_defers_heavy_sdks_and_stays_within_budget():
+    """测试导入 src.app 不加载重量级 SDK，且累计耗时在预算内。"""
+    profile = import_profile()
+    loaded = {
+        name
+        for name in profile
+        if any(name == m or name.startswith(m + ".") for m in DEFERRED_MODULES)
+    }
+    assert not loaded, f"导入时加载了应延迟的模块: {sorted(loaded)}"
+
+    budget_ms = float(os.environ.get("LOSS_IMPORT_BUDGET_MS", "1000"))
+    assert profile["src.app"] / 1000 < budget_ms
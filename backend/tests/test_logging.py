@@ -0,0 +1,45 @@
+"""日志格式化与采样测试。"""
+
+import json
+import logging
+import logging.handlers
+
+from src.core import logging as logging_config
+from src.core.config import LoggingSettings
+from src.core.logging import JsonFormatter, SamplingFilter, _build_file_handler
+
+
+def _record(level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "uvicorn.access", level, __file__, 1, "GET %s", ("/",), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter_keeps_fraction():
+    """测试按比例保留 INFO 日志，WARNING 始终保留。"""
+    sampler = SamplingFilter(0.25)
+    kept = sum(sampler.filter(_record()) for _ in range(100))
+    assert kept == 25
+    assert sampler.filter(_record(logging.WARNING))
+
+
+def test_json_formatter_includes_extra_fields():
+    """测试 JSON 格式输出消息与 extra 字段。"""
+    payload = json.loads(JsonFormatter().format(_record(user_id=7)))
+    assert payload["message"] == "GET /"
+    assert payload["logger"] == "uvicorn.access"
+    assert payload["user_id"] == 7
+
+
+def test_workers_write_separate_log_files(tmp_path, monkeypatch):
+    """测试多进程模式下每个工作进程轮转自己的日志文件。"""
+    settings = LoggingSettings(rotation="size")
+    monkeypatch.setattr(logging_config, "_worker", 2)
+    handler = _build_file_handler(settings, tmp_path / "app.log")
+    try:
+        assert isinstance(handler, logging.handlers.RotatingFileHandler)
+        assert handler.baseFilename == str(tmp_path / "app.worker2.log")
+    finally:
+        handler.close()
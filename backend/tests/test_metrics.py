@@ -0,0 +1,40 @@
+"""Prometheus 指标测试。"""
+
+from src.core.metrics import Counter, Histogram, InstrumentedProxy, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """测试直方图按累计计数输出各桶。"""
+    histogram = Histogram("latency_seconds", "测试", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    lines = histogram.render().splitlines()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_registry_runs_collectors():
+    """测试抓取时执行采集回调。"""
+    registry = Registry()
+    counter = registry.register(Counter("scrapes_total", "测试"))
+    registry.add_collector(lambda: counter.inc())
+
+    assert "scrapes_total 1" in registry.render()
+
+
+def test_instrumented_proxy_forwards_calls():
+    """测试代理对象透传方法调用与属性。"""
+
+    class Service:
+        name = "svc"
+
+        def search(self, query: str) -> str:
+            return query.upper()
+
+    proxy = InstrumentedProxy(Service(), service="test")
+    assert proxy.search("apple") == "APPLE"
+    assert proxy.name == "svc"
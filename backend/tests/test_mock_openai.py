@@ -0,0 +1,46 @@
+"""本地 OpenAI 兼容模拟服务测试。"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from bench.mock_openai import MockConfig, MockScript, ScriptedResponse, create_app
+
+FAST = dict(ttft_ms=0, tokens_per_second=0, vision_latency_ms=0, embedding_latency_ms=0)
+
+
+def test_streaming_completion_uses_scripted_reply():
+    """测试流式输出按脚本回复拼接，并以 [DONE] 结束。"""
+    script = MockScript(responses=[ScriptedResponse(match="午饭", reply="吃沙拉")])
+    client = TestClient(create_app(MockConfig(**FAST), script))
+    body = {
+        "model": "qwen-plus",
+        "stream": True,
+        "messages": [{"role": "user", "content": "午饭吃什么"}],
+    }
+    with client.stream("POST", "/v1/chat/completions", json=body) as response:
+        lines = [line for line in response.iter_lines() if line.startswith("data: ")]
+
+    assert lines[-1] == "data: [DONE]"
+    chunks = [json.loads(line[6:]) for line in lines[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert text == "吃沙拉"
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_rate_limit_injection_returns_429():
+    """测试限流注入返回带 Retry-After 的 429。"""
+    client = TestClient(create_app(MockConfig(**FAST, rate_limit_rate=1.0), seed=1))
+    response = client.post("/v1/embeddings", json={"input": "apple"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1.0"
+    assert response.json()["error"]["type"] == "rate_limit_exceeded"
+
+
+def test_embeddings_are_deterministic():
+    """测试相同输入得到相同向量。"""
+    client = TestClient(create_app(MockConfig(**FAST)))
+    body = {"input": ["apple", "apple"], "dimensions": 8}
+    data = client.post("/v1/embeddings", json=body).json()["data"]
+    assert len(data[0]["embedding"]) == 8
+    assert data[0]["embedding"] == data[1]["embedding"]
@@ -0,0 +1,208 @@
+"""模型端点路由测试：选择、对冲、回退与熔断。"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import time
+
+import pytest
+
+import src.app as app_module
+from src.core.config import RouterSettings
+from src.core.metrics import MODEL_ROUTER_HEDGES
+from src.core.model_router import ModelRouter, RoutedClient, Target
+
+
+class FakeModel:
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.closed = 0
+
+    async def ask(self, question: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name}: 429 Too Many Requests")
+        return f"{self.name}:{question}"
+
+    async def stream(self, question: str):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError(f"{self.name} unavailable")
+            for token in ("a", "b"):
+                yield f"{self.name}:{token}"
+        finally:
+            self.closed += 1
+
+    def embed(self, text: str) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("embedding failed")
+        return f"{self.name}:{text}"
+
+
+def make_router(*models: FakeModel, **overrides) -> ModelRouter:
+    settings = RouterSettings(
+        **{
+            "min_samples": 1,
+            "hedge_min_s": 0.05,
+            "hedge_max_s": 0.05,
+            "cooldown_s": 60,
+            **overrides,
+        }
+    )
+    targets = [Target(m.name, m) for m in models]
+    return ModelRouter("chat", targets, settings)
+
+
+def ask(router: ModelRouter, question: str = "q"):
+    return router.call("ask", lambda c: c.ask(question))
+
+
+def test_prefers_fastest_measured_target():
+    primary, backup = FakeModel("primary"), FakeModel("backup")
+    router = make_router(primary, backup)
+    router.targets[0].observe("ask", 2.0, 100)
+    router.targets[1].observe("ask", 0.5, 100)
+    assert [t.name for t in router.ranked("ask")] == ["backup", "primary"]
+    # 没有样本的操作按配置顺序
+    assert [t.name for t in router.ranked("other")] == ["primary", "backup"]
+
+
+def test_hedges_slow_primary():
+    primary = FakeModel("primary", delay=1.0)
+    backup = FakeModel("backup", delay=0.01)
+    router = make_router(primary, backup)
+    hedges = MODEL_ROUTER_HEDGES._values.get(("chat",), 0)
+
+    async def run():
+        start = time.perf_counter()
+        result = await ask(router)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "backup:q"
+    assert elapsed < 0.5
+    assert MODEL_ROUTER_HEDGES._values[("chat",)] == hedges + 1
+    # 被取消的主端点请求不计入在途数
+    assert router.targets[0].in_flight == 0
+
+
+def test_falls_back_and_opens_circuit():
+    primary = FakeModel("primary", fail=True)
+    backup = FakeModel("backup")
+    router = make_router(primary, backup, min_samples=2, hedge=False)
+
+    async def run():
+        return [await ask(router, str(i)) for i in range(3)]
+
+    assert asyncio.run(run()) == ["backup:0", "backup:1", "backup:2"]
+    # 连续失败 2 次后熔断，第 3 次请求不再发往主端点
+    assert primary.calls == 2
+
+    both_down = make_router(FakeModel("a", fail=True), FakeModel("b", fail=True))
+    with pytest.raises(RuntimeError, match="b: 429"):
+        asyncio.run(ask(both_down))
+
+
+def test_overloaded_target_skipped():
+    primary, backup = FakeModel("primary"), FakeModel("backup")
+    router = make_router(primary, backup)
+    router.targets[0].max_concurrency = 1
+    router.targets[0].begin()
+    assert asyncio.run(ask(router)) == "backup:q"
+
+
+def test_stream_falls_back_before_first_event_and_hedges():
+    async def collect(router):
+        return [e async for e in router.stream("stream", lambda c: c.stream("q"))]
+
+    primary = FakeModel("primary", fail=True)
+    backup = FakeModel("backup")
+    assert asyncio.run(collect(make_router(primary, backup))) == [
+        "backup:a",
+        "backup:b",
+    ]
+
+    slow = FakeModel("slow", delay=1.0)
+    fast = FakeModel("fast", delay=0.01)
+    router = make_router(slow, fast)
+    assert asyncio.run(collect(router)) == ["fast:a", "fast:b"]
+    # 落选的流被关闭
+    assert slow.closed == 1
+    assert [t.in_flight for t in router.targets] == [0, 0]
+
+
+def test_call_sync_hedges_in_thread_pool():
+    slow = FakeModel("slow", delay=0.5)
+    fast = FakeModel("fast")
+    router = make_router(slow, fast)
+    assert router.call_sync("embed", lambda c: c.embed("x")) == "fast:x"
+
+
+def test_non_idempotent_calls_never_resent():
+    """测试非幂等操作（会调用工具写入数据的对话）不对冲、不回退，只发往一个端点。"""
+
+    async def collect(router):
+        events = router.stream("stream", lambda c: c.stream("q"), idempotent=False)
+        return [e async for e in events]
+
+    slow, fast = FakeModel("slow", delay=0.2), FakeModel("fast")
+    router = make_router(slow, fast)
+    assert asyncio.run(router.call("ask", lambda c: c.ask("q"), False)) == "slow:q"
+    assert asyncio.run(collect(router)) == ["slow:a", "slow:b"]
+    assert fast.calls == 0
+
+    # 失败的端点由熔断在后续请求中绕开，这里不触发熔断
+    failing, backup = FakeModel("failing", fail=True), FakeModel("backup")
+    router = make_router(failing, backup, min_samples=10)
+    with pytest.raises(RuntimeError, match="failing"):
+        asyncio.run(router.call("ask", lambda c: c.ask("q"), False))
+    with pytest.raises(RuntimeError, match="failing"):
+        asyncio.run(collect(router))
+    assert backup.calls == 0
+
+
+def test_routed_client_dispatches_by_method():
+    chat = make_router(FakeModel("chat"))
+    vision = make_router(FakeModel("vision"))
+    client = RoutedClient({"chat": chat, "vision": vision}, {"embed": "vision"}, "chat")
+
+    # 保持调用方式，便于 InstrumentedProxy 继续按类型包装
+    assert inspect.iscoroutinefunction(client.ask)
+    assert inspect.isasyncgenfunction(client.stream)
+    assert asyncio.run(client.ask("q")) == "chat:q"
+    assert client.embed("x") == "vision:x"
+
+
+def test_routed_client_resends_only_idempotent_methods():
+    primary, backup = FakeModel("primary", fail=True), FakeModel("backup")
+    router = make_router(primary, backup, hedge=False, min_samples=10)
+    client = RoutedClient({"chat": router}, {}, "chat", idempotent={"embed"})
+
+    assert client.embed("x") == "backup:x"
+    with pytest.raises(RuntimeError, match="primary"):
+        asyncio.run(client.ask("q"))
+
+
+def test_embedding_client_shared_between_consumers(monkeypatch):
+    """测试食物检索与聊天记忆并发初始化时共用同一个嵌入客户端（同一个路由器）。"""
+    built = []
+
+    def build():
+        time.sleep(0.05)
+        built.append(object())
+        return built[-1]
+
+    monkeypatch.setattr(app_module, "_embedding", None)
+    monkeypatch.setattr(app_module, "_build_embedding", build)
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        clients = list(pool.map(lambda _: app_module._create_embedding(), range(2)))
+    assert len(built) == 1
+    assert clients == built * 2
@@ -0,0 +1,64 @@
+"""管理员剖析接口测试。"""
+
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api import admin
+from src.core.config import get_settings
+
+HEADERS = {"X-API-Key": "secret"}
+
+
+@pytest.fixture(name="client")
+def client_fixture(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings.profiling, "enabled", True)
+    monkeypatch.setattr(settings.profiling, "sample_interval_ms", 1)
+    monkeypatch.setattr(settings.security, "api_key", "secret")
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+
+def test_profiling_disabled_by_default():
+    """测试默认关闭时接口不可见。"""
+    app = FastAPI()
+    app.include_router(admin.router)
+    response = TestClient(app).post("/admin/profile/cpu", headers=HEADERS)
+    assert response.status_code == 404
+
+
+def test_profiling_requires_api_key(client: TestClient):
+    """测试 API Key 错误时拒绝访问。"""
+    response = client.post("/admin/profile/cpu", headers={"X-API-Key": "wrong"})
+    assert response.status_code == 401
+
+
+def test_cpu_profile_pstats_is_loadable(client: TestClient, tmp_path):
+    """测试采样结果可以作为 pstats 文件加载。"""
+    response = client.post(
+        "/admin/profile/cpu?seconds=0.05&format=pstats", headers=HEADERS
+    )
+    assert response.status_code == 200
+    path = tmp_path / "cpu.pstats"
+    path.write_bytes(response.content)
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_memory_snapshot_diff(client: TestClient):
+    """测试 tracemalloc 快照与差异。"""
+    assert (
+        client.post("/admin/profile/memory/snapshot", headers=HEADERS).status_code
+        == 409
+    )
+    client.post("/admin/profile/memory/start", headers=HEADERS)
+    try:
+        first = client.post("/admin/profile/memory/snapshot", headers=HEADERS).json()
+        assert first["diff"] is None
+        second = client.post("/admin/profile/memory/snapshot", headers=HEADERS).json()
+        assert second["top"] and second["diff"] is not None
+    finally:
+        client.post("/admin/profile/memory/stop", headers=HEADERS)
@@ -0,0 +1,71 @@
+"""SQL 查询统计与查询预算测试。"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from src.core.config import get_settings
+from src.core.query_stats import QueryStats, QueryStatsMiddleware, instrument_engine
+from src.models import Food, FoodNutrient, Nutrient
+from src.repositories.food_repository import FoodRepository
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    instrument_engine(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Nutrient(nutrient_id=1008, nutrient_number="208"))
+        for fdc_id in range(1, 11):
+            session.add(Food(fdc_id=fdc_id, description=f"food {fdc_id}"))
+            session.add(FoodNutrient(fdc_id=fdc_id, nutrient_id=1008, amount=fdc_id))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine, monkeypatch):
+    monkeypatch.setattr(get_settings().database, "expose_query_stats", True)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/foods")
+    def foods():
+        with Session(engine) as session:
+            details = FoodRepository(session).get_foods_simple_details(
+                list(range(1, 11))
+            )
+        return {str(k): v["calories_per_100g"] for k, v in details.items()}
+
+    return TestClient(app)
+
+
+def test_food_details_query_budget(client: TestClient):
+    """测试批量查询食物热量不随食物数量产生 N+1 查询。"""
+    response = client.get("/foods")
+
+    assert response.status_code == 200
+    assert response.json()["3"] == 3
+    assert int(response.headers["x-db-queries"]) <= 3
+    assert float(response.headers["x-db-time-ms"]) >= 0
+
+
+def test_repeated_statement_flagged_as_n_plus_one():
+    """测试同一语句重复达到阈值时被识别为 N+1 嫌疑。"""
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT * FROM nutrients WHERE nutrient_id = ?", 0.001)
+    stats.record("SELECT * FROM foods", 0.001)
+
+    assert stats.count == 6
+    assert stats.n_plus_one_suspects(5) == [
+        ("SELECT * FROM nutrients WHERE nutrient_id = ?", 5)
+    ]
@@ -0,0 +1,43 @@
+"""真实路由的查询预算测试：查询次数固定，不随记录数增长（防止 N+1 回归）。"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from src.models import ChatMessage, FoodLog, User, WeightRecord
+
+# 鉴权查用户 + 读版本号（ETag）+ 读数据
+QUERY_BUDGET = 3
+
+
+def seed(session: Session, user_id: int, count: int) -> None:
+    for i in range(count):
+        session.add(WeightRecord(user_id=user_id, weight_kg=70 + i * 0.1))
+        session.add(FoodLog(user_id=user_id, food_name=f"food {i}", calories=100))
+        session.add(ChatMessage(user_id=user_id, role="user", content=f"msg {i}"))
+    session.commit()
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/weight",
+        "/weight?format=columnar",
+        "/food-logs/today",
+        "/chat/history",
+    ],
+)
+def test_route_query_count_is_constant(
+    client: TestClient, session: Session, auth_headers: dict, path: str
+):
+    """测试记录数从 1 增至 41 时，接口查询次数保持不变且不超过预算。"""
+    user_id = session.exec(select(User.id)).one()
+
+    counts = []
+    for count in (1, 40):
+        seed(session, user_id, count)
+        response = client.get(path, headers=auth_headers)
+        assert response.status_code == 200
+        counts.append(int(response.headers["x-db-queries"]))
+
+    assert counts[0] == counts[1] <= QUERY_BUDGET
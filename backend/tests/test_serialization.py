@@ -0,0 +1,101 @@
+"""只读列表按列读取的序列化测试。"""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+
+from src.app import app
+from src.core.security import get_current_user, get_current_user_async
+from src.models import ChatMessage, User, WeightRecord
+from src.repositories.chat_repository import ChatRepository
+from src.repositories.sync_repository import SyncRepository
+from src.schemas.weight import WeightRead
+
+
+def test_column_rows_match_orm_serialization(client: TestClient, session: Session):
+    """测试按列读取的 /weight 与 /sync 输出与 ORM 实体序列化结果一致。"""
+    user = User(username="rows_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    session.add_all(
+        WeightRecord(
+            user_id=user.id, weight_kg=80 - i, recorded_at=start + timedelta(days=i)
+        )
+        for i in range(3)
+    )
+    session.commit()
+
+    records = session.exec(
+        select(WeightRecord).order_by(WeightRecord.recorded_at.desc())
+    ).all()
+    adapter = TypeAdapter(list[WeightRead])
+    expected = adapter.dump_python(adapter.validate_python(records), mode="json")
+
+    assert client.get("/weight").json() == expected
+    assert client.get("/sync").json()["weights"] == expected[::-1]
+
+    rows = SyncRepository(session).get_rows("weights", user.id, fields=("id",))
+    assert rows == [{"id": r["id"]} for r in expected[::-1]]
+
+
+def test_weight_columnar_downsampled(client: TestClient, session: Session):
+    """测试 format=columnar 返回升序并列数组，points 限制点数并参与 ETag。"""
+    user = User(username="chart_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    session.add_all(
+        WeightRecord(
+            user_id=user.id,
+            weight_kg=80 - i * 0.01,
+            recorded_at=start + timedelta(days=i),
+        )
+        for i in range(100)
+    )
+    session.commit()
+
+    full = client.get("/weight", params={"format": "columnar"})
+    data = full.json()
+    assert data["total_points"] == 100
+    assert data["timestamps"][0] == int(start.timestamp())
+    assert data["timestamps"] == sorted(data["timestamps"])
+    assert data["weights"][-1] == 79.01
+
+    chart = client.get("/weight", params={"format": "columnar", "points": 10})
+    assert len(chart.json()["timestamps"]) == len(chart.json()["weights"]) == 10
+    assert chart.json()["total_points"] == 100
+    assert chart.headers["etag"] != full.headers["etag"]
+
+    assert client.get("/weight", params={"points": 10}).status_code == 400
+    assert client.get("/weight", params={"format": "csv"}).status_code == 422
+
+
+def test_chat_history_rows_match_orm_serialization(
+    client: TestClient, session: Session
+):
+    """测试按列读取的 /chat/history 与原先直接返回 ORM 实体的输出一致。"""
+    user = User(username="chat_rows_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_user_async] = lambda: user
+    ChatRepository(session).add_messages(
+        user.id, [("user", "你好"), ("assistant", "嗨")]
+    )
+
+    messages = session.exec(select(ChatMessage).order_by(ChatMessage.id)).all()
+    adapter = TypeAdapter(list[ChatMessage])
+    expected = adapter.dump_python(messages, mode="json")
+
+    assert client.get("/chat/history").json() == expected
+    assert client.get("/sync").json()["chat_messages"] == expected
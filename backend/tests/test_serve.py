@@ -0,0 +1,67 @@
+"""多进程启动入口、SSE 收尾与共享只读数据测试。"""
+
+import asyncio
+import gc
+
+from src.core.config import ServerSettings
+from src.core.shared_data import freeze_heap
+from src.core.shutdown import begin_drain, drain_stream, end_drain
+from src.serve import available_cpus, resolve_workers
+
+
+def test_resolve_workers():
+    """测试工作进程数：显式配置优先，自动模式受 max_workers 限制。"""
+    assert resolve_workers(ServerSettings(workers=3)) == 3
+    auto = resolve_workers(ServerSettings(workers=0, max_workers=2))
+    assert 1 <= auto <= min(2, available_cpus())
+
+
+def test_drain_stream_ends_long_stream_with_farewell():
+    """测试收尾截止时主动结束慢速流，并取消上游生成器。"""
+    cancelled = False
+
+    async def slow_stream():
+        nonlocal cancelled
+        try:
+            for i in range(100):
+                yield f"chunk-{i}"
+                await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def consume():
+        chunks = []
+        async for chunk in drain_stream(slow_stream(), "bye"):
+            chunks.append(chunk)
+            if len(chunks) == 2:
+                begin_drain(0.1)
+        return chunks
+
+    try:
+        chunks = asyncio.run(consume())
+    finally:
+        end_drain()
+    assert chunks[-1] == "bye"
+    assert 2 < len(chunks) < 100
+    assert cancelled
+
+
+def test_drain_stream_passes_through_when_not_draining():
+    async def stream():
+        for i in range(3):
+            yield str(i)
+
+    async def consume():
+        return [chunk async for chunk in drain_stream(stream(), "bye")]
+
+    assert asyncio.run(consume()) == ["0", "1", "2"]
+
+
+def test_freeze_heap_moves_objects_out_of_gc():
+    """测试 fork 前冻结的对象不再受 GC 跟踪扫描。"""
+    try:
+        freeze_heap()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,74 @@
+"""外部依赖初始化与就绪探测测试。"""
+
+import asyncio
+import time
+
+from src.core.config import get_settings
+from src.core.service_registry import FAILED, READY, ServiceRegistry
+
+
+def test_services_initialize_concurrently(monkeypatch):
+    """测试多个依赖并发初始化，总耗时接近最慢的一个。"""
+    monkeypatch.setattr(get_settings().services, "block_startup", True)
+
+    def slow_factory():
+        time.sleep(0.2)
+        return object()
+
+    async def run():
+        registry = ServiceRegistry()
+        registry.register("a", slow_factory)
+        registry.register("b", slow_factory)
+        start = time.perf_counter()
+        await registry.start()
+        return registry, time.perf_counter() - start
+
+    registry, elapsed = asyncio.run(run())
+    assert elapsed < 0.35
+    assert all(s.status == READY for s in registry.services.values())
+
+
+def test_failed_service_reconnects_in_background(monkeypatch):
+    """测试初始化失败后在后台重连成功，期间请求不阻塞并返回 None。"""
+    monkeypatch.setattr(get_settings().services, "reconnect_initial_s", 0.05)
+    attempts = []
+
+    def flaky_factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("milvus down")
+        return "client"
+
+    async def run():
+        registry = ServiceRegistry()
+        service = registry.register("food_search", flaky_factory)
+        assert await registry.get("food_search") is None
+        assert service.status == FAILED
+        await asyncio.sleep(0.2)
+        return await registry.get("food_search")
+
+    assert asyncio.run(run()) == "client"
+    assert len(attempts) == 2
+
+
+def test_readiness_reports_required_dependencies(monkeypatch):
+    """测试必需依赖不可用时未就绪，且探测结果被缓存。"""
+    settings = get_settings().services
+    monkeypatch.setattr(settings, "required", ["database", "agent"])
+    monkeypatch.setattr(settings, "probe_ttl_s", 60)
+    probes = []
+
+    async def run():
+        registry = ServiceRegistry()
+        registry.provide("database", object(), probe=lambda _: probes.append(1))
+        registry.register("agent", lambda: None)
+        first = await registry.readiness()
+        second = await registry.readiness()
+        await registry.close()
+        return first, second
+
+    (ready, report), _ = asyncio.run(run())
+    assert not ready
+    assert report["database"]["status"] == READY
+    assert report["agent"]["status"] == "pending"
+    assert len(probes) == 1
@@ -0,0 +1,137 @@
+"""增量同步接口测试。"""
+
+import base64
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+from src.app import app
+from src.core.config import SyncSettings
+from src.core.security import get_current_user
+from src.models import SyncChange, User, WeightRecord
+from src.repositories.chat_repository import ChatRepository
+from src.repositories.sync_repository import SyncRepository, lock_users
+from src.services.sync_service import SyncService, decode_cursor, encode_cursor
+
+
+@pytest.fixture(name="user")
+def user_fixture(session: Session) -> User:
+    user = User(username="sync_user", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, user: User) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: user
+    return client
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42, issued_at=1000)) == (42, 1000)
+    # 不带签发时间的旧游标视为已过期
+    legacy = base64.urlsafe_b64encode(b"v1:42").rstrip(b"=").decode()
+    assert decode_cursor(legacy) == (42, 0)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_delta_sync_returns_only_changes_and_tombstones(
+    auth_client: TestClient, session: Session, user: User
+):
+    """测试全量快照后仅返回增量，删除以墓碑下发，无变化时游标不变。"""
+    first = auth_client.post("/weight", json={"weight_kg": 80}).json()
+    snapshot = auth_client.get("/sync").json()
+    assert snapshot["full"] is True
+    assert [w["id"] for w in snapshot["weights"]] == [first["id"]]
+    assert snapshot["profile"]["username"] == "sync_user"
+
+    second = auth_client.post("/weight", json={"weight_kg": 79}).json()
+    auth_client.post("/food-logs", json={"food_name": "苹果", "calories": 52})
+    auth_client.delete(f"/weight/{first['id']}")
+    ChatRepository(session).add_messages(user.id, [("user", "你好")])
+
+    delta = auth_client.get("/sync", params={"since": snapshot["cursor"]}).json()
+    assert delta["full"] is False
+    assert [w["id"] for w in delta["weights"]] == [second["id"]]
+    assert [f["food_name"] for f in delta["food_logs"]] == ["苹果"]
+    assert [m["content"] for m in delta["chat_messages"]] == ["你好"]
+    assert delta["deleted"]["weights"] == [first["id"]]
+    assert delta["profile"] is None
+
+    idle = auth_client.get("/sync", params={"since": delta["cursor"]}).json()
+    assert decode_cursor(idle["cursor"])[0] == decode_cursor(delta["cursor"])[0]
+    assert idle["weights"] == idle["food_logs"] == idle["chat_messages"] == []
+
+
+def test_created_then_deleted_is_only_tombstone(session: Session, user: User):
+    """测试同一实体多次变更只返回最终状态。"""
+    service = SyncService(SyncRepository(session))
+    cursor = service.sync(user, None).cursor
+    chat = ChatRepository(session)
+    chat.add_messages(user.id, [("user", "a"), ("assistant", "b")])
+    chat.clear_history(user.id)
+
+    delta = service.sync(user, cursor)
+    assert delta.chat_messages == []
+    assert len(delta.deleted.chat_messages) == 2
+
+
+def test_invalid_or_future_cursor(auth_client: TestClient):
+    assert auth_client.get("/sync", params={"since": "???"}).status_code == 400
+    # 超过当前最大序号（如数据库重置）时退回全量
+    response = auth_client.get("/sync", params={"since": encode_cursor(10**9)})
+    assert response.json()["full"] is True
+
+
+def test_change_log_writes_lock_user_row():
+    """测试变更日志写入前按用户行加锁，同一用户的序号按提交顺序分配。"""
+    sql = str(lock_users([2, 1, 2]).compile(dialect=postgresql.dialect()))
+    assert sql.rstrip().endswith("FOR UPDATE")
+
+
+def test_direct_session_writes_are_synced(session: Session, user: User):
+    """测试不经仓储、直接经会话的写入（如 Agent 工具）同样进入增量同步。"""
+    service = SyncService(SyncRepository(session))
+    cursor = service.sync(user, None).cursor
+
+    record = WeightRecord(user_id=user.id, weight_kg=66)
+    session.add(record)
+    session.commit()
+    record.weight_kg = 65
+    session.commit()
+
+    delta = service.sync(user, cursor)
+    assert [w.weight_kg for w in delta.weights] == [65]
+
+
+def test_expired_cursor_falls_back_to_snapshot(session: Session, user: User):
+    """测试早于保留期签发的游标退回全量快照。"""
+    service = SyncService(SyncRepository(session), SyncSettings(retention_days=1))
+    fresh = encode_cursor(0)
+    expired = encode_cursor(0, issued_at=time.time() - 2 * 86400)
+    assert service.sync(user, fresh).full is False
+    assert service.sync(user, expired).full is True
+
+
+def test_prune_keeps_latest_change_per_entity(session: Session, user: User):
+    """测试清理过期变更时保留每类数据的最新一条，版本号不回退。"""
+    for weight in (70, 69, 68):
+        session.add(WeightRecord(user_id=user.id, weight_kg=weight))
+        session.commit()
+    repo = SyncRepository(session)
+    version = repo.get_version(user.id, "weights")
+
+    deleted = repo.prune(datetime.now(timezone.utc) + timedelta(seconds=1))
+    remaining = session.exec(
+        select(SyncChange.entity).where(SyncChange.user_id == user.id)
+    ).all()
+    assert deleted == 2
+    assert sorted(remaining) == ["profile", "weights"]
+    assert repo.get_version(user.id, "weights") == version
@@ -0,0 +1,73 @@
+"""请求追踪与 Server-Timing 测试。"""
+
+import json
+import logging.handlers
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.core import tracing
+from src.core.config import get_settings
+from src.core.tracing import TracingMiddleware, span, stop_trace_export, traced
+
+
+@traced("auth")
+def fake_user() -> str:
+    return "alice"
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items")
+    def list_items(user: str = Depends(fake_user)):
+        for _ in range(2):
+            with span("db"):
+                pass
+        return {"user": user}
+
+    return app
+
+
+def test_server_timing_header_aggregates_spans():
+    """测试同名 span 汇总，线程池中的同步依赖也被记录。"""
+    client = TestClient(build_app())
+    response = client.get("/items")
+
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"]
+    timing = response.headers["server-timing"]
+    assert "auth;dur=" in timing
+    assert "db;dur=" in timing and 'desc="2 calls"' in timing
+    assert "total;dur=" in timing
+
+
+def test_trace_export_is_opt_in_and_rotated(tmp_path, monkeypatch):
+    """测试追踪记录默认不落盘，开启后经队列写入按日志配置轮转的文件。"""
+    settings = get_settings()
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings.tracing, "file", str(path))
+    monkeypatch.setattr(settings.tracing, "slow_threshold_ms", 0)
+    monkeypatch.setattr(settings.logging, "rotation", "size")
+    client = TestClient(build_app())
+
+    client.get("/items")
+    assert not path.exists()
+
+    monkeypatch.setattr(settings.tracing, "export", True)
+    try:
+        client.get("/items")
+        (handler,) = tracing._trace_listener.handlers
+        assert isinstance(handler, logging.handlers.RotatingFileHandler)
+    finally:
+        stop_trace_export()
+    (line,) = path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line)["path"] == "/items"
+
+
+def test_span_outside_request_is_noop():
+    """测试不在请求上下文中时 span 不报错。"""
+    with span("db"):
+        pass
+    assert fake_user() == "alice"
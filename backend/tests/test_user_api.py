@@ -2,107 +2,80 @@
 
 from fastapi.testclient import TestClient
 
+PROFILE = {
+    "age": 25,
+    "gender": "male",
+    "height_cm": 175,
+    "initial_weight_kg": 80,
+    "target_weight_kg": 70,
+}
 
-def test_get_user_not_found(client: TestClient):
-    """测试获取不存在的用户。"""
-    response = client.get("/user")
-    assert response.status_code == 404
-
-
-def test_create_user(client: TestClient):
-    """测试创建用户。"""
-    user_data = {
-        "name": "测试用户",
-        "age": 25,
-        "gender": "male",
-        "height_cm": 175,
-        "initial_weight_kg": 80,
-        "target_weight_kg": 70,
-    }
-    response = client.post("/user", json=user_data)
+
+def test_get_me_requires_auth(client: TestClient):
+    """测试未登录访问个人信息。"""
+    response = client.get("/user/me")
+    assert response.status_code == 401
+
+
+def test_register_and_login(client: TestClient, auth_headers: dict):
+    """测试注册后登录并获取个人信息。"""
+    response = client.get("/user/me", headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
-    assert data["name"] == "测试用户"
-    assert data["age"] == 25
-    assert data["gender"] == "male"
-    assert data["height_cm"] == 175
+    assert data["username"] == "api_user"
+    assert data["timezone"] == "UTC"
     assert "id" in data
 
 
-def test_create_user_duplicate(client: TestClient):
-    """测试重复创建用户。"""
-    user_data = {
-        "name": "用户A",
-        "age": 25,
-        "gender": "male",
-        "height_cm": 175,
-        "initial_weight_kg": 80,
-        "target_weight_kg": 70,
-    }
-    client.post("/user", json=user_data)
-    response = client.post("/user", json=user_data)
+def test_register_duplicate(client: TestClient, auth_headers: dict):
+    """测试重复注册同一用户名。"""
+    response = client.post(
+        "/user/register", json={"username": "api_user", "password": "another"}
+    )
     assert response.status_code == 400
 
 
-def test_get_user_after_create(client: TestClient):
-    """测试创建后获取用户。"""
-    user_data = {
-        "name": "用户B",
-        "age": 30,
-        "gender": "female",
-        "height_cm": 165,
-        "initial_weight_kg": 65,
-        "target_weight_kg": 55,
-    }
-    client.post("/user", json=user_data)
-    response = client.get("/user")
-    assert response.status_code == 200
-    assert response.json()["name"] == "用户B"
-
-
-def test_update_user(client: TestClient):
-    """测试更新用户信息。"""
-    user_data = {
-        "name": "初始名",
-        "age": 25,
-        "gender": "male",
-        "height_cm": 175,
-        "initial_weight_kg": 80,
-        "target_weight_kg": 70,
-    }
-    client.post("/user", json=user_data)
-
-    response = client.patch("/user", json={"name": "新名字", "age": 26})
+def test_login_wrong_password(client: TestClient, auth_headers: dict):
+    """测试密码错误时登录失败。"""
+    response = client.post(
+        "/user/login", json={"username": "api_user", "password": "wrong-password"}
+    )
+    assert response.status_code == 401
+
+
+def test_update_profile(client: TestClient, auth_headers: dict):
+    """测试更新身体资料并计算代谢指标。"""
+    response = client.put(
+        "/user/profile",
+        json={**PROFILE, "timezone": "Asia/Shanghai"},
+        headers=auth_headers,
+    )
     assert response.status_code == 200
     data = response.json()
-    assert data["name"] == "新名字"
-    assert data["age"] == 26
-    # 未修改的字段保持不变
+    assert data["age"] == 25
     assert data["height_cm"] == 175
+    assert data["timezone"] == "Asia/Shanghai"
+    assert data["bmr"] > 0
+    assert data["daily_calorie_goal"] >= 1200
 
-
-def test_update_user_not_found(client: TestClient):
-    """测试更新不存在的用户。"""
-    response = client.patch("/user", json={"name": "somebody"})
-    assert response.status_code == 404
+    # 资料更新后再次读取
+    assert client.get("/user/me", headers=auth_headers).json()["age"] == 25
 
 
-def test_create_user_validation(client: TestClient):
-    """测试用户创建校验。"""
+def test_update_profile_validation(client: TestClient, auth_headers: dict):
+    """测试身体资料校验。"""
     # 缺少必填字段
-    response = client.post("/user", json={"name": "test"})
+    response = client.put("/user/profile", json={"age": 25}, headers=auth_headers)
     assert response.status_code == 422
 
     # 性别无效
-    response = client.post(
-        "/user",
-        json={
-            "name": "test",
-            "age": 25,
-            "gender": "other",
-            "height_cm": 175,
-            "initial_weight_kg": 80,
-            "target_weight_kg": 70,
-        },
+    response = client.put(
+        "/user/profile", json={**PROFILE, "gender": "unknown"}, headers=auth_headers
+    )
+    assert response.status_code == 422
+
+    # 时区无效
+    response = client.put(
+        "/user/profile", json={**PROFILE, "timezone": "Mars/Base"}, headers=auth_headers
     )
     assert response.status_code == 422
@@ -0,0 +1,82 @@
+"""用户教练上下文快照缓存测试。"""
+
+from sqlmodel import Session
+
+from src.models import User
+from src.repositories.food_log_repository import FoodLogRepository
+from src.repositories.sync_repository import SyncRepository
+from src.repositories.weight_repository import WeightRepository
+from src.schemas.food_log import FoodLogCreate
+from src.services.food_log_service import FoodLogService
+from src.services.user_context_service import UserContextCache, UserContextService
+from src.services.weight_service import WeightService
+
+
+def _create_user(session: Session) -> User:
+    user = User(
+        username="context_user",
+        hashed_password="x",
+        age=30,
+        gender="male",
+        height_cm=175,
+        initial_weight_kg=80,
+        target_weight_kg=70,
+        tdee=2400,
+        daily_calorie_goal=1900,
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def test_snapshot_is_cached(session: Session):
+    """测试快照命中缓存后不再重新计算。"""
+    user = _create_user(session)
+    cache = UserContextCache()
+    service = UserContextService(
+        WeightRepository(session),
+        FoodLogRepository(session),
+        SyncRepository(session),
+        cache=cache,
+    )
+
+    first = service.get_snapshot(user)
+    assert first.current_weight_kg == 80
+    assert service.get_snapshot(user) is first
+
+
+def test_writes_invalidate_snapshot(session: Session):
+    """测试记录体重和饮食后快照失效。"""
+    user = _create_user(session)
+    service = UserContextService(
+        WeightRepository(session), FoodLogRepository(session), SyncRepository(session)
+    )
+
+    service.get_snapshot(user)
+    WeightService(WeightRepository(session)).record_weight(78.5, user.id)
+    FoodLogService(FoodLogRepository(session)).log_food(
+        user, FoodLogCreate(food_name="苹果", calories=95)
+    )
+
+    snapshot = service.get_snapshot(user)
+    assert snapshot.current_weight_kg == 78.5
+    assert snapshot.today_calories == 95
+    assert "剩余 1805kcal" in snapshot.to_prompt()
+
+
+def test_caches_follow_writes_from_other_processes(session: Session):
+    """测试未经本进程失效钩子的写入（其他工作进程）通过版本号使缓存失效。"""
+    user = _create_user(session)
+    context = UserContextService(
+        WeightRepository(session), FoodLogRepository(session), SyncRepository(session)
+    )
+    weights = WeightService(WeightRepository(session))
+    weights.record_weight(80, user.id)
+    assert context.get_snapshot(user).current_weight_kg == 80
+    assert weights.get_trend(user.id).latest_weight_kg == 80
+
+    # 直接经仓库写入，不调用 invalidate
+    WeightRepository(session).add_weight(79, user.id)
+    assert context.get_snapshot(user).current_weight_kg == 79
+    assert weights.get_trend(user.id).latest_weight_kg == 79
@@ -3,9 +3,17 @@
 from fastapi.testclient import TestClient
 
 
-def test_create_weight_record(client: TestClient):
+def test_weight_requires_auth(client: TestClient):
+    """测试未登录访问体重记录。"""
+    assert client.get("/weight").status_code == 401
+    assert client.post("/weight", json={"weight_kg": 75}).status_code == 401
+
+
+def test_create_weight_record(client: TestClient, auth_headers: dict):
     """测试创建体重记录。"""
-    response = client.post("/weight", json={"weight_kg": 75.5, "notes": "测试记录"})
+    response = client.post(
+        "/weight", json={"weight_kg": 75.5, "notes": "测试记录"}, headers=auth_headers
+    )
     assert response.status_code == 200
     data = response.json()
     assert data["weight_kg"] == 75.5
@@ -14,87 +22,58 @@ def test_create_weight_record(client: TestClient):
     assert "recorded_at" in data
 
 
-def test_create_weight_record_validation(client: TestClient):
+def test_create_weight_record_validation(client: TestClient, auth_headers: dict):
     """测试体重值校验。"""
     # 超出范围
-    response = client.post("/weight", json={"weight_kg": 600})
+    response = client.post("/weight", json={"weight_kg": 600}, headers=auth_headers)
     assert response.status_code == 422
 
     # 负数
-    response = client.post("/weight", json={"weight_kg": 0})
+    response = client.post("/weight", json={"weight_kg": 0}, headers=auth_headers)
     assert response.status_code == 422
 
 
-def test_get_weight_records(client: TestClient):
-    """测试获取体重记录列表。"""
+def test_get_weight_records(client: TestClient, auth_headers: dict):
+    """测试获取体重记录列表（时间倒序）。"""
     # 先创建两条记录
-    client.post("/weight", json={"weight_kg": 75.0})
-    client.post("/weight", json={"weight_kg": 74.5})
+    client.post("/weight", json={"weight_kg": 75.0}, headers=auth_headers)
+    client.post("/weight", json={"weight_kg": 74.5}, headers=auth_headers)
 
-    response = client.get("/weight")
+    response = client.get("/weight", headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 2
+    assert [r["weight_kg"] for r in data] == [74.5, 75.0]
 
 
-def test_get_weight_records_with_limit(client: TestClient):
-    """测试 limit 参数。"""
+def test_get_weight_records_columnar(client: TestClient, auth_headers: dict):
+    """测试列式格式与 points 参数校验。"""
     for i in range(5):
-        client.post("/weight", json={"weight_kg": 75.0 - i * 0.5})
+        client.post("/weight", json={"weight_kg": 75.0 - i * 0.5}, headers=auth_headers)
 
-    response = client.get("/weight?limit=3")
+    response = client.get("/weight?format=columnar", headers=auth_headers)
     assert response.status_code == 200
-    assert len(response.json()) == 3
+    assert response.json()["weights"] == [75.0, 74.5, 74.0, 73.5, 73.0]
 
-
-def test_update_weight_record(client: TestClient):
-    """测试更新体重记录。"""
-    # 创建
-    create_resp = client.post("/weight", json={"weight_kg": 75.0, "notes": "旧备注"})
-    record_id = create_resp.json()["id"]
-
-    # 更新
-    response = client.patch(
-        f"/weight/{record_id}", json={"weight_kg": 74.0, "notes": "改了"}
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert data["weight_kg"] == 74.0
-    assert data["notes"] == "改了"
-
-
-def test_update_weight_record_partial(client: TestClient):
-    """测试部分更新（只改 notes）。"""
-    create_resp = client.post("/weight", json={"weight_kg": 75.0})
-    record_id = create_resp.json()["id"]
-
-    response = client.patch(f"/weight/{record_id}", json={"notes": "新备注"})
-    assert response.status_code == 200
-    assert response.json()["weight_kg"] == 75.0
-    assert response.json()["notes"] == "新备注"
-
-
-def test_update_weight_record_not_found(client: TestClient):
-    """测试更新不存在的记录。"""
-    response = client.patch("/weight/99999", json={"weight_kg": 74.0})
-    assert response.status_code == 404
+    # points 只适用于 columnar
+    response = client.get("/weight?points=3", headers=auth_headers)
+    assert response.status_code == 400
 
 
-def test_delete_weight_record(client: TestClient):
+def test_delete_weight_record(client: TestClient, auth_headers: dict):
     """测试删除体重记录。"""
-    create_resp = client.post("/weight", json={"weight_kg": 75.0})
+    create_resp = client.post("/weight", json={"weight_kg": 75.0}, headers=auth_headers)
     record_id = create_resp.json()["id"]
 
     # 删除
-    response = client.delete(f"/weight/{record_id}")
+    response = client.delete(f"/weight/{record_id}", headers=auth_headers)
     assert response.status_code == 200
 
     # 确认删除后列表为空
-    response = client.get("/weight")
-    assert len(response.json()) == 0
+    response = client.get("/weight", headers=auth_headers)
+    assert response.json() == []
 
 
-def test_delete_weight_record_not_found(client: TestClient):
+def test_delete_weight_record_not_found(client: TestClient, auth_headers: dict):
     """测试删除不存在的记录。"""
-    response = client.delete("/weight/99999")
+    response = client.delete("/weight/99999", headers=auth_headers)
     assert response.status_code == 404
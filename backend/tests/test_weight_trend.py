@@ -0,0 +1,68 @@
+"""体重趋势分析测试。"""
+
+import numpy as np
+
+from src.services.weight_analytics import (
+    compute_weight_trend,
+    exponential_smoothing,
+    lttb_indices,
+)
+
+DAY = 86400.0
+
+
+def test_exponential_smoothing_matches_recurrence():
+    """测试向量化指数平滑与逐点递推结果一致。"""
+    values = np.random.default_rng(0).normal(70, 1, 300)
+    expected = np.empty_like(values)
+    expected[0] = values[0]
+    for i in range(1, values.size):
+        expected[i] = 0.9 * expected[i - 1] + 0.1 * values[i]
+
+    np.testing.assert_allclose(exponential_smoothing(values), expected)
+
+
+def test_trend_projects_target_date():
+    """测试稳定下降时给出目标日期预测和周变化速率。"""
+    timestamps = np.arange(60) * DAY
+    weights = 80 - 0.1 * np.arange(60)
+
+    trend = compute_weight_trend(timestamps, weights, target_weight_kg=70)
+    assert trend.points == 60
+    assert abs(trend.rate_7d_kg_per_week + 0.7) < 1e-6
+    assert trend.days_to_target is not None
+    assert trend.projected_target_date is not None
+    assert not trend.is_plateau
+
+
+def test_trend_detects_plateau():
+    """测试体重长期不变时识别为平台期且不给出预测。"""
+    timestamps = np.arange(20) * DAY
+    weights = np.full(20, 75.0)
+
+    trend = compute_weight_trend(timestamps, weights, target_weight_kg=70)
+    assert trend.is_plateau
+    assert trend.projected_target_date is None
+
+
+def test_trend_empty_history():
+    """测试没有记录时返回空结果。"""
+    trend = compute_weight_trend(np.array([]), np.array([]), target_weight_kg=70)
+    assert trend.points == 0
+    assert trend.trend_weight_kg is None
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    """测试 LTTB 降采样保留首尾点与尖峰，点数不超过上限。"""
+    timestamps = np.arange(1000) * DAY
+    weights = np.full(1000, 70.0)
+    weights[400] = 75.0
+    weights[700] = 65.0
+
+    keep = lttb_indices(timestamps, weights, 20)
+    assert keep.size == 20
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert {400, 700} <= set(keep.tolist())
+    # 点数不足时原样返回
+    assert lttb_indices(timestamps[:10], weights[:10], 20).tolist() == list(range(10))